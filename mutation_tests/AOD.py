@@ -1,7 +1,7 @@
 import ast
-import astor 
 import random
-from copy import deepcopy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, point_random
 
 
 class AODMutator:
@@ -9,67 +9,55 @@ class AODMutator:
     A class to perform Arithmetic Operator Deletion (AOD) mutation on a given AST.
     """
 
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
+        # The random replacement at a point only depends on the seed and the point
+        self.seed = seed
         self.n = float('inf') if n is None else n
         self.mutated_codes = []
+        self.mutants = []
 
-    class SingleAODMutator(ast.NodeTransformer):
-        """
-        A class to perform single Arithmetic Operator Deletion (AOD) mutation.
-        """
+    def variants(self, point):
+        # The operand the operation is replaced with
+        return ['left', 'right']
 
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-
-        def visit_BinOp(self, node):
-            self.current_index += 1
-            if self.current_index == self.target_index:
-                return node.left if random.choice([True, False]) else node.right
-            return self.generic_visit(node)
+    def mutate(self, point, variant=None):
+        # Replace the operation by one of its operands
+        if variant is None:
+            variant = point_random(self.seed, point).choice(self.variants(point))
+        return replace(point, getattr(point.node, variant))
 
     def find_arithmetic_operators(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.operators = []
-
-            def visit_BinOp(self, node):
-                if isinstance(node.op, (ast.Add, ast.Sub, ast.Mult, ast.Div)):
-                    self.operators.append(('arithmetic', node.lineno))
-                self.generic_visit(node)
+        return [point for point in self.index.find(ast.BinOp)
+                if isinstance(point.node.op, (ast.Add, ast.Sub, ast.Mult, ast.Div))]
 
-        finder = Finder()
-        finder.visit(self.tree)
+    def points(self):
+        return self.find_arithmetic_operators()
 
-        return finder.operators
-
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         operators = self.find_arithmetic_operators()
 
         random_indices = list(range(len(operators)))
-        random.shuffle(random_indices)
+        self.random.shuffle(random_indices)
 
         n = min(self.n, len(operators))
         # Generate mutated versions
         for i in random_indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)
-
-            # Mutate the target arithmetic operator
-            mutator = self.SingleAODMutator(target_index=i)
-            mutator.visit(mutated_tree)
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(operators[i])
+            yield Mutant('AOD', lineno=operators[i].lineno, tree=mutated_tree, original=self.tree)
 
-            # Fix the tree and convert back to code
-            ast.fix_missing_locations(mutated_tree)
-            try:
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
-            except:
-                pass
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
 
 
@@ -1,7 +1,10 @@
 import ast
-import astor
 import random
-from copy import deepcopy
+from copy import copy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, point_random
+from mutation_tests.pruning import prune
+from mutation_tests.type_inference import inferred
 
 
 class AORMutator:
@@ -9,71 +12,66 @@ class AORMutator:
     A class to perform Arithmetic Operator Replacement (AOR) mutation on a given AST.
     """
 
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
+        # The random replacement at a point only depends on the seed and the point
+        self.seed = seed
         self.n = float('inf') if n is None else n
         self.mutated_codes = []
-
-    class SingleAORMutator(ast.NodeTransformer):
-        """
-        A class to perform single Arithmetic Operator Replacement (AOR) mutation.
-        """
-
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-            self.operators = [ast.Add, ast.Sub, ast.Mult, ast.Div]
-
-        def visit_BinOp(self, node):
-            self.current_index += 1
-            if self.current_index == self.target_index:
-                # Replace the operator with a random different operator
-                current_operator = type(node.op)
-                possible_operators = [op for op in self.operators if op != current_operator]
-                new_operator = random.choice(possible_operators)
-                node.op = new_operator()
-            return self.generic_visit(node)
+        self.mutants = []
+        # Operations left out because no other operator supports the types of their operands
+        self.pruned = 0
+
+    # Operators an arithmetic operator is replaced with
+    operators = [ast.Add, ast.Sub, ast.Mult, ast.Div]
+
+    def variants(self, point):
+        # Every operator but the current one, and only the ones the types of the operands support
+        types = inferred(self.index)
+        return [op for op in self.operators
+                if op != type(point.node.op) and (types is None or types.allows(point, op))]
+
+    def mutate(self, point, variant=None):
+        # Replace the operator with a different operator, a random one if none is given
+        node = copy(point.node)
+        if variant is None:
+            variant = point_random(self.seed, point).choice(self.variants(point))
+        node.op = variant()
+        return replace(point, node)
 
     def find_arithmetic_operators(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.operators = []
-
-            def visit_BinOp(self, node):
-                if isinstance(node.op, (ast.Add, ast.Sub, ast.Mult, ast.Div)):
-                    self.operators.append(('arithmetic', node.lineno))
-                self.generic_visit(node)
+        operators = [point for point in self.index.find(ast.BinOp)
+                     if isinstance(point.node.op, (ast.Add, ast.Sub, ast.Mult, ast.Div))]
+        # Like list + list, that has no replacement that doesn't raise a TypeError
+        return prune(self, operators, self.variants)
 
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.operators
+    def points(self):
+        return self.find_arithmetic_operators()
 
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         operators = self.find_arithmetic_operators()
 
         random_indices = list(range(len(operators)))
-        random.shuffle(random_indices)
+        self.random.shuffle(random_indices)
 
         n = min(self.n, len(operators))
         # Generate mutated versions
         for i in random_indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)
-
-            # Mutate the target arithmetic operator
-            mutator = self.SingleAORMutator(target_index=i)
-            mutator.visit(mutated_tree)
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(operators[i])
+            yield Mutant('AOR', lineno=operators[i].lineno, tree=mutated_tree, original=self.tree)
 
-            # Fix the tree and convert back to code
-            ast.fix_missing_locations(mutated_tree)
-            try:
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
-            except:
-                pass
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
 
 
@@ -1,7 +1,17 @@
 import ast
-import astor
 import random
-from copy import deepcopy
+from copy import copy, deepcopy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, located, point_random
+
+
+def loaded(target):
+    # The target read as a value, with its position: the nodes of the assignment store into it
+    target = deepcopy(target)
+    for node in ast.walk(target):
+        if isinstance(getattr(node, 'ctx', None), ast.Store):
+            node.ctx = ast.Load()
+    return target
 
 
 class ASRMutator:
@@ -9,75 +19,65 @@ class ASRMutator:
     A class to perform Assignment Operator Replacement (ASR) mutation on a given AST.
     """
 
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
+        # The random replacement at a point only depends on the seed and the point
+        self.seed = seed
         self.n = float('inf') if n is None else n
         self.mutated_codes = []
+        self.mutants = []
 
-    class SingleASRMutator(ast.NodeTransformer):
-        """
-        A class to perform single Assignment Operator Replacement (ASR) mutation.
-        """
+    # Operators an assignment is combined with
+    operators = [ast.Add, ast.Sub, ast.Mult, ast.Div]
 
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-            self.operators = [ast.Add, ast.Sub, ast.Mult, ast.Div]
-
-        def visit_Assign(self, node):
-            self.current_index += 1
-            if self.current_index == self.target_index:
-                # Replace the assignment with a random arithmetic operation
-                new_operator = random.choice(self.operators)
-                new_node = ast.BinOp(left=node.targets[0], op=new_operator(), right=node.value)
-                node.value = new_node
-            return self.generic_visit(node)
+    def variants(self, point):
+        return list(self.operators)
+
+    def mutate(self, point, variant=None):
+        # Replace the assignment with an arithmetic operation, a random one if none is given
+        node = copy(point.node)
+        new_operator = point_random(self.seed, point).choice(self.operators) if variant is None else variant
+        node.value = located(ast.BinOp(left=loaded(node.targets[0]), op=new_operator(), right=node.value), node.value)
+        return replace(point, node)
 
     def find_assignment_operators(self):
         """
         Find assignment operators in the AST.
         """
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.assignments = []
-
-            def visit_Assign(self, node):
-                self.assignments.append(('assignment', node.lineno))
-                self.generic_visit(node)
+        return self.index.find(ast.Assign)
 
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.assignments
+    def points(self):
+        return self.find_assignment_operators()
 
-    def generate_mutated_codes(self):
+    def iter_mutants(self):
         """
-        Generate mutated code by replacing assignment operators.
+        Yield mutated code by replacing assignment operators, one mutant at a time.
         """
-        self.mutated_codes = []
         assignments = self.find_assignment_operators()
 
         random_indices = list(range(len(assignments)))
-        random.shuffle(random_indices)
+        self.random.shuffle(random_indices)
 
         n = min(self.n, len(assignments))
         # Generate mutated versions
         for i in random_indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(assignments[i])
+            yield Mutant('ASR', lineno=assignments[i].lineno, tree=mutated_tree, original=self.tree)
 
-            # Mutate the target assignment operator
-            mutator = self.SingleASRMutator(target_index=i)
-            mutator.visit(mutated_tree)
-
-            # Fix the tree and convert back to code
-            ast.fix_missing_locations(mutated_tree)
-            try:
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
-            except:
-                pass
+    def generate_mutated_trees(self):
+        """
+        Generate mutated code by replacing assignment operators.
+        """
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
 
 
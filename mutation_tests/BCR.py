@@ -1,81 +1,55 @@
 import ast
-import astor
 import random
-from copy import deepcopy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, located
 
 
 class BCRMutator():
     """
     A class to perform Break Continue Replacement (BCR) mutation on a given AST.
     """
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
         self.n = n
         self.mutated_codes = []
+        self.mutants = []
 
-    class SingleBCRMutator(ast.NodeTransformer):
-        """
-        A class to perform single Break Continue Replacement (BCR) mutation.
-        """
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-
-        def visit_Break(self, node):
-            self.current_index += 1
-            if self.current_index == self.target_index:
-                return ast.Continue()  # Replace 'break' with 'continue'
-            return node
-
-        def visit_Continue(self, node):
-            self.current_index += 1
-            if self.current_index == self.target_index:
-                return ast.Break()  # Replace 'continue' with 'break'
-            return node
+    def mutate(self, point):
+        # Replace 'break' with 'continue' and 'continue' with 'break'
+        if isinstance(point.node, ast.Break):
+            return replace(point, located(ast.Continue(), point.node))
+        return replace(point, located(ast.Break(), point.node))
 
     def find_break_continue_statements(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.statements = []
+        return self.index.find(ast.Break, ast.Continue)
 
-            def visit_Break(self, node):
-                self.statements.append(('break', node.lineno))
-                self.generic_visit(node)
+    def points(self):
+        return self.find_break_continue_statements()
 
-            def visit_Continue(self, node):
-                self.statements.append(('continue', node.lineno))
-                self.generic_visit(node)
-
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.statements
-
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         statements = self.find_break_continue_statements()
 
         random_indices = list(range(len(statements)))
-        random.shuffle(random_indices)
+        self.random.shuffle(random_indices)
 
         n = min(self.n, len(statements))
         # Generate mutated codes
         for i in random_indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)
-
-            # Mutate the target statement
-            mutator = self.SingleBCRMutator(target_index=i)
-            mutator.visit(mutated_tree)
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(statements[i])
+            yield Mutant('BCR', lineno=statements[i].lineno, tree=mutated_tree, original=self.tree)
 
-            # Fix the tree and convert back to code
-            ast.fix_missing_locations(mutated_tree)
-            try:
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
-            except:
-                pass
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
 
 
@@ -1,71 +1,60 @@
 import ast
-import astor
 import random
-from copy import deepcopy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, located, point_random
 
 
 class CODMutator():
     """
     A class to perform Conditional Operator Deletion (COD) mutation on a given AST.
     """
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
+        # The random replacement at a point only depends on the seed and the point
+        self.seed = seed
         self.n = n
         self.mutated_codes = []
+        self.mutants = []
 
-    class SingleCODMutator(ast.NodeTransformer):
-        """
-        A class to perform single Conditional Operator Deletion (COD) mutation.
-        """
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-
-        def visit_Compare(self, node):
-            self.current_index += 1
-            if self.current_index == self.target_index:
-                return ast.Constant(value=random.choice([True, False]))  # Replace with a valid constant
-            return node
+    def variants(self, point):
+        return [True, False]
 
-    def find_conditional_operators(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.operators = []
+    def mutate(self, point, variant=None):
+        # Replace the comparison with a constant
+        if variant is None:
+            variant = point_random(self.seed, point).choice(self.variants(point))
+        return replace(point, located(ast.Constant(value=variant), point.node))
 
-            def visit_Compare(self, node):
-                self.operators.append(('compare', node.lineno))
-                self.generic_visit(node)
+    def find_conditional_operators(self):
+        return self.index.find(ast.Compare)
 
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.operators
+    def points(self):
+        return self.find_conditional_operators()
 
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         operators = self.find_conditional_operators()
 
         random_indices = list(range(len(operators)))
-        random.shuffle(random_indices)
+        self.random.shuffle(random_indices)
 
         n = min(self.n, len(operators))
         # Generate mutated versions
         for i in random_indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)
-
-            # Mutate the target conditional operator
-            mutator = self.SingleCODMutator(target_index=i)
-            mutator.visit(mutated_tree)
-
-            # Fix the tree and convert back to code
-            ast.fix_missing_locations(mutated_tree)
-            try:
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
-            except:
-                pass
-    
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(operators[i])
+            yield Mutant('COD', lineno=operators[i].lineno, tree=mutated_tree, original=self.tree)
+
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
+
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
 
 
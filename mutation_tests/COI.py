@@ -1,95 +1,73 @@
 import ast
-import astor
 import random
-from copy import deepcopy
+from copy import copy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, located, point_random
 
 
 class COIMutator():
     """
     A class to perform Conditional Operator Insertion (COI) mutation on a given AST.
     """
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
+        # The random replacement at a point only depends on the seed and the point
+        self.seed = seed
         self.n = n
         self.mutated_codes = []
-
-    class SingleCOIMutator(ast.NodeTransformer):
-        """
-        A class to perform a single Conditional Operator Insertion (COI) mutation.
-        """
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-
-        def visit_BoolOp(self, node):
-            """
-            Visit BoolOp nodes ('and', 'or') and insert additional conditions.
-            """
-            self.current_index += 1
-            if self.current_index == self.target_index:
-                # Insert a new condition into the BoolOp
-                if isinstance(node.op, ast.And):
-                    new_condition = ast.Constant(value=False)  # Insert 'False' for 'and'
-                elif isinstance(node.op, ast.Or):
-                    new_condition = ast.Constant(value=True)  # Insert 'True' for 'or'
-                node.values.append(new_condition)
-            return self.generic_visit(node)
-
-        def visit_Compare(self, node):
-            """
-            Visit Compare nodes and convert them into BoolOps (with an additional condition).
-            """
-            self.current_index += 1
-            if self.current_index == self.target_index:
-                # Wrap the comparison into a BoolOp ('x < y and True')
-                #new_condition = ast.Constant(value=random.choice([True, False]))
-                return random.choice([ast.BoolOp(op=ast.And(), values=[node, ast.Constant(value=False)]), 
-                                      ast.BoolOp(op=ast.Or(), values=[node, ast.Constant(value=True)])])
-            return self.generic_visit(node)
+        self.mutants = []
+
+    def variants(self, point):
+        # A BoolOp keeps its own operator, a comparison is wrapped into an 'and' or an 'or'
+        if isinstance(point.node, ast.BoolOp):
+            return [type(point.node.op)]
+        return [ast.And, ast.Or]
+
+    def mutate(self, point, variant=None):
+        node = point.node
+        if isinstance(node, ast.BoolOp):
+            # Insert 'False' into an 'and', 'True' into an 'or'
+            new_condition = located(ast.Constant(value=not isinstance(node.op, ast.And)), node)
+            node = copy(node)
+            node.values = node.values + [new_condition]
+            return replace(point, node)
+
+        # Wrap the comparison into a BoolOp ('x < y and False' or 'x < y or True')
+        if variant is None:
+            variant = point_random(self.seed, point).choice(self.variants(point))
+        wrapped = ast.BoolOp(op=variant(), values=[node, ast.Constant(value=variant is ast.Or)])
+        return replace(point, located(wrapped, node))
 
     def find_conditional_operators(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.operators = []
-
-            def visit_BoolOp(self, node):
-                self.operators.append(node)
-                self.generic_visit(node)
+        return self.index.find(ast.BoolOp, ast.Compare)
 
-            def visit_Compare(self, node):
-                self.operators.append(node)
-                self.generic_visit(node)
+    def points(self):
+        return self.find_conditional_operators()
 
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.operators
-
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         operators = self.find_conditional_operators()
 
         random_indices = list(range(len(operators)))
-        random.shuffle(random_indices)  
+        self.random.shuffle(random_indices)  
 
         n = min(self.n, len(operators))
         # Generate mutated versions
         for i in random_indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)  
-
-            # Mutate the target conditional operator
-            mutator = self.SingleCOIMutator(target_index=i)
-            mutator.visit(mutated_tree)
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(operators[i])
+            yield Mutant('COI', lineno=operators[i].lineno, tree=mutated_tree, original=self.tree)
 
-            # Fix the tree and convert back to code
-            ast.fix_missing_locations(mutated_tree)
-            try:
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
-            except:
-                pass
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
     
 
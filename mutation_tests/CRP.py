@@ -1,75 +1,62 @@
 import ast
-import astor
 import random
-from copy import deepcopy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, located, point_random
+from mutation_tests.pruning import prune
 
 
 class CRPMutator():
     """
     A class to perform Constant Replacement (CRP) mutation on a given AST.
     """
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
+        # The random replacement at a point only depends on the seed and the point
+        self.seed = seed
         self.n = n
         self.mutated_codes = []
+        self.mutants = []
+        # Constants left out because replacing them changes nothing
+        self.pruned = 0
 
-    class SingleCRPMutator(ast.NodeTransformer):
-        """
-        A class to perform a single Constant Replacement (CRP) mutation.
-        """
-        def __init__(self, target_index, start, end):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-            self.start = start
-            self.end = end
-
-        def visit_Constant(self, node):
-            if isinstance(node.value, (int, float)):
-                self.current_index += 1
-                if self.current_index == self.target_index:
-                    # Replace the constant with the new value
-                    return ast.Constant(value=random.randint(self.start, self.end))
-                return node
+    def mutate(self, point, start=0, end=100):
+        # Replace a number with a random one, other constants are left as they are
+        if not isinstance(point.node.value, (int, float)):
+            return replace(point, point.node)
+        value = point_random(self.seed, point).randint(start, end)
+        return replace(point, located(ast.Constant(value=value), point.node))
 
     def find_constants(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.constants = []
+        # Strings (docstrings too), None and the other constants that are not numbers are never replaced
+        return prune(self, self.index.find(ast.Constant), lambda point: isinstance(point.node.value, (int, float)))
 
-            def visit_Constant(self, node):
-                self.constants.append(node)
-                self.generic_visit(node)
+    def points(self):
+        return self.find_constants()
 
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.constants
-
-    def generate_mutated_codes(self, start=0, end=100):
-        self.mutated_codes = []  
+    def iter_mutants(self, start=0, end=100):
+        # Every mutant is only built when it is asked for
         constants = self.find_constants()
 
         random_indices = list(range(len(constants)))
-        random.shuffle(random_indices)  
+        self.random.shuffle(random_indices)  
 
         n = min(self.n, len(constants))  
         # Generate mutated versions
         for i in random_indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)  
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(constants[i], start, end)
+            yield Mutant('CRP', lineno=constants[i].lineno, tree=mutated_tree, original=self.tree)
 
-            # Mutate the target constant
-            mutator = self.SingleCRPMutator(target_index=i, start=start, end=end)
-            mutator.visit(mutated_tree)
-
-            # Fix the tree and convert back to code
-            ast.fix_missing_locations(mutated_tree)
-            try:
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
-            except:
-                pass
+    def generate_mutated_trees(self, start=0, end=100):
+        self.mutants = list(self.iter_mutants(start, end))
+        return self.mutants
 
+    def generate_mutated_codes(self, start=0, end=100):
+        self.mutants = to_source(self.generate_mutated_trees(start, end))
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
 
 
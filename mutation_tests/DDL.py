@@ -1,98 +1,65 @@
 import ast
-import astor
 import random
-from copy import deepcopy
+from copy import copy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, point_random
 
 
 class DDLMutator():
     """
     A class to perform Decorator Deletion (DDL) mutation on a given AST.
     """
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
+        # The random replacement at a point only depends on the seed and the point
+        self.seed = seed
         self.n = n
         self.mutated_codes = []
+        self.mutants = []
 
-    class SingleDDLMutator(ast.NodeTransformer):
-        """
-        A class to perform a single Decorator Deletion Mutation (DDL).
-        """
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-
-        def visit_FunctionDef(self, node):
-            if node.decorator_list:
-                self.current_index += 1
-                if self.current_index == self.target_index:
-                    # Remove one decorator randomly if there are multiple
-                    if len(node.decorator_list) > 1:
-                        removal_index = random.randint(0, len(node.decorator_list) - 1)
-                        del node.decorator_list[removal_index]
-                    else:
-                        # Remove the only decorator
-                        node.decorator_list = []
-            return self.generic_visit(node)
-
-        def visit_ClassDef(self, node):
-            if node.decorator_list:
-                self.current_index += 1
-                if self.current_index == self.target_index:
-                    # Remove one decorator randomly if there are multiple
-                    if len(node.decorator_list) > 1:
-                        removal_index = random.randint(0, len(node.decorator_list) - 1)
-                        del node.decorator_list[removal_index]
-                    else:
-                        # Remove the only decorator
-                        node.decorator_list = []
-            return self.generic_visit(node)
+    def variants(self, point):
+        # Position of the decorator that is removed
+        return list(range(len(point.node.decorator_list)))
 
-    def find_decorators(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.decorators = []
-
-            def visit_FunctionDef(self, node):
-                if node.decorator_list:
-                    self.decorators.append(('function', node.lineno))
-                self.generic_visit(node)
+    def mutate(self, point, variant=None):
+        node = copy(point.node)
+        if variant is None:
+            # Remove one decorator randomly if there are multiple, else the only one
+            variant = point_random(self.seed, point).randrange(len(node.decorator_list))
+        node.decorator_list = node.decorator_list[:variant] + node.decorator_list[variant + 1:]
+        return replace(point, node)
 
-            def visit_ClassDef(self, node):
-                if node.decorator_list:
-                    self.decorators.append(('class', node.lineno))
-                self.generic_visit(node)
+    def find_decorators(self):
+        return [point for point in self.index.find(ast.FunctionDef, ast.ClassDef) if point.node.decorator_list]
 
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.decorators
+    def points(self):
+        return self.find_decorators()
 
-    def generate_mutated_codes(self):
-        self.mutated_codes = []  
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         decorators = self.find_decorators()
 
         n = min(self.n, len(decorators))  
 
         random_indices = list(range(len(decorators)))
-        random.shuffle(random_indices)
+        self.random.shuffle(random_indices)
 
         # Generate mutated versions
         for i in random_indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)
-
-            # Mutate the target decorator
-            mutator = self.SingleDDLMutator(target_index=i)
-            mutator.visit(mutated_tree)
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(decorators[i])
+            yield Mutant('DDL', lineno=decorators[i].lineno, tree=mutated_tree, original=self.tree)
 
-            # Fix the tree and convert back to code
-            ast.fix_missing_locations(mutated_tree)
-            try:
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
-            except:
-                pass
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
     
 
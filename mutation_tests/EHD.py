@@ -1,88 +1,53 @@
 import ast
-import astor
 import random
-from copy import deepcopy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace
 
 
 class EHDMutator():
     """
     A class to perform Decorator Deletion (DDL) mutation on a given AST.
     """
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
         self.n = n
         self.mutated_codes = []
+        self.mutants = []
 
-    class SingleEHDMutator(ast.NodeTransformer):
-        """
-        A class to perform a single Decorator Deletion (DDL).
-        """
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-
-        def visit_Try(self, node):
-            """
-            Visit Try nodes and replace the target `try` block with its body.
-            """
-            self.current_index += 1
-            if self.current_index == self.target_index:
-                return node.body  # Replace the 'try' block with its body
-            return self.generic_visit(node)
-
-        def visit_Module(self, node):
-            """
-            Handle the Module node to flatten lists returned by replaced Try nodes.
-            """
-            new_body = []
-            for stmt in node.body:
-                result = self.visit(stmt)
-                if isinstance(result, list):
-                    new_body.extend(result)
-                elif result is not None:
-                    new_body.append(result)
-            node.body = new_body
-            return node
+    def mutate(self, point):
+        # Replace the 'try' block with its body
+        return replace(point, list(point.node.body))
 
     def find_try_blocks(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.try_blocks = []
+        return self.index.find(ast.Try)
 
-            def visit_Try(self, node):
-                self.try_blocks.append(node)
-                self.generic_visit(node)
+    def points(self):
+        return self.find_try_blocks()
 
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.try_blocks
-
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         try_blocks = self.find_try_blocks()
 
         indices = list(range(len(try_blocks)))
-        random.shuffle(indices)
+        self.random.shuffle(indices)
 
         n = min(self.n, len(try_blocks))
         # Generate mutated versions
         for i in indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(try_blocks[i])
+            yield Mutant('EHD', lineno=try_blocks[i].lineno, tree=mutated_tree, original=self.tree)
 
-            # Remove the target 'try' block
-            mutator = self.SingleEHDMutator(target_index=i)
-            mutator.visit(mutated_tree)
-
-            # Fix the tree and convert back to code
-            ast.fix_missing_locations(mutated_tree)
-            try:
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
-            except:
-                pass
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
     
 
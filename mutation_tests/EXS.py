@@ -1,80 +1,58 @@
 import ast
-from copy import deepcopy
-import astor
+import random
+from copy import copy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, located
+from mutation_tests.pruning import prune
 
 
 class EXSMutator:
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
         self.n = n
         self.mutated_codes = []
-
-    class EXS(ast.NodeTransformer):
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-
-        def visit(self, node):
-            if isinstance(node, ast.ExceptHandler):
-                self.current_index += 1
-                if self.current_index == self.target_index:
-                    if node.body:
-                        node.body = [ast.Pass()]
-
-            elif isinstance(node, ast.Raise):
-                self.current_index += 1
-                if self.current_index == self.target_index:
-                    node = ast.Pass()
-
-            method = 'visit_' + node.__class__.__name__
-            visitor = getattr(self, method, self.generic_visit)
-            return visitor(node)
+        self.mutants = []
+        # Handlers left out because they swallow the exception already
+        self.pruned = 0
+
+    def mutate(self, point):
+        if isinstance(point.node, ast.Raise):
+            return replace(point, located(ast.Pass(), point.node))
+        # Swallow the exception: the handler does nothing
+        node = copy(point.node)
+        node.body = [located(ast.Pass(), node.body[0])]
+        return replace(point, node)
 
     def find_exception(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.exception = []
-                self.current_class = None
-
-            def visit(self, node):
-                if isinstance(node, ast.ExceptHandler):
-                    if node.body:
-                        self.exception.append(
-                            (node.name, node.lineno)
-                        )
-                elif isinstance(node, ast.Raise):
-                    self.exception.append(
-                        ("Raise", node.lineno)
-                    )
+        exceptions = [point for point in self.index.find(ast.ExceptHandler, ast.Raise)
+                      if isinstance(point.node, ast.Raise) or point.node.body]
+        return prune(self, exceptions, lambda point: isinstance(point.node, ast.Raise)
+                     or [type(statement) for statement in point.node.body] != [ast.Pass])
 
-                method = 'visit_' + node.__class__.__name__
-                visitor = getattr(self, method, self.generic_visit)
-                return visitor(node)
+    def points(self):
+        return self.find_exception()
 
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.exception
-
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         exceptions = self.find_exception()
 
         # Generate mutated codes
         for i in range(len(exceptions)):
             try:
-                # Deep copy the original tree
-                mutated_tree = deepcopy(self.tree)
-    
-                # Mutate the target statement
-                mutator = self.EXS(target_index=i)
-                mutator.visit(mutated_tree)
-    
-                # Fix the tree and convert back to code
-                ast.fix_missing_locations(mutated_tree)
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
+                # Copy only the nodes from the root to the mutated node
+                mutated_tree = self.mutate(exceptions[i])
             except:
-                pass
+                continue
+            yield Mutant('EXS', lineno=exceptions[i].lineno, tree=mutated_tree, original=self.tree)
 
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
+
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
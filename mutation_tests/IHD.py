@@ -1,186 +1,79 @@
 import ast
-from copy import deepcopy
-import astor
+import random
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace
 
 
 class IHDMutator:
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
         self.n = n
         self.mutated_codes = []
+        self.mutants = []
         self.class_variables = {}
         self._collect_init_variables()
 
-    def _collect_init_variables(self):
-        class InitVariableCollector(ast.NodeVisitor):
-            def __init__(self):
-                self.current_class = None
-                self.in_init = False
-                self.class_variables = {}
-
-            def visit_ClassDef(self, node):
-                previous_class = self.current_class
-                self.current_class = node.name
-                if self.current_class not in self.class_variables:
-                    self.class_variables[self.current_class] = set()
-
-                # Visit all nodes in the class
-                for n in node.body:
-                    self.visit(n)
-
-                self.current_class = previous_class
-
-            def visit_FunctionDef(self, node):
-                if self.current_class and node.name == '__init__':
-                    self.in_init = True
-                    # Visit the function body
-                    for n in node.body:
-                        self.visit(n)
-                    self.in_init = False
-
-            def visit_Assign(self, node):
-                if self.current_class and self.in_init:
-                    for target in node.targets:
-                        if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name):
-                            if target.value.id == 'self':
-                                self.class_variables[self.current_class].add(target.attr)
-
-            def visit_AnnAssign(self, node):
-                if self.current_class and self.in_init:
-                    if isinstance(node.target, ast.Attribute) and isinstance(node.target.value, ast.Name):
-                        if node.target.value.id == 'self':
-                            self.class_variables[self.current_class].add(node.target.attr)
-
-        collector = InitVariableCollector()
-        collector.visit(self.tree)
-        self.class_variables = collector.class_variables
-
-    class IHD(ast.NodeTransformer):
-        def __init__(self, target_index, class_variables):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-            self.parent_vars = set()
-            self.in_child_init = False
-            self.class_variables = class_variables
-            self.init_var_removed = False
-
-        def visit_ClassDef(self, node):
-            if node.bases:
-                for base in node.bases:
-                    if isinstance(base, ast.Name):
-                        parent_class = base.id
-                        if parent_class in self.class_variables:
-                            self.parent_vars = set()
-                            self.parent_vars.update(self.class_variables[parent_class])
-
-                node.body = [self.visit(n) for n in node.body]
-            return node
-
-        def visit_FunctionDef(self, node):
-            if node.name == '__init__' and self.parent_vars:
-                self.in_child_init = True
-                self.init_var_removed = False
-                node.body = [self.visit(n) for n in node.body]
-
-                # If we removed something and the body is empty, add 'pass'
-                if self.init_var_removed and not node.body:
-                    node.body = [ast.Pass()]
-
-                self.in_child_init = False
-            return node
+    def self_attributes(self, point):
+        # Names of the self.<name> attributes set by an assignment
+        node = point.node
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        return [target.attr for target in targets
+                if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name)
+                and target.value.id == 'self']
+
+    def init_assignments(self):
+        # Assignments in the __init__ method of a class, with the class they belong to
+        for point in self.index.find(ast.Assign, ast.AnnAssign):
+            function = point.enclosing(ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+            if function is None or not isinstance(function.node, ast.FunctionDef) or function.node.name != '__init__':
+                continue
+            owner = function.enclosing(ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+            if owner is not None and isinstance(owner.node, ast.ClassDef):
+                yield owner.node, point
 
-        def visit_Assign(self, node):
-            if self.in_child_init:
-                for target in node.targets:
-                    if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name):
-                        if target.value.id == 'self':
-                            var_name = target.attr
-                            if var_name in self.parent_vars:
-                                self.current_index += 1
-                                if self.current_index == self.target_index:
-                                    self.init_var_removed = True
-                                    return None
-            return node
+    def _collect_init_variables(self):
+        self.class_variables = {point.node.name: set() for point in self.index.find(ast.ClassDef)}
+        for class_node, point in self.init_assignments():
+            self.class_variables[class_node.name].update(self.self_attributes(point))
 
-        def visit_AnnAssign(self, node):
-            if self.in_child_init:
-                if isinstance(node.target, ast.Attribute) and isinstance(node.target.value, ast.Name):
-                    if node.target.value.id == 'self':
-                        var_name = node.target.attr
-                        if var_name in self.parent_vars:
-                            self.current_index += 1
-                            if self.current_index == self.target_index:
-                                self.init_var_removed = True
-                                return None
-            return node
+    def mutate(self, point):
+        # Delete the assignment that hides the variable of the parent class
+        return replace(point, [])
 
     def find_hiding_variables(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self, class_variables):
-                self.hiding_vars = []
-                self.parent_vars = set()
-                self.in_init = False
-                self.class_variables = class_variables
-
-            def visit_ClassDef(self, node):
-                if node.bases:
-                    for base in node.bases:
-                        if isinstance(base, ast.Name):
-                            parent_class = base.id
-                            if parent_class in self.class_variables:
-                                self.parent_vars = set()
-                                self.parent_vars.update(self.class_variables[parent_class])
-
-                    for n in node.body:
-                        self.visit(n)
-
-            def visit_FunctionDef(self, node):
-                if node.name == '__init__' and self.parent_vars:
-                    self.in_init = True
-                    for n in node.body:
-                        self.visit(n)
-                    self.in_init = False
-
-            def visit_Assign(self, node):
-                if self.in_init:
-                    for target in node.targets:
-                        if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name):
-                            if target.value.id == 'self':
-                                var_name = target.attr
-                                if var_name in self.parent_vars:
-                                    self.hiding_vars.append((var_name, node.lineno))
-
-            def visit_AnnAssign(self, node):
-                if self.in_init:
-                    if isinstance(node.target, ast.Attribute) and isinstance(node.target.value, ast.Name):
-                        if node.target.value.id == 'self':
-                            var_name = node.target.attr
-                            if var_name in self.parent_vars:
-                                self.hiding_vars.append((var_name, node.lineno))
-
-        finder = Finder(self.class_variables)
-        finder.visit(self.tree)
-        return finder.hiding_vars
-
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+        hiding_vars = []
+        for class_node, point in self.init_assignments():
+            parent_vars = set()
+            for base in class_node.bases:
+                if isinstance(base, ast.Name) and base.id in self.class_variables:
+                    parent_vars.update(self.class_variables[base.id])
+            if any(name in parent_vars for name in self.self_attributes(point)):
+                hiding_vars.append(point)
+        return hiding_vars
+
+    def points(self):
+        return self.find_hiding_variables()
+
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         hiding_vars = self.find_hiding_variables()
 
         for i in range(len(hiding_vars)):
             try:
-                # Deep copy the original tree
-                mutated_tree = deepcopy(self.tree)
-
-                # Mutate the target statement
-                mutator = self.IHD(target_index=i, class_variables=self.class_variables)
-                mutator.visit(mutated_tree)
-
-                # Fix the tree and convert back to code
-                ast.fix_missing_locations(mutated_tree)
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
+                # Copy only the nodes from the root to the mutated node
+                mutated_tree = self.mutate(hiding_vars[i])
             except:
-                pass
+                continue
+            yield Mutant('IHD', lineno=hiding_vars[i].lineno, tree=mutated_tree, original=self.tree)
+
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
@@ -1,7 +1,8 @@
 import ast
-from copy import deepcopy
+import random
 
-import astor
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace
 
 
 def collect_class_methods(node):
@@ -14,113 +15,60 @@ def collect_class_methods(node):
 
 
 class IODMutator:
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
         self.n = n
         self.mutated_codes = []
+        self.mutants = []
 
-    class IOD(ast.NodeTransformer):
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-            self.current_class = None
-            self.classes = {}
-            self.parent_methods = set()
-
-        def visit_ClassDef(self, node):
-            previous_class = self.current_class
-            self.current_class = node
-
-            # collect and store this class's methods
-            methods = collect_class_methods(node)
-            self.classes[node.name] = methods
-
-            # collect parent methods if bases exist
-            self.parent_methods = set()
-            for base in node.bases:
-                if isinstance(base, ast.Name):
-                    parent_name = base.id
-                    parent_methods = self.classes.get(parent_name, set())
-                    self.parent_methods.update(parent_methods)
-
-            node = self.generic_visit(node)
-            self.current_class = previous_class
-
-            return node
-
-        def visit_FunctionDef(self, node: ast.FunctionDef):
-            if (self.current_class and
-                    not node.name.startswith('_') and
-                    node.name in self.parent_methods):
-                self.current_index += 1
-                if self.current_index == self.target_index:
-                    return None
-
-            return node
+    def mutate(self, point):
+        # Delete the overriding method
+        return replace(point, [])
 
     def find_override_method(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.methods = []
-                self.current_class = None
-                self.classes = {}
-                self.parent_methods = set()
-
-            def visit_ClassDef(self, node):
-                previous_class = self.current_class
-                self.current_class = node
-
-                # collect and store this class's methods
-                methods = collect_class_methods(node)
-                self.classes[node.name] = methods
-
-                # collect parent methods if bases exist
-                self.parent_methods = set()
-                for base in node.bases:
-                    if isinstance(base, ast.Name):
-                        parent_name = base.id
-                        parent_methods = self.classes.get(parent_name, set())
-                        self.parent_methods.update(parent_methods)
-
-                node = self.generic_visit(node)
-                self.current_class = previous_class
-
-                return node
-
-            def visit_FunctionDef(self, node: ast.FunctionDef):
-                if (self.current_class and
-                        not node.name.startswith('_') and
-                        node.name in self.parent_methods):
-                    self.methods.append(
-                        (self.current_class.name, node.lineno)
-                    )
-
-                return node
-
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.methods
-
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+        # Methods of every class, for the classes that come after it
+        classes = {}
+        parent_methods = {}
+        for point in self.index.find(ast.ClassDef):
+            classes[point.node.name] = collect_class_methods(point.node)
+            parent_methods[point.node] = set()
+            for base in point.node.bases:
+                if isinstance(base, ast.Name):
+                    parent_methods[point.node].update(classes.get(base.id, set()))
+
+        methods = []
+        for point in self.index.find(ast.FunctionDef):
+            owner = point.enclosing(ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+            if owner is None or not isinstance(owner.node, ast.ClassDef):
+                continue
+            if not point.node.name.startswith('_') and point.node.name in parent_methods[owner.node]:
+                methods.append(point)
+        return methods
+
+    def points(self):
+        return self.find_override_method()
+
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         methods = self.find_override_method()
 
         # Generate mutated codes
         for i in range(len(methods)):
             try:
-                # Deep copy the original tree
-                mutated_tree = deepcopy(self.tree)
-    
-                # Mutate the target statement
-                mutator = self.IOD(target_index=i)
-                mutator.visit(mutated_tree)
-    
-                # Fix the tree and convert back to code
-                ast.fix_missing_locations(mutated_tree)
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
+                # Copy only the nodes from the root to the mutated node
+                mutated_tree = self.mutate(methods[i])
             except:
-                pass
+                continue
+            yield Mutant('IOD', lineno=methods[i].lineno, tree=mutated_tree, original=self.tree)
 
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
+
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
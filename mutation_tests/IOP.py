@@ -1,6 +1,8 @@
 import ast
-from copy import deepcopy
-import astor
+import random
+from copy import copy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace
 
 
 def is_super_call(node):
@@ -38,101 +40,51 @@ def is_super_call(node):
 
 
 class IOPMutator:
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
         self.n = n
         self.mutated_codes = []
+        self.mutants = []
 
-    class IOP(ast.NodeTransformer):
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-            self.current_class = None
-
-        def visit_ClassDef(self, node):
-            self.current_class = node
-            node = self.generic_visit(node)
-            self.current_class = None
-            return node
-
-        def visit_FunctionDef(self, node):
-            if not self.current_class:
-                return node
-
-            super_positions = []
-            for i, stmt in enumerate(node.body):
-                if is_super_call(stmt):
-                    super_positions.append(i)
-
-            if not super_positions:
-                return node
-
-            new_body = []
-            moved_supers = []
-
-            for i, stmt in enumerate(node.body):
-                if is_super_call(stmt):
-                    self.current_index += 1
-                    if self.current_index == self.target_index:
-                        moved_supers.append(stmt)
-                    else:
-                        new_body.append(stmt)
-                else:
-                    new_body.append(stmt)
-
-            new_body.extend(moved_supers)
-            node.body = new_body
-            return node
+    def mutate(self, point):
+        # Move the super() call to the end of the method
+        function = copy(point.parent.node)
+        function.body = [stmt for stmt in function.body if stmt is not point.node] + [point.node]
+        return replace(point.parent, function)
 
     def find_super_calls(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.super_calls = []
-                self.current_class = None
-
-            def visit_ClassDef(self, node):
-                self.current_class = node
-                self.generic_visit(node)
-                self.current_class = None
-
-            def visit_FunctionDef(self, node: ast.FunctionDef):
-                if not self.current_class:
-                    return
-
-                super_count = 0
-                for stmt in node.body:
-                    if is_super_call(stmt):
-                        super_count += 1
-
-                if super_count > 0:
-                    self.super_calls.append((self.current_class.name, node.lineno, super_count))
-
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.super_calls
-
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+        # super() statements in the body of the methods of a class
+        calls = []
+        for point in self.index.find(ast.FunctionDef):
+            owner = point.enclosing(ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+            if owner is None or not isinstance(owner.node, ast.ClassDef):
+                continue
+            calls.extend(child for child in self.index.children(point, 'body') if is_super_call(child.node))
+        return calls
+
+    def points(self):
+        return self.find_super_calls()
+
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         calls = self.find_super_calls()
-        counter = 0
-
-        for class_info in calls:
-            super_count = class_info[2]
 
-            for i in range(super_count):
-                try:
-                    # Move single super call
-                    mutated_tree = deepcopy(self.tree)
-                    mutator = self.IOP(target_index=counter)
-                    mutator.visit(mutated_tree)
+        for counter in range(len(calls)):
+            try:
+                # Copy only the nodes from the root to the mutated node
+                mutated_tree = self.mutate(calls[counter])
+            except:
+                continue
+            yield Mutant('IOP', lineno=calls[counter].lineno, tree=mutated_tree, original=self.tree)
 
-                    ast.fix_missing_locations(mutated_tree)
-                    mutated_code = astor.to_source(mutated_tree)
-                    self.mutated_codes.append(mutated_code)
-                except:
-                    pass
-
-                counter += 1
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
@@ -1,64 +1,48 @@
 import ast
-from copy import deepcopy
-import astor
+import random
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace
 
 
 class LODMutator:
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
         self.n = n
         self.mutated_codes = []
+        self.mutants = []
 
-    class LOD(ast.NodeTransformer):
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-
-        def visit_BinOp(self, node):
-            if isinstance(node.op, ast.BitAnd) or isinstance(node.op, ast.BitOr) \
-                    or isinstance(node.op, ast.BitXor):
-                self.current_index += 1
-                if self.current_index == self.target_index:
-                    return node.right
-
-            # Recursively visit all children of the current node
-            return self.generic_visit(node)
+    def mutate(self, point):
+        # Keep the right operand only
+        return replace(point, point.node.right)
 
     def find_operators(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.operators = []
-
-            def visit_BinOp(self, node):
-                if isinstance(node.op, ast.BitAnd) or isinstance(node.op, ast.BitOr) \
-                        or isinstance(node.op, ast.BitXor):
-                    self.operators.append((node.op, node.lineno))
-                return self.generic_visit(node)
+        return [point for point in self.index.find(ast.BinOp)
+                if isinstance(point.node.op, (ast.BitAnd, ast.BitOr, ast.BitXor))]
 
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.operators
+    def points(self):
+        return self.find_operators()
 
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         operators = self.find_operators()
 
         # Generate mutated codes
         for i in range(len(operators)):
             try:
-                # Deep copy the original tree
-                mutated_tree = deepcopy(self.tree)
-
-                # Mutate the target statement
-                mutator = self.LOD(target_index=i)
-                mutator.visit(mutated_tree)
-
-                # Fix the tree and convert back to code
-                ast.fix_missing_locations(mutated_tree)
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
+                # Copy only the nodes from the root to the mutated node
+                mutated_tree = self.mutate(operators[i])
             except:
-                pass
+                continue
+            yield Mutant('LOD', lineno=operators[i].lineno, tree=mutated_tree, original=self.tree)
 
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
+
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
@@ -1,22 +1,10 @@
-from AOD import AODMutator
-from AOR import AORMutator
-from ASR import ASRMutator
-from BCR import BCRMutator
-from CDI import CDIMutator
-from COD import CODMutator
-from COI import COIMutator
-from CRP import CRPMutator
-from DDL import DDLMutator
-from EHD import EHDMutator
-from EXS import EXSMutator
-from IHD import IHDMutator
-from IOD import IODMutator
-from IOP import IOPMutator
-from LOD import LODMutator
-from LOI import LOIMutator
-from LOR import LORMutator
-from ROR import RORMutator
-from SCD import SCDMutator
-from SCI import SCIMutator
-from SDI import SDIMutator
-from SIR import SIRMutator
+from mutation_tests.registry import OPERATORS, load_operator
+
+# Mutators.AODMutator and the others are still there, but a module is only imported when its class is used
+__all__ = [f"{name}Mutator" for name in OPERATORS]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return load_operator(name[:-len('Mutator')])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,112 +1,75 @@
 import ast
 import random
-from copy import deepcopy
+from copy import copy
 
-import astor
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, point_random
 
 
 class RORMutator:
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
+        # The random replacement at a point only depends on the seed and the point
+        self.seed = seed
         self. n = n
         self.mutated_codes = []
-
-    class ROR(ast.NodeTransformer):
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-            self.operators = {
-                ast.Eq: [ast.NotEq(), ast.Lt(), ast.LtE(), ast.Gt(), ast.GtE()],
-                ast.NotEq: [ast.Eq(), ast.Lt(), ast.LtE(), ast.Gt(), ast.GtE()],
-                ast.Lt: [ast.Eq(), ast.NotEq(), ast.Gt(), ast.GtE()],
-                ast.LtE: [ast.Eq(), ast.NotEq(), ast.Gt(), ast.GtE()],
-                ast.Gt: [ast.Eq(), ast.NotEq(), ast.Lt, ast.LtE()],
-                ast.GtE: [ast.Eq(), ast.NotEq(), ast.Lt(), ast.LtE()],
-                ast.Is: [ast.IsNot],
-                ast.IsNot: [ast.Is],
-                ast.In: [ast.NotIn],
-                ast.NotIn: [ast.In],
-            }
-
-        def visit_Compare(self, node):
-            if len(node.ops) != 1:
-                return node
-
-            op = node.ops[0]
-            op_type = type(op)
-
-            if isinstance(op, ast.LtE) or \
-                    isinstance(op, ast.Lt) or \
-                    isinstance(op, ast.GtE) or \
-                    isinstance(op, ast.Gt) or \
-                    isinstance(op, ast.Eq) or \
-                    isinstance(op, ast.NotEq) or \
-                    isinstance(op, ast.Is) or \
-                    isinstance(op, ast.IsNot) or \
-                    isinstance(op, ast.In) or \
-                    isinstance(op, ast.NotIn):
-
-                self.current_index += 1
-                if self.current_index == self.target_index:
-                    replacements = self.operators[op_type]
-                    random_replacement = random.choice(replacements)
-                    node.ops = [random_replacement]
-
-            return node
+        self.mutants = []
+
+    # Relational operators and the operators they can be replaced with
+    operators = {
+        ast.Eq: [ast.NotEq(), ast.Lt(), ast.LtE(), ast.Gt(), ast.GtE()],
+        ast.NotEq: [ast.Eq(), ast.Lt(), ast.LtE(), ast.Gt(), ast.GtE()],
+        ast.Lt: [ast.Eq(), ast.NotEq(), ast.Gt(), ast.GtE()],
+        ast.LtE: [ast.Eq(), ast.NotEq(), ast.Gt(), ast.GtE()],
+        ast.Gt: [ast.Eq(), ast.NotEq(), ast.Lt(), ast.LtE()],
+        ast.GtE: [ast.Eq(), ast.NotEq(), ast.Lt(), ast.LtE()],
+        ast.Is: [ast.IsNot()],
+        ast.IsNot: [ast.Is()],
+        ast.In: [ast.NotIn()],
+        ast.NotIn: [ast.In()],
+    }
+
+    def variants(self, point):
+        return self.operators[type(point.node.ops[0])]
+
+    def mutate(self, point, variant=None):
+        node = copy(point.node)
+        if variant is None:
+            variant = point_random(self.seed, point).choice(self.variants(point))
+        node.ops = [variant]
+        return replace(point, node)
 
     def find_relation_operator(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.operators = []
-
-            def visit_Compare(self, node):
-                if len(node.ops) != 1:
-                    return node
-
-                op = node.ops[0]
+        relations = (ast.LtE, ast.Lt, ast.GtE, ast.Gt, ast.Eq, ast.NotEq, ast.Is, ast.IsNot, ast.In, ast.NotIn)
+        # Comparisons nested in another comparison are not visited
+        return [point for point in self.index.find(ast.Compare)
+                if len(point.node.ops) == 1 and isinstance(point.node.ops[0], relations)
+                and not point.inside(ast.Compare)]
 
-                if isinstance(op, ast.LtE) or \
-                        isinstance(op, ast.Lt) or \
-                        isinstance(op, ast.GtE) or \
-                        isinstance(op, ast.Gt) or \
-                        isinstance(op, ast.Eq) or \
-                        isinstance(op, ast.NotEq) or \
-                        isinstance(op, ast.Is) or \
-                        isinstance(op, ast.IsNot) or \
-                        isinstance(op, ast.In) or \
-                        isinstance(op, ast.NotIn):
+    def points(self):
+        return self.find_relation_operator()
 
-                    self.operators.append((
-                        type(op).__name__,
-                        node.lineno
-                    ))
-
-                return node
-
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.operators
-
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         operators = self.find_relation_operator()
 
         # Generate mutated codes
         for i in range(len(operators)):
             try:
-                # Deep copy the original tree
-                mutated_tree = deepcopy(self.tree)
-    
-                # Mutate the target statement
-                mutator = self.ROR(target_index=i)
-                mutator.visit(mutated_tree)
-    
-                # Fix the tree and convert back to code
-                ast.fix_missing_locations(mutated_tree)
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
+                # Copy only the nodes from the root to the mutated node
+                mutated_tree = self.mutate(operators[i])
             except:
-                pass
+                continue
+            yield Mutant('ROR', lineno=operators[i].lineno, tree=mutated_tree, original=self.tree)
+
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
@@ -1,7 +1,8 @@
 import ast
 import random
-from copy import deepcopy
-import astor
+from copy import copy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, located
 
 
 class SCDMutator:
@@ -9,82 +10,67 @@ class SCDMutator:
     A class to perform Single Conditional Deletion (SCD) mutation on a given AST.
     """
 
-    def __init__(self, tree, n=None):
+    def __init__(self, tree, n=None, index=None, seed=None):
         """
         Initialize the mutator.
 
         Args:
             tree: The AST tree of the code.
             n: The maximum number of mutations to apply. If None or float('inf'), mutate all possible conditions.
+            index: A MutationIndex of the tree, shared with the other operators. Built from the tree if None.
+            seed: Seed of the random choices of the operator. The same seed gives the same mutants.
         """
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
         self.n = float('inf') if n is None else n
         self.mutated_codes = []
+        self.mutants = []
 
-    class SingleSCDMutator(ast.NodeTransformer):
+    def mutate(self, point):
         """
-        A class to perform single Conditional Deletion (SCD) mutation.
+        Delete the condition from the target 'if' statement.
         """
-
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-
-        def visit_If(self, node):
-            """
-            Delete the condition from the target 'if' statement.
-            """
-            self.current_index += 1
-            if self.current_index == self.target_index:
-                # Remove the condition by replacing it with 'True'
-                node.test = ast.Constant(value=True)
-            return self.generic_visit(node)
+        node = copy(point.node)
+        # Remove the condition by replacing it with 'True'
+        node.test = located(ast.Constant(value=True), node.test)
+        return replace(point, node)
 
     def find_conditionals(self):
         """
         Identify all conditional statements in the AST.
         """
+        return self.index.find(ast.If)
 
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.conditionals = []
-
-            def visit_If(self, node):
-                self.conditionals.append(('if', node.lineno))
-                self.generic_visit(node)
-
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.conditionals
+    def points(self):
+        return self.find_conditionals()
 
-    def generate_mutated_codes(self):
+    def iter_mutants(self):
         """
-        Generate mutated versions of the code.
+        Yield the mutated versions of the code one at a time.
         """
-        self.mutated_codes = []
         conditionals = self.find_conditionals()
 
         random_indices = list(range(len(conditionals)))
-        random.shuffle(random_indices)
+        self.random.shuffle(random_indices)
 
         n = min(self.n, len(conditionals))  # Limit n to the total number of conditionals
         for i in random_indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(conditionals[i])
+            yield Mutant('SCD', lineno=conditionals[i].lineno, tree=mutated_tree, original=self.tree)
 
-            # Mutate the target conditional statement
-            mutator = self.SingleSCDMutator(target_index=i)
-            mutator.visit(mutated_tree)
-
-            # Fix the tree and convert back to code
-            ast.fix_missing_locations(mutated_tree)
-            try:
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
-            except:
-                pass
+    def generate_mutated_trees(self):
+        """
+        Generate mutated versions of the code.
+        """
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
 
 
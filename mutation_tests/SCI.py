@@ -1,98 +1,85 @@
 import ast
 import random
-from copy import deepcopy
-import astor
+from copy import copy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, located
+from mutation_tests.pruning import prune
 
 class SCIMutator:
     """
     A class to perform Single Conditional Inversion (SCI) mutation on a given AST.
     """
 
-    def __init__(self, tree, n=None):
+    def __init__(self, tree, n=None, index=None, seed=None):
         """
         Initialize the mutator.
 
         Args:
             tree: The AST tree of the code.
             n: The maximum number of mutations to apply. If None or float('inf'), mutate all possible conditions.
+            index: A MutationIndex of the tree, shared with the other operators. Built from the tree if None.
+            seed: Seed of the random choices of the operator. The same seed gives the same mutants.
         """
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
         self.n = float('inf') if n is None else n
         self.mutated_codes = []
+        self.mutants = []
+        # Conditions left out because mutate() can't invert them
+        self.pruned = 0
 
-    class SingleSCIMutator(ast.NodeTransformer):
+    # Inverse of the comparison operators that are inverted
+    inversions = {ast.Gt: ast.Lt, ast.Lt: ast.Gt, ast.Eq: ast.NotEq, ast.NotEq: ast.Eq}
+
+    def mutate(self, point):
         """
-        A class to perform single Conditional Inversion (SCI) mutation.
+        Invert the condition of the target 'if' statement.
         """
-
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-
-        def visit_If(self, node):
-            """
-            Invert the condition of the target 'if' statement.
-            """
-            self.current_index += 1
-            if self.current_index == self.target_index:
-                # Explicitly invert the condition
-                if isinstance(node.test, ast.Compare):
-                    # Handle basic comparisons (e.g., value > 10)
-                    if isinstance(node.test.ops[0], ast.Gt):  # value > 10
-                        node.test = ast.Compare(left=node.test.left, ops=[ast.Lt()], comparators=[node.test.comparators[0]])
-                    elif isinstance(node.test.ops[0], ast.Lt):  # value < 10
-                        node.test = ast.Compare(left=node.test.left, ops=[ast.Gt()], comparators=[node.test.comparators[0]])
-                    elif isinstance(node.test.ops[0], ast.Eq):  # value == 10
-                        node.test = ast.Compare(left=node.test.left, ops=[ast.NotEq()], comparators=[node.test.comparators[0]])
-                    elif isinstance(node.test.ops[0], ast.NotEq):  # value != 10
-                        node.test = ast.Compare(left=node.test.left, ops=[ast.Eq()], comparators=[node.test.comparators[0]])
-                # You can add more cases to handle complex conditions if needed.
-            return self.generic_visit(node)
+        node = copy(point.node)
+        # Handle basic comparisons (e.g., value > 10), other conditions are left as they are
+        if isinstance(node.test, ast.Compare) and type(node.test.ops[0]) in self.inversions:
+            inverted = self.inversions[type(node.test.ops[0])]
+            node.test = located(ast.Compare(left=node.test.left, ops=[inverted()],
+                                            comparators=[node.test.comparators[0]]), node.test)
+        return replace(point, node)
 
     def find_conditionals(self):
         """
-        Identify all conditional statements in the AST.
+        Identify all conditional statements in the AST whose condition can be inverted.
         """
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.conditionals = []
-
-            def visit_If(self, node):
-                self.conditionals.append(('if', node.lineno))
-                self.generic_visit(node)
+        return prune(self, self.index.find(ast.If), lambda point: isinstance(point.node.test, ast.Compare)
+                     and type(point.node.test.ops[0]) in self.inversions)
 
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.conditionals
+    def points(self):
+        return self.find_conditionals()
 
-    def generate_mutated_codes(self):
+    def iter_mutants(self):
         """
-        Generate mutated versions of the code.
+        Yield the mutated versions of the code one at a time.
         """
-        self.mutated_codes = []
         conditionals = self.find_conditionals()
 
         random_indices = list(range(len(conditionals)))
-        random.shuffle(random_indices)
+        self.random.shuffle(random_indices)
 
         n = min(self.n, len(conditionals))  # Limit n to the total number of conditionals
         for i in random_indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(conditionals[i])
+            yield Mutant('SCI', lineno=conditionals[i].lineno, tree=mutated_tree, original=self.tree)
 
-            # Mutate the target conditional statement
-            mutator = self.SingleSCIMutator(target_index=i)
-            mutator.visit(mutated_tree)
-
-            # Fix the tree and convert back to code
-            ast.fix_missing_locations(mutated_tree)
-            try:
-                mutated_code = astor.to_source(mutated_tree)
-                self.mutated_codes.append(mutated_code)
-            except:
-                pass
+    def generate_mutated_trees(self):
+        """
+        Generate mutated versions of the code.
+        """
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
 
 
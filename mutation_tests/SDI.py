@@ -1,7 +1,9 @@
 import ast
 import random
-from copy import deepcopy
-import astor  # For converting AST back to source code
+from copy import copy
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace, located
+from mutation_tests.pruning import prune, decorated
 
 
 class SDIMutator:
@@ -9,68 +11,54 @@ class SDIMutator:
     A class to perform Static Method Decorator Insertion (SDI) mutation on a given AST.
     """
 
-    def __init__(self, tree, n):
+    def __init__(self, tree, n, index=None, seed=None):
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
         self.n = float('inf') if n is None else n
         self.mutated_codes = []
+        self.mutants = []
+        # Methods left out because they are staticmethods already
+        self.pruned = 0
 
-    class SingleSDIMutator(ast.NodeTransformer):
-        """
-        A class to perform single Static Method Decorator Insertion (SDI) mutation.
-        """
-
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-
-        def visit_FunctionDef(self, node):
-            self.current_index += 1
-            if self.current_index == self.target_index:
-                # Inserting the @staticmethod decorator before the function definition
-                node.decorator_list.insert(0, ast.Name(id='staticmethod', ctx=ast.Load()))
-            return self.generic_visit(node)
+    def mutate(self, point):
+        # Inserting the @staticmethod decorator before the function definition
+        node = copy(point.node)
+        decorator = located(ast.Name(id='staticmethod', ctx=ast.Load()), node)
+        node.decorator_list = [decorator] + node.decorator_list
+        return replace(point, node)
 
     def find_methods(self):
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.methods = []
-
-            def visit_ClassDef(self, node):
-                # When we find a class, we visit its methods
-                for item in node.body:
-                    if isinstance(item, ast.FunctionDef):
-                        self.methods.append(item)
-                self.generic_visit(node)
-
-        # Traverse the AST to find all methods
-        finder = Finder()
-        finder.visit(self.tree)
+        # Functions defined directly in the body of a class
+        methods = [point for point in self.index.find(ast.FunctionDef)
+                   if isinstance(point.parent.node, ast.ClassDef) and point.field == 'body']
+        return prune(self, methods, lambda point: not decorated(point, 'staticmethod'))
 
-        return finder.methods
+    def points(self):
+        return self.find_methods()
 
-    def generate_mutated_codes(self):
-        self.mutated_codes = []
+    def iter_mutants(self):
+        # Every mutant is only built when it is asked for
         methods = self.find_methods()
 
         random_indices = list(range(len(methods)))
-        random.shuffle(random_indices)
+        self.random.shuffle(random_indices)
 
         n = min(self.n, len(methods))
         # Generate mutated versions
         for i in random_indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(methods[i])
+            yield Mutant('SDI', lineno=methods[i].lineno, tree=mutated_tree, original=self.tree)
 
-            # Mutate the target method by inserting @staticmethod
-            mutator = self.SingleSDIMutator(target_index=i)
-            mutator.visit(mutated_tree)
-
-            # Fix the tree and convert it back to source code
-            ast.fix_missing_locations(mutated_tree)
-            mutated_code = astor.to_source(mutated_tree)
-            self.mutated_codes.append(mutated_code)
+    def generate_mutated_trees(self):
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
 
 
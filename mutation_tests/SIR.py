@@ -1,7 +1,7 @@
 import ast
 import random
-from copy import deepcopy
-import astor
+from mutation_tests.mutant import Mutant, to_source
+from mutation_tests.mutation_index import MutationIndex, replace
 
 
 class SIRMutator:
@@ -9,93 +9,71 @@ class SIRMutator:
     A class to perform Statement Insertion Replacement (SIR) mutation on a given AST.
     """
 
-    def __init__(self, tree, n=None):
+    def __init__(self, tree, n=None, index=None, seed=None):
         """
         Initialize the mutator.
 
         :param tree: The AST of the code.
         :param n: The number of mutations to generate. If n is None or float('inf'), all possible mutations will be generated.
+        :param index: A MutationIndex of the tree, shared with the other operators. Built from the tree if None.
+        :param seed: Seed of the random choices of the operator. The same seed gives the same mutants.
         """
         self.tree = tree
+        self.index = MutationIndex(tree) if index is None else index
+        # Own generator, so the same seed always gives the same mutants
+        self.random = random.Random(seed)
         self.n = n
         self.mutated_codes = []
+        self.mutants = []
 
-    class SingleSIRMutator(ast.NodeTransformer):
+    def mutate(self, point):
         """
-        A class to perform single Statement Insertion Replacement (SIR) mutation.
+        Insert a statement before the target statement of a function body.
         """
-
-        def __init__(self, target_index):
-            super().__init__()
-            self.target_index = target_index
-            self.current_index = -1
-
-        def visit_FunctionDef(self, node):
-            """
-            Replace a randomly chosen statement within a function body.
-            """
-            new_node = deepcopy(node)
-            self.current_index = -1
-
-            def mutate_body(body):
-                mutated_body = []
-                for stmt in body:
-                    self.current_index += 1
-                    if self.current_index == self.target_index:
-                        # Replace the statement with a random insertion
-                        random_stmt = ast.parse("print('Mutated statement inserted')").body[0]
-                        mutated_body.append(random_stmt)
-                    mutated_body.append(stmt)
-                return mutated_body
-
-            new_node.body = mutate_body(node.body)
-            return new_node
+        inserted = ast.parse("print('Mutated statement inserted')").body[0]
+        for node in ast.walk(inserted):
+            ast.copy_location(node, point.node)
+        return replace(point, [inserted, point.node])
 
     def find_statements(self):
         """
         Collect all statements within functions to target for mutation.
         """
+        return [statement for point in self.index.find(ast.FunctionDef)
+                for statement in self.index.children(point, 'body')]
 
-        class Finder(ast.NodeVisitor):
-            def __init__(self):
-                self.statements = []
-
-            def visit_FunctionDef(self, node):
-                self.statements.extend(node.body)
-                self.generic_visit(node)
-
-        finder = Finder()
-        finder.visit(self.tree)
-        return finder.statements
+    def points(self):
+        return self.find_statements()
 
-    def generate_mutated_codes(self):
+    def iter_mutants(self):
         """
-        Generate mutated versions of the code.
+        Yield the mutated versions of the code one at a time.
         """
-        self.mutated_codes = []
         statements = self.find_statements()
 
         # Generate indices for all statements
         random_indices = list(range(len(statements)))
-        random.shuffle(random_indices)
+        self.random.shuffle(random_indices)
 
         # If n is infinite or None, consider all statements
         n = len(statements) if self.n is None or self.n == float('inf') else min(self.n, len(statements))
 
         # Generate mutated versions
         for i in random_indices[:n]:
-            # Deep copy the original tree
-            mutated_tree = deepcopy(self.tree)
+            # Copy only the nodes from the root to the mutated node
+            mutated_tree = self.mutate(statements[i])
+            yield Mutant('SIR', lineno=statements[i].lineno, tree=mutated_tree, original=self.tree)
 
-            # Mutate the target statement
-            mutator = self.SingleSIRMutator(target_index=i)
-            mutator.visit(mutated_tree)
-
-            # Fix the tree and convert back to code
-            ast.fix_missing_locations(mutated_tree)
-            mutated_code = astor.to_source(mutated_tree)
-            self.mutated_codes.append(mutated_code)
+    def generate_mutated_trees(self):
+        """
+        Generate mutated versions of the code.
+        """
+        self.mutants = list(self.iter_mutants())
+        return self.mutants
 
+    def generate_mutated_codes(self):
+        self.mutants = to_source(self.generate_mutated_trees())
+        self.mutated_codes = [mutant.code for mutant in self.mutants]
         return self.mutated_codes
 
 
@@ -0,0 +1,4 @@
+"""
+Mutation testing for Python modules, run with `python -m mutation_tests.mutator_framework`
+or the mutation-tests command.
+"""
@@ -0,0 +1,200 @@
+import os
+import ast
+import dis
+import sys
+import types
+import opcode
+
+# Instructions carry the columns of their expression from Python 3.11 on
+SUPPORTED = sys.version_info >= (3, 11)
+# Operands that can be evaluated and dropped without a side effect the mutant would not have
+PLAIN = (ast.Name, ast.Constant)
+
+
+def code_objects(code, path=()):
+    # Every code object of the module with the positions in co_consts that lead to it
+    yield path, code
+    for i, constant in enumerate(code.co_consts):
+        if isinstance(constant, types.CodeType):
+            yield from code_objects(constant, path + (i,))
+
+
+def change(original, mutated):
+    """
+    Follow the nodes the mutant copied down from the root and return
+    (node, value, replacement): `value`, a child of `node`, was replaced by
+    `replacement`. Returns None when more than one thing changed.
+    """
+    while True:
+        differing = [(value, getattr(mutated, field, None)) for field, value in ast.iter_fields(original)
+                     if getattr(mutated, field, None) is not value]
+        if len(differing) != 1:
+            return None
+        value, replacement = differing[0]
+        if isinstance(value, list):
+            if not isinstance(replacement, list) or len(value) != len(replacement):
+                return None
+            changed = [(a, b) for a, b in zip(value, replacement) if a is not b]
+            if len(changed) != 1:
+                return None
+            value, replacement = changed[0]
+        if type(value) is type(replacement) and isinstance(value, ast.AST) \
+                and not isinstance(value, (ast.operator, ast.cmpop)):
+            original, mutated = value, replacement
+            continue
+        return original, value, replacement
+
+
+class BytecodeEngine:
+    """
+    Build the mutants of expression operators by patching the compiled module
+    instead of compiling the mutated tree.
+
+    The module is compiled once. An instruction is found by the positions of
+    the expression it was compiled from, which are the positions of the mutated
+    node, so the mutants keep their operator and line. Four kinds of change are
+    patched:
+
+        a + b -> a - b, a < b -> a >= b   the argument of BINARY_OP, COMPARE_OP, IS_OP
+                                          or CONTAINS_OP (AOR, ROR, LOR)
+        a & b -> b, a + b -> a            the operation is replaced by SWAP/POP_TOP (LOD, AOD)
+        a < b -> True                     the comparison is replaced by POP_TOP and LOAD_CONST (COD)
+
+    The replaced instructions are padded with NOPs, so every jump, line and
+    exception table of the module stays valid. Every other mutant, and the ones
+    whose instructions can't be found (like folded constants), are compiled
+    from their code as before.
+    """
+
+    def __init__(self, source_file, tree):
+        self.tree = tree
+        self.code = compile(tree, os.path.abspath(source_file), 'exec')
+        # Positions of an expression -> [(path of the code object, instruction, size with its caches)]
+        self.instructions = {}
+        for path, code in code_objects(self.code):
+            instructions = list(dis.get_instructions(code))
+            ends = [instruction.offset for instruction in instructions[1:]] + [len(code.co_code)]
+            for instruction, end in zip(instructions, ends):
+                if instruction.positions is not None and instruction.positions.col_offset is not None:
+                    self.instructions.setdefault(tuple(instruction.positions), []).append(
+                        (path, instruction, end - instruction.offset))
+        self.probes = {}
+        self.patched = 0
+        self.compiled = 0
+
+    def probe(self, node, op):
+        """
+        Return the instruction `a <op> b` compiles to, like BINARY_OP 10 for
+        ast.Sub, for a BinOp or a Compare.
+        """
+        if op not in self.probes:
+            a, b = ast.Name(id='a', ctx=ast.Load()), ast.Name(id='b', ctx=ast.Load())
+            if isinstance(node, ast.BinOp):
+                expression = ast.BinOp(left=a, op=op(), right=b)
+            else:
+                expression = ast.Compare(left=a, ops=[op()], comparators=[b])
+            instructions = list(dis.get_instructions(
+                compile(ast.fix_missing_locations(ast.Expression(body=expression)), '<probe>', 'eval')))
+            last_load = max(i for i, instruction in enumerate(instructions) if instruction.opname == 'LOAD_NAME')
+            self.probes[op] = instructions[last_load + 1]
+        return self.probes[op]
+
+    def sites(self, node, op):
+        # The instructions of the operation of the node, more than one when the compiler copied it
+        if not hasattr(node, 'end_col_offset'):
+            return []
+        probe = self.probe(node, op)
+        positions = (node.lineno, node.end_lineno, node.col_offset, node.end_col_offset)
+        return [(path, instruction, size) for path, instruction, size in self.instructions.get(positions, [])
+                if instruction.opname == probe.opname and instruction.argval == probe.argval
+                and instruction.arg < 256]
+
+    def edits(self, node, value, replacement):
+        # [(path, offset, size, instructions as (opname, arg) pairs, constant)] that make the change
+        if isinstance(value, (ast.operator, ast.cmpop)):
+            if not isinstance(node, (ast.BinOp, ast.Compare)) or isinstance(node, ast.Compare) and len(node.ops) != 1:
+                return None
+            old, new = self.probe(node, type(value)), self.probe(node, type(replacement))
+            if old.opname != new.opname:
+                return None
+            # Bits of the argument that don't belong to the operator stay as they are
+            return [(path, instruction.offset, size, [(new.opname, new.arg ^ instruction.arg ^ old.arg)], None)
+                    for path, instruction, size in self.sites(node, type(value))]
+
+        if isinstance(value, ast.BinOp) and (replacement is value.left or replacement is value.right):
+            dropped = value.right if replacement is value.left else value.left
+            if not isinstance(dropped, PLAIN):
+                return None
+            # The operands are on the stack, left below right
+            units = [('POP_TOP', 0)] if replacement is value.left else [('SWAP', 2), ('POP_TOP', 0)]
+            return [(path, instruction.offset, size, units, None)
+                    for path, instruction, size in self.sites(value, type(value.op))]
+
+        if isinstance(value, ast.Compare) and isinstance(replacement, ast.Constant) \
+                and isinstance(replacement.value, bool) and len(value.ops) == 1:
+            if not all(isinstance(operand, PLAIN) for operand in [value.left] + value.comparators):
+                return None
+            return [(path, instruction.offset, size, [('POP_TOP', 0), ('POP_TOP', 0), ('LOAD_CONST', None)],
+                     replacement.value) for path, instruction, size in self.sites(value, type(value.ops[0]))]
+        return None
+
+    def patch(self, code, path, offsets):
+        # Rebuild the code objects from the patched one up to the module
+        if path:
+            constants = list(code.co_consts)
+            constants[path[0]] = self.patch(constants[path[0]], path[1:], offsets)
+            return code.replace(co_consts=tuple(constants))
+
+        constants = list(code.co_consts)
+        raw = bytearray(code.co_code)
+        for offset, size, units, constant in offsets:
+            if constant is not None:
+                # 1 == True, so the constant is looked up by identity
+                index = next((i for i, value in enumerate(constants) if value is constant), None)
+                if index is None:
+                    index = len(constants)
+                    constants.append(constant)
+                units = [(name, index if name == 'LOAD_CONST' else arg) for name, arg in units]
+            if len(units) * 2 > size or any(arg > 255 for _, arg in units):
+                raise ValueError("The instructions don't fit")
+            units = units + [('NOP', 0)] * (size // 2 - len(units))
+            raw[offset:offset + size] = bytes(byte for name, arg in units for byte in (opcode.opmap[name], arg))
+        return code.replace(co_code=bytes(raw), co_consts=tuple(constants))
+
+    def compile(self, mutant):
+        """
+        Return the code object of the mutant, None when it has to be compiled from its code.
+        """
+        if mutant.tree is None:
+            return None
+        found = change(self.tree, mutant.tree)
+        if found is None:
+            return None
+        edits = self.edits(*found)
+        if not edits:
+            return None
+
+        grouped = {}
+        for path, offset, size, units, constant in edits:
+            grouped.setdefault(path, []).append((offset, size, units, constant))
+        code = self.code
+        try:
+            for path, offsets in grouped.items():
+                code = self.patch(code, path, offsets)
+        except ValueError:
+            return None
+        return code
+
+    def attach(self, generated):
+        # Give every mutant the engine can build its code object, as it is generated
+        for mutator, mutants in generated:
+            yield mutator, self.attached(mutants)
+
+    def attached(self, mutants):
+        for mutant in mutants:
+            mutant.code_object = self.compile(mutant)
+            if mutant.code_object is None:
+                self.compiled += 1
+            else:
+                self.patched += 1
+            yield mutant
@@ -0,0 +1,84 @@
+import types
+import hashlib
+from mutation_tests.outcomes import EQUIVALENT, DUPLICATE
+
+
+def normalize(code_object):
+    """
+    Turn a code object into nested tuples that hold everything but its position.
+
+    Line numbers, the line table and the file name are left out, so a mutant that
+    only moves code around (or compiles to the same instructions) normalizes to the
+    same value as the original. Constants keep their type, because 1, 1.0 and True
+    are equal in Python but compile to different programs.
+    """
+    constants = tuple(
+        normalize(constant) if isinstance(constant, types.CodeType) else (type(constant).__name__, repr(constant))
+        for constant in code_object.co_consts
+    )
+    return (
+        code_object.co_name,
+        code_object.co_code,
+        constants,
+        code_object.co_names,
+        code_object.co_varnames,
+        code_object.co_freevars,
+        code_object.co_cellvars,
+        code_object.co_argcount,
+        code_object.co_posonlyargcount,
+        code_object.co_kwonlyargcount,
+        code_object.co_flags,
+        getattr(code_object, 'co_exceptiontable', b''),
+    )
+
+
+def code_hash(code_object):
+    return hashlib.sha256(repr(normalize(code_object)).encode()).hexdigest()
+
+
+class EquivalenceFilter:
+    """
+    Trivial compiler equivalence: drop mutants that compile to the same bytecode
+    as the original code (equivalent) or as a mutant seen before (duplicate).
+    """
+
+    def __init__(self, original_code):
+        self.original = code_hash(compile(original_code, '<mutant>', 'exec'))
+        # Hash of every mutant seen so far, with the operator and line of the first one
+        self.seen = {}
+        self.equivalent = 0
+        self.duplicate = 0
+
+    def check(self, mutant):
+        """
+        Return the (outcome, output) the mutant gets without running it, or None
+        when it has to run.
+        """
+        try:
+            code_object = mutant.code_object
+            if code_object is None:
+                code_object = compile(mutant.tree if mutant.tree is not None else mutant.code, '<mutant>', 'exec')
+            digest = code_hash(code_object)
+        except Exception:
+            # Mutants that don't compile are left to the runners
+            return None
+
+        if digest == self.original:
+            self.equivalent += 1
+            return EQUIVALENT, "Same bytecode as the original code"
+        if digest in self.seen:
+            self.duplicate += 1
+            operator, lineno = self.seen[digest]
+            return DUPLICATE, f"Same bytecode as the {operator} mutant on line {lineno}"
+        self.seen[digest] = (mutant.operator, mutant.lineno)
+        return None
+
+    def filter(self, generated):
+        # Mark the mutants of every operator as they are generated
+        for mutator, mutants in generated:
+            yield mutator, self.marked(mutants)
+
+    def marked(self, mutants):
+        for mutant in mutants:
+            mutant.result = self.check(mutant)
+            yield mutant
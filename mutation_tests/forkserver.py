@@ -0,0 +1,231 @@
+import io
+import os
+import gc
+import ast
+import sys
+import math
+import time
+import pickle
+import signal
+import importlib
+import selectors
+from itertools import islice
+from collections import deque
+from mutation_tests.outcomes import KILLED, TIMEOUT
+from mutation_tests.runners import InProcessRunner
+from mutation_tests.schemata import SchemataRunner
+
+
+def exit_code(status):
+    # The exit code of a wait status, minus the signal that ended the process (os.waitstatus_to_exitcode needs 3.9)
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class Worker:
+    """
+    A forked child together with its batch of (index, task) pairs and the results read so far.
+    """
+
+    def __init__(self, pid, fd, batch):
+        self.pid = pid
+        self.fd = fd
+        self.batch = batch
+        self.data = bytearray()
+        self.last_progress = time.monotonic()
+        self.timed_out = False
+
+
+class ForkServer:
+    """
+    Run mutants in copy-on-write children of a pre-warmed zygote process.
+
+    The zygote (the framework process itself) imports the dependencies of the test
+    file and of the target module once, then freezes the garbage collector so the
+    imported objects stay shared with the children. Every child gets a batch of
+    mutants, swaps in each mutated target module with the in-process runner and
+    streams the results back through a pipe. A child exits after `recycle_after`
+    mutants and a fresh one is forked from the zygote, so memory growth is bounded.
+    """
+
+    # Seconds a child may go quiet after the mutant timeout before it is killed
+    kill_grace = 1.0
+
+    def __init__(self, source_file, test_file, jobs=1, recycle_after=50, timeout=None, schema=None):
+        if not hasattr(os, 'fork'):
+            raise RuntimeError("The forkserver backend needs os.fork")
+        self.runner = InProcessRunner(source_file, test_file, timeout=timeout)
+        # In schemata mode the children get schema ids instead of code
+        self.schemata = None if schema is None else SchemataRunner(self.runner, schema)
+        self.jobs = max(1, jobs)
+        self.recycle_after = max(1, recycle_after)
+        self.preload()
+
+    def find_imports(self, path):
+        with open(path, 'r') as f:
+            tree = ast.parse(f.read())
+
+        names = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names.append(node.module)
+        return names
+
+    def preload(self):
+        saved_path = list(sys.path)
+        sys.path[:0] = self.runner.search_paths
+        try:
+            for name in self.find_imports(self.runner.test_file) + self.find_imports(self.runner.source_file):
+                if name.split('.')[0] == self.runner.module_name or name in sys.modules:
+                    continue
+                try:
+                    module = importlib.import_module(name)
+                except Exception:
+                    continue
+                # Project modules may import the target module, they are imported again for every mutant
+                if self.runner.is_project_module(module):
+                    del sys.modules[name]
+        finally:
+            sys.path[:] = saved_path
+
+        # The schema is compiled and imported once, every child shares it
+        if self.schemata is not None:
+            self.schemata.load()
+
+        # Keep everything imported so far out of the collector, so children don't touch (and copy) it
+        gc.collect()
+        gc.freeze()
+
+    def spawn(self, batch):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # Child: run the batch and report every result as soon as it is known
+            status = 0
+            try:
+                # Own process group, so a hanging child and anything it started can be killed together
+                os.setpgid(0, 0)
+                os.close(read_fd)
+                with os.fdopen(write_fd, 'wb') as out:
+                    runner = self.runner if self.schemata is None else self.schemata
+                    for index, task in batch:
+                        pickle.dump((index, runner.run(*task)), out)
+                        out.flush()
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+
+        # Also set the group from the parent, in case the child has not done it yet
+        try:
+            os.setpgid(pid, pid)
+        except OSError:
+            pass
+        os.close(write_fd)
+        return Worker(pid, read_fd, batch)
+
+    def collect(self, worker, results, retries):
+        _, status = os.waitpid(worker.pid, 0)
+
+        stream = io.BytesIO(bytes(worker.data))
+        while True:
+            try:
+                index, result = pickle.load(stream)
+            except Exception:
+                break
+            results[index] = result
+
+        missing = [(index, task) for index, task in worker.batch if index not in results]
+        if missing:
+            # The child died while running the first missing mutant, the rest is run again
+            if worker.timed_out:
+                results[missing[0][0]] = (TIMEOUT, f"Timed out after {self.runner.timeout:.2f} seconds")
+            else:
+                results[missing[0][0]] = (KILLED, f"Worker exited with status {exit_code(status)}")
+            if missing[1:]:
+                retries.append(missing[1:])
+
+    def batches(self, tasks):
+        """
+        Cut the tasks into batches of (index, task) pairs, reading the tasks only as
+        far as needed to fill the next batch.
+
+        The mutants are spread over the workers, but a worker never gets more than
+        recycle_after. Only jobs * recycle_after tasks are read ahead to choose the size.
+        """
+        tasks = enumerate(tasks)
+        ahead = list(islice(tasks, self.jobs * self.recycle_after))
+        size = min(self.recycle_after, max(1, math.ceil(len(ahead) / self.jobs)))
+        for i in range(0, len(ahead), size):
+            yield ahead[i:i + size]
+        while True:
+            batch = list(islice(tasks, size))
+            if not batch:
+                return
+            yield batch
+
+    def run_mutants(self, tasks):
+        # Every task is a (code or schema id, tests) pair, results are yielded in the same order
+        batches = self.batches(tasks)
+        # Results that came in before the results of earlier tasks, by index
+        results = {}
+        following = 0
+        # Rest of the batches of children that died
+        retries = deque()
+
+        # The children stop timed out mutants themselves, this only catches children that don't respond
+        deadline = None if self.runner.timeout is None else self.runner.timeout + self.kill_grace
+
+        selector = selectors.DefaultSelector()
+        while True:
+            while len(selector.get_map()) < self.jobs:
+                batch = retries.popleft() if retries else next(batches, None)
+                if batch is None:
+                    break
+                worker = self.spawn(batch)
+                selector.register(worker.fd, selectors.EVENT_READ, worker)
+            if not selector.get_map():
+                break
+
+            for key, _ in selector.select(deadline):
+                worker = key.data
+                chunk = os.read(worker.fd, 65536)
+                if chunk:
+                    worker.data.extend(chunk)
+                    worker.last_progress = time.monotonic()
+                    continue
+
+                # End of file, the child is done with its batch
+                selector.unregister(worker.fd)
+                os.close(worker.fd)
+                self.collect(worker, results, retries)
+
+            while following in results:
+                yield results.pop(following)
+                following += 1
+
+            if deadline is None:
+                continue
+            for key in list(selector.get_map().values()):
+                worker = key.data
+                if time.monotonic() - worker.last_progress > deadline:
+                    # Kill the stuck child, its end of file is picked up by the next select
+                    worker.timed_out = True
+                    try:
+                        os.killpg(worker.pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+
+        selector.close()
+
+    def close(self):
+        gc.unfreeze()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,153 @@
+import ast
+import random
+import hashlib
+from copy import copy
+from mutation_tests.mutant import Mutant
+
+FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+# How the first-order mutants are put together
+STRATEGIES = ['random', 'closest', 'different-operator']
+
+
+class Conflict(Exception):
+    """
+    Two mutants change the same node, they can't be applied together.
+    """
+
+
+def edited_range(original, mutated):
+    # original[start:end] was replaced by `items` to get the mutated list
+    shortest = min(len(original), len(mutated))
+    start = 0
+    while start < shortest and mutated[start] is original[start]:
+        start += 1
+    suffix = 0
+    while suffix < shortest - start and mutated[-1 - suffix] is original[-1 - suffix]:
+        suffix += 1
+    return start, len(original) - suffix, mutated[start:len(mutated) - suffix]
+
+
+def merge(original, a, b):
+    """
+    Combine two mutated copies of `original` into one that has the changes of both.
+
+    Mutants share every subtree they don't change with the original tree, so only
+    the nodes both of them copied are merged, the rest is shared again. Raises
+    Conflict when both change the same node.
+    """
+    if a is original or not isinstance(original, (ast.AST, list)) and a == original:
+        return b
+    if b is original or not isinstance(original, (ast.AST, list)) and b == original:
+        return a
+    if isinstance(original, list) and isinstance(a, list) and isinstance(b, list):
+        return merge_lists(original, a, b)
+    if isinstance(original, ast.AST) and type(a) is type(original) and type(b) is type(original):
+        node = copy(original)
+        for field, value in ast.iter_fields(original):
+            setattr(node, field, merge(value, getattr(a, field, None), getattr(b, field, None)))
+        return node
+    raise Conflict()
+
+
+def merge_lists(original, a, b):
+    edits = sorted([edited_range(original, a), edited_range(original, b)], key=lambda edit: edit[:2])
+    (a_start, a_end, a_items), (b_start, b_end, b_items) = edits
+    if (a_start, a_end) == (b_start, b_end) and a_end - a_start == 1 and len(a_items) == len(b_items) == 1:
+        # Both changed something inside the same item
+        return original[:a_start] + [merge(original[a_start], a_items[0], b_items[0])] + original[a_end:]
+    if a_end > b_start or (a_start, a_end) == (b_start, b_end):
+        raise Conflict()
+    return original[:a_start] + a_items + original[a_end:b_start] + b_items + original[b_end:]
+
+
+def mutated_function(original, mutated):
+    """
+    Return the innermost function of the original tree that holds the change of
+    the mutant, None for changes outside of any function.
+    """
+    function = None
+    node, mutated_node = original, mutated
+    while node is not None:
+        if isinstance(node, FUNCTIONS):
+            function = node
+        step = None
+        for field, value in ast.iter_fields(node):
+            mutated_value = getattr(mutated_node, field, None)
+            if mutated_value is value:
+                continue
+            if step is not None:
+                # More than one field changed, the change is this node
+                return function
+            if isinstance(value, ast.AST) and type(mutated_value) is type(value):
+                step = value, mutated_value
+            elif isinstance(value, list) and isinstance(mutated_value, list):
+                start, end, items = edited_range(value, mutated_value)
+                if end - start != 1 or len(items) != 1 or type(items[0]) is not type(value[start]):
+                    return function
+                step = value[start], items[0]
+            else:
+                return function
+        node, mutated_node = step if step is not None else (None, None)
+    return function
+
+
+class HigherOrderMutant(Mutant):
+    """
+    First-order mutants of different functions applied to the module together.
+
+    When the tests kill it, every part counts as killed, which saves running the
+    parts one by one. A part the tests would miss on its own can be hidden that
+    way, so the score is an estimate. When it survives, none of the parts was
+    detected and they run on their own.
+    """
+
+    def __init__(self, parts, tree):
+        super().__init__('+'.join(part.operator for part in parts), lineno=parts[0].lineno, tree=tree)
+        self.parts = parts
+        self.id = hashlib.sha256('\n'.join(part.id or '' for part in parts).encode()).hexdigest()[:16]
+
+
+def combine(tree, mutants, order=2, strategy='random', rng=None):
+    """
+    Put the first-order mutants of `tree` together into higher-order mutants of up
+    to `order` parts, each part in another function.
+
+    'random' combines them in random order, 'closest' combines the mutants closest
+    to each other in the code and 'different-operator' also needs every part to
+    come from another operator. Mutants that find no partner are not part of any
+    higher-order mutant, they run as they are.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown pairing strategy: {strategy}")
+    rng = rng or random.Random()
+    mutants = list(mutants)
+    if strategy == 'closest':
+        mutants.sort(key=lambda mutant: mutant.lineno or 0)
+    else:
+        rng.shuffle(mutants)
+
+    # Groups still taking parts, as [parts, functions, operators, tree]
+    groups = []
+    done = []
+    for mutant in mutants:
+        function = mutated_function(tree, mutant.tree)
+        # The closest mutant is at the end of the open groups
+        for group in (reversed(groups) if strategy == 'closest' else groups):
+            parts, functions, operators, merged = group
+            if function in functions or strategy == 'different-operator' and mutant.operator in operators:
+                continue
+            try:
+                group[3] = merge(tree, merged, mutant.tree)
+            except Conflict:
+                continue
+            parts.append(mutant)
+            functions.append(function)
+            operators.add(mutant.operator)
+            if len(parts) == order:
+                groups.remove(group)
+                done.append(group)
+            break
+        else:
+            groups.append([[mutant], [function], {mutant.operator}, mutant.tree])
+
+    return [HigherOrderMutant(parts, merged) for parts, _, _, merged in done + groups if len(parts) > 1]
@@ -0,0 +1,117 @@
+import os
+import ast
+import json
+import hashlib
+from mutation_tests.outcomes import UNSCORED
+
+UNITS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+# Name of the unit that holds the module level statements
+MODULE = '<module>'
+# Reported as changed when the test file changed
+TESTS = '<tests>'
+
+
+def digest(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def unit_hashes(tree):
+    """
+    Hash every top level function and class of the module, and all other module
+    level statements together. Positions are left out of the dump, so moving a
+    unit around does not change its hash.
+    """
+    hashes = {}
+    module = []
+    for node in tree.body:
+        if isinstance(node, UNITS):
+            hashes[node.name] = digest(ast.dump(node))
+        else:
+            module.append(ast.dump(node))
+    hashes[MODULE] = digest('\n'.join(module))
+    return hashes
+
+
+def mutated_unit(tree, mutated):
+    """
+    Return the name of the unit changed by the mutant and the dump of its mutated
+    version, or (MODULE, dump of the whole mutated module) when that is not one unit.
+    """
+    if len(tree.body) == len(mutated.body):
+        # Unchanged statements are shared with the original tree
+        changed = [i for i, (a, b) in enumerate(zip(tree.body, mutated.body))
+                   if a is not b and ast.dump(a) != ast.dump(b)]
+        if len(changed) == 1:
+            node = tree.body[changed[0]]
+            if isinstance(node, UNITS):
+                return node.name, ast.dump(mutated.body[changed[0]])
+    return MODULE, ast.dump(mutated)
+
+
+def mutant_key(tree, units, mutant):
+    # The hash of the unit the mutant is in, its operator and the mutated unit
+    unit, mutated = mutated_unit(tree, mutant.tree)
+    return digest('\n'.join([units[unit], mutant.operator, mutated]))
+
+
+class ResultCache:
+    """
+    Mutant results of earlier runs, kept in a JSON file and keyed by the content
+    hash of the top level function or class the mutant is in.
+
+    A mutant is only run again when its unit changed. When the test file or the
+    module level statements changed, every mutant is run again.
+    """
+
+    def __init__(self, path, source_file, test_file, tree):
+        self.path = path
+        self.source_file = os.path.abspath(source_file)
+        self.tree = tree
+        self.units = unit_hashes(tree)
+        with open(test_file, 'r') as f:
+            self.tests = digest(f.read())
+
+        self.entries = {}
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+        previous = self.entries.get(self.source_file, {})
+        if previous.get('tests') != self.tests or previous.get('units', {}).get(MODULE) != self.units[MODULE]:
+            self.previous = {}
+        else:
+            self.previous = previous.get('results', {})
+        self.changed = sorted(name for name, value in self.units.items()
+                              if previous.get('units', {}).get(name) != value)
+        if previous.get('tests') != self.tests:
+            self.changed.append(TESTS)
+        self.results = {}
+        self.loaded = 0
+
+    def load(self, generated):
+        # Give the mutants of unchanged units their result of the previous run
+        for mutator, mutants in generated:
+            yield mutator, self.loaded_mutants(mutants)
+
+    def loaded_mutants(self, mutants):
+        for mutant in mutants:
+            if mutant.result is None and mutant.tree is not None:
+                mutant.key = mutant_key(self.tree, self.units, mutant)
+                if mutant.key in self.previous:
+                    mutant.result = tuple(self.previous[mutant.key])
+                    self.loaded += 1
+            yield mutant
+
+    def store(self, mutant, result):
+        outcome, output = result
+        if mutant.key is not None and outcome not in UNSCORED:
+            self.results[mutant.key] = [outcome, output]
+
+    def save(self):
+        # Only the results of this run are kept, the ones of changed units are dropped
+        self.entries[self.source_file] = {'tests': self.tests, 'units': self.units, 'results': self.results}
+        with open(self.path, 'w') as f:
+            json.dump(self.entries, f)
@@ -0,0 +1,127 @@
+import io
+import sys
+import unittest
+from contextlib import redirect_stdout, redirect_stderr
+
+
+class LineTracer:
+    """
+    Record the executed lines of a single file.
+
+    Uses sys.monitoring on Python 3.12+ and falls back to sys.settrace.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.lines = set()
+        self.tool_id = None
+
+    def on_line(self, code, line_number):
+        if code.co_filename != self.filename:
+            # Never report lines of this code object again
+            return sys.monitoring.DISABLE
+        self.lines.add(line_number)
+
+    def trace(self, frame, event, arg):
+        if frame.f_code.co_filename == self.filename:
+            return self.trace_lines
+        return None
+
+    def trace_lines(self, frame, event, arg):
+        if event == 'line':
+            self.lines.add(frame.f_lineno)
+        return self.trace_lines
+
+    def start(self):
+        if hasattr(sys, 'monitoring'):
+            for tool_id in range(sys.monitoring.COVERAGE_ID, sys.monitoring.OPTIMIZER_ID + 1):
+                if sys.monitoring.get_tool(tool_id) is None:
+                    self.tool_id = tool_id
+                    break
+
+        if self.tool_id is None:
+            sys.settrace(self.trace)
+            return
+
+        sys.monitoring.use_tool_id(self.tool_id, 'mutation-coverage')
+        sys.monitoring.register_callback(self.tool_id, sys.monitoring.events.LINE, self.on_line)
+        sys.monitoring.set_events(self.tool_id, sys.monitoring.events.LINE)
+
+    def stop(self):
+        if self.tool_id is None:
+            sys.settrace(None)
+            return
+
+        sys.monitoring.set_events(self.tool_id, sys.monitoring.events.NO_EVENTS)
+        sys.monitoring.register_callback(self.tool_id, sys.monitoring.events.LINE, None)
+        sys.monitoring.free_tool_id(self.tool_id)
+        self.tool_id = None
+
+
+class CoverageResult(unittest.TestResult):
+    """
+    A test result that hands the lines executed by every test to the coverage index.
+    """
+
+    def __init__(self, index, tracer):
+        super().__init__()
+        self.index = index
+        self.tracer = tracer
+
+    def startTest(self, test):
+        # Lines run between tests (fixtures) are needed by every test
+        self.index.shared_lines.update(self.tracer.lines)
+        self.tracer.lines = set()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        # Test ids look like module.Class.method, unittest takes Class.method as test name
+        name = test.id().split('.', 1)[1]
+        self.index.tests.append(name)
+        for line in self.tracer.lines:
+            self.index.lines.setdefault(line, set()).add(name)
+        self.tracer.lines = set()
+
+
+class CoverageIndex:
+    """
+    Map every line of the target module to the tests that execute it.
+
+    The unmutated module is imported and its tests are run once in the current
+    process with a line tracer. Lines executed while importing the module or
+    outside of a test are needed by every test.
+    """
+
+    def __init__(self, runner):
+        # An InProcessRunner for the target module and its test file
+        self.runner = runner
+        self.tests = []
+        self.lines = {}
+        self.shared_lines = set()
+
+    def collect(self):
+        with open(self.runner.source_file, 'r') as f:
+            code_object = self.runner.compile(f.read())
+
+        tracer = LineTracer(self.runner.source_file)
+        stream = io.StringIO()
+        tracer.start()
+        try:
+            with redirect_stdout(stream), redirect_stderr(stream):
+                module = self.runner.load_module(code_object)
+                with self.runner.installed(module):
+                    self.runner.load_tests().run(CoverageResult(self, tracer))
+        finally:
+            tracer.stop()
+        self.shared_lines.update(tracer.lines)
+        return self
+
+    def tests_for(self, lineno):
+        """
+        Return the names of the tests to run for a mutant on the given line,
+        None when all tests have to run and an empty list when no test covers it.
+        """
+        if lineno is None or lineno in self.shared_lines:
+            return None
+        return sorted(self.lines.get(lineno, ()))
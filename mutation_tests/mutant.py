@@ -0,0 +1,99 @@
+import hashlib
+from mutation_tests import unparse
+from mutation_tests.mutation_index import difference
+
+
+class Mutant:
+    """
+    A single mutant produced by one of the mutation operators.
+    """
+
+    def __init__(self, operator, lineno=None, tree=None, code=None, original=None):
+        self.operator = operator
+        # Line of the mutated node in the original code, None if nothing was mutated
+        self.lineno = lineno
+        # Mutated AST of the whole module
+        self.tree = tree
+        # Source code of the whole mutated module
+        self.code = code
+        # Compiled module, patched by the bytecode engine or compiled from the tree for the in-process backends
+        self.code_object = None
+        # Id of the mutant in the schema of the schemata mode, None if it runs as code
+        self.schema_id = None
+        # (outcome, output) known without running the mutant: equivalent, duplicate or cached
+        self.result = None
+        # Key of the mutant in the result cache of the incremental mode
+        self.key = None
+        # Number of mutants this one stands for when only a sample of the mutants runs
+        self.weight = 1
+        # The result was taken from a higher-order mutant this one is part of, it didn't run on its own
+        self.estimated = False
+        # Stable id, the same in every run that makes this change to the original tree
+        self.id = None if original is None or tree is None else mutant_id(operator, original, tree)
+
+    def get_code(self, splicer=None):
+        # Only unparse the tree when the source is needed
+        if self.code is None:
+            if splicer is None:
+                self.code = unparse.to_source(self.tree)
+            else:
+                # Only the mutated part of the original code is replaced
+                self.code = splicer.to_source(self.tree)
+        return self.code
+
+    def __repr__(self):
+        return f"Mutant({self.operator}, line {self.lineno})"
+
+
+def mutant_id(operator, original, mutated):
+    """
+    Hash the operator, the path of the mutated node and its replacement. The id
+    only depends on the change itself, not on the order mutants are generated in.
+    """
+    path, replacement = difference(original, mutated)
+    return hashlib.sha256('\n'.join([operator, path, replacement]).encode()).hexdigest()[:16]
+
+
+def iter_source(mutants, splicer=None):
+    """
+    Convert the trees of the mutants back to code one at a time, dropping the mutants that can't be converted.
+
+    Mutants with a known result, mutants in the schema and mutants with a code
+    object are kept as they are. With a splicer the code is built from the original code, else the whole tree is unparsed.
+    """
+    for mutant in mutants:
+        if mutant.result is not None or mutant.schema_id is not None or mutant.code_object is not None:
+            yield mutant
+            continue
+        try:
+            mutant.get_code(splicer)
+        except:
+            continue
+        # The tree is not needed anymore once the code is known
+        mutant.tree = None
+        yield mutant
+
+
+def iter_compiled(mutants, filename, splicer=None):
+    """
+    Compile the trees of the mutants straight to code objects, one at a time, for
+    the backends that run the mutants in-process.
+
+    The tree is kept, only the mutants that are logged are converted to code. A
+    tree that doesn't compile is converted to code anyway, its code is found
+    incompetent like the code of any other mutant.
+    """
+    for mutant in mutants:
+        if mutant.result is not None or mutant.schema_id is not None or mutant.code_object is not None:
+            yield mutant
+            continue
+        try:
+            mutant.code_object = compile(mutant.tree, filename, 'exec')
+        except Exception:
+            yield from iter_source([mutant], splicer)
+            continue
+        yield mutant
+
+
+def to_source(mutants, splicer=None):
+    return list(iter_source(mutants, splicer))
@@ -0,0 +1,237 @@
+import ast
+import heapq
+import random
+from copy import copy
+
+# Operators and contexts are shared between nodes by the parser, they are reached through their parent
+SHARED = (ast.expr_context, ast.boolop, ast.operator, ast.unaryop, ast.cmpop)
+
+
+class MutationPoint:
+    """
+    A node of the tree together with where it hangs: its parent, the field of the
+    parent that holds it and its position in that field (None if the field is not a list).
+    """
+
+    __slots__ = ('node', 'parent', 'field', 'position', 'order')
+
+    def __init__(self, node, parent, field, position, order):
+        self.node = node
+        # The MutationPoint of the parent, None for the root
+        self.parent = parent
+        self.field = field
+        self.position = position
+        # Position of the node in the visiting order of ast.NodeVisitor
+        self.order = order
+
+    @property
+    def lineno(self):
+        return getattr(self.node, 'lineno', None)
+
+    def path(self):
+        # Fields and positions from the root down to the node, like 'body[2].value', as in the ids of the mutants
+        parts = []
+        point = self
+        while point.parent is not None:
+            parts.append(point.field if point.position is None else f"{point.field}[{point.position}]")
+            point = point.parent
+        return '.'.join(reversed(parts))
+
+    def ancestors(self):
+        point = self.parent
+        while point is not None:
+            yield point
+            point = point.parent
+
+    def enclosing(self, *types):
+        # The nearest ancestor of one of the given types, None if there is none
+        for point in self.ancestors():
+            if isinstance(point.node, types):
+                return point
+        return None
+
+    def inside(self, *types):
+        # True when one of the ancestors of the node is of one of the given types
+        return any(isinstance(point.node, types) for point in self.ancestors())
+
+    def __repr__(self):
+        return f"MutationPoint({type(self.node).__name__}, line {self.lineno})"
+
+
+class MutationIndex:
+    """
+    Every node of a tree by type, collected in a single pass.
+
+    The nodes are visited in the same order as ast.NodeVisitor and
+    ast.NodeTransformer visit them, so the n-th point of a type is the n-th node
+    a transformer for that type sees. All mutation operators query the same
+    index instead of walking the tree with a finder of their own.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.root = MutationPoint(tree, None, None, None, 0)
+        # Node type -> points of that type in visiting order
+        self.points = {}
+        # id of a node -> its point
+        self.nodes = {}
+
+        # Depth first, children in field order: the order of generic_visit
+        order = 0
+        stack = [self.root]
+        while stack:
+            point = stack.pop()
+            point.order = order
+            order += 1
+            self.points.setdefault(type(point.node), []).append(point)
+            self.nodes[id(point.node)] = point
+
+            children = []
+            for field, value in ast.iter_fields(point.node):
+                if isinstance(value, list):
+                    for position, item in enumerate(value):
+                        if isinstance(item, ast.AST) and not isinstance(item, SHARED):
+                            children.append(MutationPoint(item, point, field, position, None))
+                elif isinstance(value, ast.AST) and not isinstance(value, SHARED):
+                    children.append(MutationPoint(value, point, field, None, None))
+            stack.extend(reversed(children))
+
+    def __getstate__(self):
+        # Nodes get other ids when the index is unpickled, the map is built again from the points
+        state = dict(self.__dict__)
+        del state['nodes']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.nodes = {id(point.node): point for points in self.points.values() for point in points}
+
+    def find(self, *types):
+        """
+        Return the points of the nodes of the given types in visiting order.
+        """
+        lists = [self.points.get(node_type, []) for node_type in types]
+        if len(lists) == 1:
+            return list(lists[0])
+        return list(heapq.merge(*lists, key=lambda point: point.order))
+
+    def point(self, node):
+        return self.nodes[id(node)]
+
+    def children(self, point, field):
+        # Points of the nodes in a list field of the node, like the statements of a body
+        return [self.nodes[id(node)] for node in getattr(point.node, field)
+                if isinstance(node, ast.AST) and not isinstance(node, SHARED)]
+
+
+def point_random(seed, point):
+    """
+    Return the generator of the random choices an operator makes at a point,
+    seeded by the seed of the operator and the path of the point. A replacement
+    only depends on where it is made, so editing one function doesn't change
+    the mutants of the others. Without a seed the choices differ in every run.
+    """
+    return random.Random(None if seed is None else f"{seed}:{point.path()}")
+
+
+def located(node, original):
+    """
+    Give a new node the position of the node it replaces, and its new children
+    the position of their parent.
+    """
+    ast.copy_location(node, original)
+    return ast.fix_missing_locations(node)
+
+
+def replace(point, replacement):
+    """
+    Return a new tree in which the node of `point` is replaced by `replacement`.
+
+    Only the nodes on the path from the root to the point are copied, every other
+    subtree is shared with the original tree, so the original is never modified
+    and building a mutant costs O(depth) instead of a copy of the whole tree.
+
+    For a node in a list field, `replacement` may also be a list of nodes that
+    takes its place: empty to delete it, or several nodes to insert some. A body
+    that would end up empty gets a `pass`.
+    """
+    node = replacement
+    while point.parent is not None:
+        parent = copy(point.parent.node)
+        if point.position is None:
+            setattr(parent, point.field, node)
+        else:
+            items = list(getattr(parent, point.field))
+            items[point.position:point.position + 1] = node if isinstance(node, list) else [node]
+            if not items and point.field == 'body':
+                items = [located(ast.Pass(), point.node)]
+            setattr(parent, point.field, items)
+        node = parent
+        point = point.parent
+    return node
+
+
+def dump(value):
+    if isinstance(value, list):
+        return '[' + ', '.join(dump(item) for item in value) + ']'
+    return ast.dump(value) if isinstance(value, ast.AST) else repr(value)
+
+
+def same_value(value, mutated_value):
+    # Other values only count as the same with the same type and repr: True == 1 and 0.0 == -0.0
+    if value is mutated_value:
+        return True
+    return not isinstance(value, ast.AST) and type(value) is type(mutated_value) and repr(value) == repr(mutated_value)
+
+
+def same(value, mutated_value):
+    # Unchanged nodes are shared with the original tree, so nodes are compared by identity
+    if isinstance(value, list) and isinstance(mutated_value, list):
+        return len(value) == len(mutated_value) and all(same_value(a, b) for a, b in zip(value, mutated_value))
+    return same_value(value, mutated_value)
+
+
+def difference(original, mutated):
+    """
+    Return (path, replacement) for the smallest part of a mutated tree that
+    differs from the original tree: the path from the root, like
+    'body[2].value.op', and the dump of what takes its place there. A run of
+    list items that changed is addressed by a slice, like 'body[1:1]' for an
+    insertion. Returns ('', '') when nothing changed.
+
+    Mutated trees share every unchanged node with the original tree, so only
+    the copied nodes are followed down.
+    """
+    path = ''
+    while True:
+        differing = [field for field, value in ast.iter_fields(original)
+                     if not same(value, getattr(mutated, field, None))]
+        if not differing:
+            return path[1:], ''
+        if len(differing) > 1:
+            return path[1:], dump(mutated)
+
+        field = differing[0]
+        value = getattr(original, field)
+        mutated_value = getattr(mutated, field)
+        if isinstance(value, list) and isinstance(mutated_value, list):
+            shortest = min(len(value), len(mutated_value))
+            prefix = 0
+            while prefix < shortest and value[prefix] is mutated_value[prefix]:
+                prefix += 1
+            suffix = 0
+            while suffix < shortest - prefix and value[-1 - suffix] is mutated_value[-1 - suffix]:
+                suffix += 1
+            end, mutated_end = len(value) - suffix, len(mutated_value) - suffix
+            if end - prefix == 1 and mutated_end - prefix == 1 and isinstance(value[prefix], ast.AST) and \
+                    not isinstance(value[prefix], SHARED) and type(value[prefix]) is type(mutated_value[prefix]):
+                original, mutated = value[prefix], mutated_value[prefix]
+                path += f".{field}[{prefix}]"
+                continue
+            return f"{path}.{field}[{prefix}:{end}]"[1:], dump(mutated_value[prefix:mutated_end])
+
+        if isinstance(value, ast.AST) and not isinstance(value, SHARED) and type(value) is type(mutated_value):
+            original, mutated = value, mutated_value
+            path += f".{field}"
+            continue
+        return f"{path}.{field}"[1:], dump(mutated_value)
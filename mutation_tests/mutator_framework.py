@@ -1,27 +1,207 @@
 import os
 import ast
-import subprocess
+import time
+import random
+import argparse
 import difflib
-import Mutators
+from collections import deque
+from mutation_tests.outcomes import SURVIVED, TIMEOUT, NO_COVERAGE, EQUIVALENT, DUPLICATE, INCOMPETENT, DETECTED, UNSCORED
+from mutation_tests.registry import make_operator, operator_names
+from mutation_tests.variants import SAMPLING
+from mutation_tests.higher_order import STRATEGIES, HigherOrderMutant
+# The modules of the other features are imported when their options turn them on
+
+# Run the tests in a new interpreter per mutant, in the framework process, or in children of a fork server
+BACKENDS = ['inprocess', 'subprocess', 'forkserver']
+# Build the code of a mutant from the original code, or unparse the whole mutated tree with a backend
+UNPARSERS = ['splice', 'astor', 'ast']
+# Compile every mutant from its code, or patch the compiled module for operator changes
+ENGINES = ['ast', 'bytecode']
+# Mutants per operator, in random order, when there is no budget for all operators together
+MUTANTS_PER_OPERATOR = 1000
+# Seed of --incremental and of a sample of the mutants when no seed is given
+DEFAULT_SEED = '0'
+# Operators run without --operators
+DEFAULT_OPERATORS = ['AOD', 'AOR', 'ASR', 'BCR', 'CDI', 'COD', 'COI', 'CRP', 'DDL', 'EHD', 'EXS', 'IHD', 'IOD', 'IOP',
+                     'LOD', 'LOI', 'LOR', 'ROR', 'SCD', 'SDI']
 
 
 class MutationFramework:
-    def __init__(self, source_file, test_file, mutators):
+    def __init__(self, source_file, test_file, mutators, jobs=1, backend='subprocess', recycle_after=50,
+                 timeout_factor=2.0, timeout_constant=5.0, use_coverage=False, use_schemata=False,
+                 filter_equivalent=True, cache_file=None, database='mutation_results.db', resume=False,
+                 unparse='splice', seed=None, exhaustive=False, budget=None, order=1, pairing='random',
+                 sampling='point', rate=None, engine='ast', parse_cache=None, smoke=False, infer_types=True):
         self.source_file = source_file
         self.test_file = test_file
         self.mutators = mutators
+        self.jobs = jobs
+        self.backend = backend
+        self.recycle_after = recycle_after
+        self.timeout_factor = timeout_factor
+        self.timeout_constant = timeout_constant
+        self.timeout = None
+        self.use_coverage = use_coverage
+        self.coverage = None
+        self.use_schemata = use_schemata
+        self.schema = None
+        self.filter_equivalent = filter_equivalent
+        self.cache_file = cache_file
+        self.cache = None
+        self.store = None
+        if database is not None:
+            from mutation_tests.result_store import ResultStore
+            self.store = ResultStore(database)
+        self.resume = resume
+        self.unparse = unparse
+        # With a seed every run generates the same mutants
+        self.seed = seed
+        # Every replacement variant of a mutation point instead of a random one
+        self.exhaustive = exhaustive
+        # A cap on the number of mutants, as a number or a fraction of all mutants, and how the sample is drawn
+        self.budget = budget
+        self.rate = rate
+        self.sampling = sampling
+        self.plan = None
+        # Number of first-order mutants run together as one higher-order mutant, and how they are picked
+        self.order = order
+        self.pairing = pairing
+        self.higher_order = []
+        self.splicer = None
+        self.engine = engine
+        self.bytecode = None
+        # (name, operator) of every operator, for the points they pruned
+        self.operators = []
+        # Directory the parsed tree and the index of the source file are cached in
+        self.parse_cache = None
+        if parse_cache is not None:
+            from mutation_tests.parse_cache import ParseCache
+            self.parse_cache = ParseCache(*parse_cache)
+        # Import every mutant that compiles before its tests run
+        self.smoke = smoke
+        self.validator = None
+        # Leave out the arithmetic and logical mutants that the types of their operands don't support
+        self.infer_types = infer_types
+        # The fork server runs the in-process runner in its children
+        from mutation_tests.runners import RUNNERS, make_runner
+        self.runner = make_runner(backend if backend in RUNNERS else 'inprocess', source_file, test_file)
+        self.pool = None
 
     def run_tests(self):
-        # Use python to run tests and capture the output
-        result = subprocess.run(['python', self.test_file], capture_output=True, text=True)
-        return result.returncode == 0, result.stderr
+        # Run the tests against the current content of the source file
+        return self.runner.run_tests()
+
+    def calibrate(self):
+        # Time the tests on the unmutated code to derive the per-mutant timeout
+        self.runner.timeout = None
+        start = time.perf_counter()
+        outcome, output = self.run_tests()
+        duration = time.perf_counter() - start
+
+        if outcome != SURVIVED:
+            print(f"Warning: the tests fail on the original code\n{output}")
+
+        self.timeout = self.timeout_factor * duration + self.timeout_constant
+        self.runner.timeout = self.timeout
+        print(f"Baseline: {duration:.2f}s, Timeout per mutant: {self.timeout:.2f}s")
+
+    def collect_coverage(self):
+        # Record which tests execute which lines of the unmutated code
+        from mutation_tests.runners import InProcessRunner
+        from mutation_tests.line_coverage import CoverageIndex
+        self.coverage = CoverageIndex(InProcessRunner(self.source_file, self.test_file)).collect()
+        print(f"Coverage: {len(self.coverage.tests)} tests, "
+              f"{len(set(self.coverage.lines) | self.coverage.shared_lines)} lines covered")
 
     def revert_code(self, original_code):
         # Revert the source file to its original code
         with open(self.source_file, 'w') as f:
             f.write(original_code)
 
+    def record(self, mutant, result):
+        # Write the outcome to the result store as soon as it is known, estimated ones are estimated again
+        if self.store is not None and not mutant.estimated:
+            self.store.record(mutant, result)
+        return result
+
+    def prepare(self, mutant):
+        # (result, None) when the outcome is known without running the mutant, else (None, task)
+        if mutant.result is not None:
+            return mutant.result, None
+        # Only run the tests that cover the mutated line
+        tests = self.tests_for(mutant)
+        if tests == []:
+            return (NO_COVERAGE, f"No test executes line {mutant.lineno}"), None
+        # Mutants in the schema are activated by id, patched mutants run their code object
+        if mutant.schema_id is not None:
+            return None, (mutant.schema_id, tests)
+        return None, (mutant.code if mutant.code_object is None else mutant.code_object, tests)
+
+    def tests_for(self, mutant):
+        if self.coverage is None:
+            return None
+        if not isinstance(mutant, HigherOrderMutant):
+            return self.coverage.tests_for(mutant.lineno)
+        # The tests of all parts, or all tests when one of them needs them
+        tests = [self.coverage.tests_for(part.lineno) for part in mutant.parts]
+        if None in tests:
+            return None
+        return sorted(set().union(*tests))
+
+    def run_mutants(self, mutants):
+        """
+        Yield every mutant with its (outcome, output) in the order of `mutants`.
+
+        A mutant is only taken from `mutants` when a runner is about to need it, so
+        the first mutant runs while the later ones are not even generated yet.
+        """
+        if self.pool is None:
+            for mutant in mutants:
+                result, task = self.prepare(mutant)
+                if result is None:
+                    # Run the tests, the subprocess backend writes the mutant to the source file first
+                    result = self.runner.run(*task)
+                yield mutant, self.record(mutant, result)
+            return
+
+        # Mutants taken by the pool wait here, with their result when it is known without running
+        waiting = deque()
+
+        def tasks():
+            for mutant in mutants:
+                result, task = self.prepare(mutant)
+                waiting.append((mutant, result))
+                if task is not None:
+                    yield task
+
+        # Run mutants on the worker pool, each worker has its own copy of the files
+        for outcome in self.pool.run_mutants(tasks()):
+            mutant, result = waiting.popleft()
+            while result is not None:
+                yield mutant, self.record(mutant, result)
+                mutant, result = waiting.popleft()
+            yield mutant, self.record(mutant, outcome)
+        for mutant, result in waiting:
+            yield mutant, self.record(mutant, result)
+
+    def make_pool(self):
+        if self.backend == 'forkserver':
+            from mutation_tests.forkserver import ForkServer
+            return ForkServer(self.source_file, self.test_file, self.jobs, self.recycle_after, self.timeout,
+                              self.schema)
+        if self.jobs > 1:
+            from mutation_tests.workspace import WorkerPool
+            return WorkerPool(self.source_file, self.test_file, self.jobs, backend=self.backend, timeout=self.timeout,
+                              schema=self.schema)
+        return None
+
     def execute(self):
+        if self.store is not None and self.store.recover(self.source_file):
+            print(f"Restored the original code of {self.source_file}, the previous run was interrupted")
+        self.calibrate()
+        if self.use_coverage:
+            self.collect_coverage()
+
         # Clear mutation_log
         with open('mutation_log.txt', 'w') as f:
             f.write('')
@@ -30,74 +210,224 @@ class MutationFramework:
         with open(self.source_file, 'r') as f:
             original_code = f.read()
         
+        from mutation_tests.mutation_index import MutationIndex
+        from mutation_tests.splice import Splicer
+        from mutation_tests.unparse import choose, use
+        from mutation_tests.validation import CompetenceFilter
+
         # Parse the code into an AST
-        tree = ast.parse(original_code)
+        if self.parse_cache is not None:
+            # An unchanged file is neither parsed nor indexed again
+            tree, index = self.parse_cache.load(original_code)
+        else:
+            tree = ast.parse(original_code)
+            index = MutationIndex(tree)
+        if self.unparse == 'splice':
+            # The replaced parts are unparsed by the backend that is the fastest with this interpreter
+            name, timings, same = choose()
+            timing = ', '.join(f"{backend} {seconds * 1000:.2f}ms" for backend, seconds in timings.items())
+            print(f"Unparse: {name} ({timing}{'' if same else ', different bytecode'})")
+            self.splicer = Splicer(original_code, tree)
+        else:
+            use(self.unparse)
 
-        # Initialize the n & mutation score
-        n = 1000
-        kill = 0
-        total = 0
+        if self.store is not None and self.seed is None:
+            # Every run with a database has a seed, recorded with it, so a resumed run generates the same mutants
+            self.seed = self.store.seed(self.source_file) if self.resume else None
+            if self.seed is None:
+                self.seed = str(random.randrange(2 ** 32))
+        generated = self.generate_mutants(tree, index)
+        if self.engine == 'bytecode':
+            # Operator changes are patched into the compiled module, the trees stay for the log
+            from mutation_tests.bytecode import BytecodeEngine
+            self.bytecode = BytecodeEngine(self.source_file, tree)
+            generated = self.bytecode.attach(generated)
+        if self.filter_equivalent:
+            # Compile every mutant and drop the ones with the bytecode of the original or of an earlier mutant
+            from mutation_tests.equivalence import EquivalenceFilter
+            generated = EquivalenceFilter(original_code).filter(generated)
+        if self.cache_file is not None:
+            # Reuse the results of the mutants in functions and classes that did not change
+            from mutation_tests.incremental import ResultCache
+            self.cache = ResultCache(self.cache_file, self.source_file, self.test_file, tree)
+            generated = self.cache.load(generated)
+        if self.store is not None:
+            # Only the serial subprocess backend writes mutants to the source file itself
+            dirty = self.backend == 'subprocess' and self.jobs <= 1
+            self.store.begin(self.source_file, self.test_file, original_code, tree, self.resume, dirty, self.seed)
+            generated = self.store.load(generated)
+        if self.order > 1:
+            # Mutants with a known result are not combined
+            generated = self.combine(tree, generated)
+        if self.use_schemata:
+            # The schema holds all mutants, so they are generated before any of them runs
+            generated = self.build_schema(tree, generated)
+        else:
+            generated = self.convert(generated)
+        # Mutants that don't compile, or fail at import, are incompetent and never run
+        self.validator = CompetenceFilter(self.source_file, self.test_file, self.smoke, self.timeout)
+        self.validator.check_original(original_code)
+        generated = self.validator.filter(generated)
+
+        pool = self.make_pool()
+        if pool is None:
+            if self.schema is not None:
+                from mutation_tests.schemata import SchemataRunner
+                self.runner = SchemataRunner(self.runner, self.schema)
+            try:
+                self._execute(original_code, generated)
+            finally:
+                # Revert the code, the workers never write to the real source file
+                self.revert_code(original_code)
+                if self.store is not None:
+                    self.store.finish()
+            return
+
+        with pool:
+            self.pool = pool
+            try:
+                self._execute(original_code, generated)
+            finally:
+                self.pool = None
 
+    def generate_mutants(self, tree, index=None):
+        # Yield the mutated trees of every operator
+        n = MUTANTS_PER_OPERATOR
+        # All operators find their mutation points in one index of the tree
+        if index is None:
+            from mutation_tests.mutation_index import MutationIndex
+            index = MutationIndex(tree)
+        if not self.infer_types:
+            # The operators find no types and keep every mutant
+            index.types = None
+        operators = []
         for mutator in self.mutators:
-            if mutator == 'AOD':
-                mutator_class = Mutators.AODMutator(tree, n)
-            elif mutator == 'AOR': 
-                mutator_class = Mutators.AORMutator(tree, n)
-            elif mutator == 'ASR':
-                mutator_class = Mutators.ASRMutator(tree, n)
-            elif mutator == 'BCR':
-                mutator_class = Mutators.BCRMutator(tree, n)
-            elif mutator == 'CDI':
-                mutator_class = Mutators.CDIMutator(tree, n)
-            elif mutator == 'COD':
-                mutator_class = Mutators.CODMutator(tree, n)
-            elif mutator == 'COI':
-                mutator_class = Mutators.COIMutator(tree, n)
-            elif mutator == 'CRP':
-                mutator_class = Mutators.CRPMutator(tree, n)
-            elif mutator == 'DDL':
-                mutator_class = Mutators.DDLMutator(tree, n)
-            elif mutator == 'EHD':
-                mutator_class = Mutators.EHDMutator(tree, n)
-            elif mutator == 'EXS':
-                mutator_class = Mutators.EXSMutator(tree, n)
-            elif mutator == 'IHD':
-                mutator_class = Mutators.IHDMutator(tree, n)
-            elif mutator == 'IOD':
-                mutator_class = Mutators.IODMutator(tree, n)
-            elif mutator == 'IOP':
-                mutator_class = Mutators.IOPMutator(tree, n)
-            elif mutator == 'LOD':
-                mutator_class = Mutators.LODMutator(tree, n)
-            elif mutator == 'LOI':
-                mutator_class = Mutators.LOIMutator(tree, n)
-            elif mutator == 'LOR':
-                mutator_class = Mutators.LORMutator(tree, n)
-            elif mutator == 'ROR':
-                mutator_class = Mutators.RORMutator(tree, n)
-            elif mutator == 'SCD':
-                mutator_class = Mutators.SCDMutator(tree, n)
-            elif mutator == 'SCI':
-                mutator_class = Mutators.SCIMutator(tree, n)
-            elif mutator == 'SDI':
-                mutator_class = Mutators.SDIMutator(tree, n)
-            elif mutator == 'SIR':
-                mutator_class = Mutators.SIRMutator(tree, n)
-            
-            mutated_codes = mutator_class.generate_mutated_codes()
+            # Only the modules of the requested operators are imported
+            # Every operator gets its own seed, so its mutants don't depend on the other operators
+            seed = None if self.seed is None else f"{self.seed}:{mutator}"
+            operators.append((mutator, make_operator(mutator, tree, n, index, seed)))
+        self.operators = operators
 
+        if self.exhaustive or self.budget is not None or self.rate is not None:
+            # The budget is spread over the mutants of all operators
+            from mutation_tests.variants import VariantPlan
+            self.plan = VariantPlan(operators, self.exhaustive, self.budget,
+                                    None if self.seed is None else f"{self.seed}:variants", self.sampling, self.rate)
+            print(f"Variants: {self.plan.planned} of {self.plan.total} mutants planned "
+                  f"({self.plan.rate:.1%}, sampled by {self.sampling})")
+            yield from self.plan.generate()
+            return
+
+        for mutator, mutator_class in operators:
+            # The trees are converted to code once the mutants that don't have to run are known.
+            # Mutants are generated one at a time, while the earlier ones run
+            yield mutator, mutator_class.iter_mutants()
+
+    def combine(self, tree, generated):
+        # Mutants of all operators are combined, so all of them are generated first
+        generated = [(mutator, list(mutants)) for mutator, mutants in generated]
+        pending = [mutant for _, mutants in generated for mutant in mutants if mutant.result is None]
+        from mutation_tests.higher_order import combine
+        rng = random.Random(None if self.seed is None else f"{self.seed}:higher-order")
+        self.higher_order = combine(tree, pending, self.order, self.pairing, rng)
+        return generated
+
+    def run_higher_order(self, generated):
+        """
+        Run the higher-order mutants before any first-order mutant. The parts of a
+        detected one get its outcome as an estimate, the parts of the others run on
+        their own.
+        """
+        generated = [(mutator, list(mutants)) for mutator, mutants in generated]
+        # An incompetent part would make the whole mutant fail
+        self.higher_order = [mutant for mutant in self.higher_order
+                             if not any(part.result is not None for part in mutant.parts)]
+        combined = sum(len(mutant.parts) for mutant in self.higher_order)
+        detected = 0
+        mutants = self.validator.marked(self.converted(self.higher_order))
+        for mutant, (outcome, output) in self.run_mutants(mutants):
+            if outcome in DETECTED:
+                detected += 1
+                for part in mutant.parts:
+                    part.estimated = True
+                    part.result = (outcome, f"Detected in higher-order mutant {mutant.id} ({mutant.operator})\n"
+                                            f"{output}")
+        print(f"Higher order: {len(self.higher_order)} mutants of {combined} first-order mutants, "
+              f"{detected} detected, the parts of the other {len(self.higher_order) - detected} run on their own")
+        self.higher_order = []
+        return generated
+
+    def converted(self, mutants):
+        from mutation_tests.mutant import iter_source, iter_compiled
+        if self.backend == 'subprocess':
+            # The subprocess backend writes the code of the mutant to the source file
+            return iter_source(mutants, self.splicer)
+        # The in-process backends run the compiled tree, only the logged mutants are converted to code
+        return iter_compiled(mutants, os.path.abspath(self.source_file), self.splicer)
+
+    def convert(self, generated):
+        for mutator, mutants in generated:
+            yield mutator, self.converted(mutants)
+
+    def build_schema(self, tree, generated):
+        from mutation_tests.mutant import to_source
+        from mutation_tests.schemata import Schema
+
+        # Mutants with a known result never run, they are left out of the schema
+        generated = [(mutator, list(mutants)) for mutator, mutants in generated]
+        all_mutants = [mutant for _, mutants in generated for mutant in mutants if mutant.result is None]
+        self.schema = Schema(tree, all_mutants)
+        print(f"Schema: {len(all_mutants) - len(self.schema.excluded)} mutants behind switches, "
+              f"{len(self.schema.excluded)} run separately")
+
+        for mutant_id, mutant in enumerate(all_mutants):
+            if mutant_id not in self.schema.excluded:
+                mutant.schema_id = mutant_id
+
+        # Mutants left out of the schema run as code, like without schemata
+        return [(mutator, to_source(mutants, self.splicer)) for mutator, mutants in generated]
+
+    def _execute(self, original_code, generated):
+        total = 0
+        kill = 0
+        # Killed and counted mutants, each standing for the mutants it was sampled for
+        weighted_total = 0
+        weighted_kill = 0
+        # Counted mutants whose outcome was taken from a higher-order mutant
+        estimated = 0
+        if self.higher_order:
+            generated = self.run_higher_order(generated)
+        for mutator, mutants in generated:
+            count = 0
             this_kill = 0
-            for code in mutated_codes:
-                # Write the mutated code to the source file
-                with open(self.source_file, 'w') as f:
-                    f.write(code)
-                
-                # Run the tests
-                success, output = self.run_tests()
-                if success:
+            this_timeout = 0
+            this_no_coverage = 0
+            this_equivalent = 0
+            this_duplicate = 0
+            this_incompetent = 0
+            this_estimated = 0
+            # Every mutant is dropped once its outcome is counted and logged
+            for mutant, (outcome, output) in self.run_mutants(mutants):
+                count += 1
+                if outcome not in UNSCORED:
+                    weighted_total += mutant.weight
+                    if outcome in DETECTED:
+                        weighted_kill += mutant.weight
+                if mutant.estimated:
+                    this_estimated += 1
+                elif self.cache is not None:
+                    self.cache.store(mutant, (outcome, output))
+                if outcome in (SURVIVED, NO_COVERAGE):
+                    # Mutants run from the schema are only converted to code when they are logged
+                    try:
+                        code = mutant.get_code(self.splicer)
+                    except Exception:
+                        code = ''
                     # save in mutation_log.txt just diff this code with string original code and type of mutatnt
                     with open('mutation_log.txt', 'a') as f:
                         f.write(f"Mutant Type: {mutator}\n")
+                        if mutant.id is not None:
+                            f.write(f"Mutant ID: {mutant.id}\n")
                         diff = difflib.unified_diff(
                             code.splitlines(),     # Split file content into lines
                             original_code.splitlines(), # Split string into lines
@@ -111,48 +441,221 @@ class MutationFramework:
                         f.write('-' * 64)
                         f.write('\n')
                     #print(output)
-                else:
+                    if outcome == NO_COVERAGE:
+                        this_no_coverage += 1
+                elif outcome == EQUIVALENT:
+                    this_equivalent += 1
+                elif outcome == DUPLICATE:
+                    this_duplicate += 1
+                elif outcome == INCOMPETENT:
+                    this_incompetent += 1
+                elif outcome in DETECTED:
+                    # Timed out mutants count as killed
                     this_kill += 1
+                    if outcome == TIMEOUT:
+                        this_timeout += 1
                 
-            total += len(mutated_codes)
+            # Equivalent, duplicate and incompetent mutants don't count in the score
+            total += count - this_equivalent - this_duplicate - this_incompetent
             kill += this_kill
+            estimated += this_estimated
+
+            print(f'{mutator} Mutants: {count}, Killed: {this_kill}, Timeout: {this_timeout}, '
+                  f'No coverage: {this_no_coverage}, Equivalent: {this_equivalent}, Duplicate: {this_duplicate}, '
+                  f'Incompetent: {this_incompetent}' + (f', Estimated: {this_estimated}' if this_estimated else ''))
 
-            print(f'{mutator} Mutants: {len(mutated_codes)}, Killed: {this_kill}')
+        if self.cache is not None:
+            self.cache.save()
+            print(f"Incremental: {self.cache.loaded} mutants loaded from the cache, "
+                  f"changed: {', '.join(self.cache.changed) or 'nothing'}")
+        if self.store is not None and self.resume:
+            print(f"Resumed: {self.store.resumed} mutants loaded from {self.store.path}, seed {self.seed}")
+        from mutation_tests.pruning import pruned_counts
+        pruned = pruned_counts(self.operators)
+        if pruned:
+            print(f"Pruned: {', '.join(f'{name} {count}' for name, count in pruned.items())} "
+                  f"mutation points without a mutant that changes the behaviour or runs")
+        if self.validator.compile_errors or self.validator.import_errors:
+            print(f"Incompetent: {self.validator.compile_errors} mutants do not compile, "
+                  f"{self.validator.import_errors} fail at import")
+        if self.parse_cache is not None:
+            print(f"Parse cache: {self.parse_cache.hits} hits, {self.parse_cache.misses} misses "
+                  f"in {self.parse_cache.directory}")
+        if self.bytecode is not None:
+            print(f"Bytecode: {self.bytecode.patched} mutants patched into the compiled module, "
+                  f"{self.bytecode.compiled} compiled from their code")
 
         # Calculate Mutation Score
         if total == 0:
             print("Mutation Score: 0")
+        elif estimated:
+            # A part the tests only miss on its own can be hidden by the other parts
+            print(f"Estimated Mutation Score: {kill/total} "
+                  f"({estimated} of {total} mutants counted as killed with their higher-order mutant)")
         else:
             print(f"Mutation Score: {kill/total}")
+        if self.plan is not None and self.plan.planned < self.plan.total and weighted_total:
+            # Every stratum counts with its size, not with the number of mutants sampled from it
+            print(f"Sampled Mutation Score: {weighted_kill/weighted_total} "
+                  f"({self.plan.planned} of {self.plan.total} mutants, sampling rate {self.plan.rate:.1%})")
 
-        # Revert the code
-        self.revert_code(original_code)
 
+def main():
+    parser = argparse.ArgumentParser(description="Run mutation testing on a source file")
+    parser.add_argument('source_file', nargs='?', metavar='SOURCE',
+                        help="source file to mutate")
+    parser.add_argument('test_file', nargs='?', metavar='TESTS',
+                        help="test file that is run against every mutant of the source file")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="number of mutants to run in parallel, each in its own workspace")
+    parser.add_argument('--backend', choices=BACKENDS, default='subprocess',
+                        help="run the tests in a new interpreter per mutant, inside the current process "
+                             "or in children forked from a pre-warmed process")
+    parser.add_argument('--recycle-after', type=int, default=50,
+                        help="number of mutants a forkserver worker runs before it is replaced")
+    parser.add_argument('--timeout-factor', type=float, default=2.0,
+                        help="per-mutant timeout as a multiple of the unmutated test run time")
+    parser.add_argument('--timeout-constant', type=float, default=5.0,
+                        help="seconds added to the scaled per-mutant timeout")
+    parser.add_argument('--coverage', action='store_true',
+                        help="only run the tests that cover the mutated line, skip mutants on uncovered lines")
+    parser.add_argument('--schemata', action='store_true',
+                        help="compile all mutants into one module and switch between them at run time")
+    parser.add_argument('--keep-equivalent', action='store_true',
+                        help="also run mutants that compile to the same bytecode as the original or an earlier mutant")
+    parser.add_argument('--incremental', nargs='?', const='mutation_cache.json', metavar='CACHE_FILE',
+                        help="reuse the results of the previous run for functions and classes that did not change; "
+                             f"without --seed the seed is {DEFAULT_SEED}, so every run generates the same mutants")
+    parser.add_argument('--db', default='mutation_results.db',
+                        help="SQLite database the outcome of every mutant is written to")
+    parser.add_argument('--resume', action='store_true',
+                        help="skip the mutants already recorded in the database by an interrupted run, "
+                             "with the seed that run recorded unless --seed is given")
+    parser.add_argument('--unparse', choices=UNPARSERS, default='splice',
+                        help="build the code of a mutant by replacing only the mutated part of the original code, "
+                             "with the faster unparser for the replaced part, or by unparsing the whole mutated tree "
+                             "with astor or ast.unparse")
+    parser.add_argument('--seed',
+                        help="seed of the random choices of the operators, the same seed generates the same mutants")
+    parser.add_argument('--operators', type=lambda text: text.split(','), metavar='NAME,...',
+                        help="comma separated mutation operators to run, built-in or registered by other packages")
+    parser.add_argument('--exhaustive', action='store_true',
+                        help="generate a mutant for every replacement at every mutation point, "
+                             "instead of one random replacement per point")
+    parser.add_argument('--budget', metavar='N|PERCENT%',
+                        help="generate at most N mutants, or the given percentage of all mutants, "
+                             "spread evenly over the strata of --sampling; without --seed the seed is "
+                             f"{DEFAULT_SEED}, so every run draws the same sample")
+    parser.add_argument('--sampling', choices=SAMPLING, default='point',
+                        help="strata the budget is spread over: every mutation point, all mutants together, "
+                             "every operator, every function or every line")
+    parser.add_argument('--engine', choices=ENGINES, default='ast',
+                        help="compile every mutant from its code, or patch operator changes (AOR, ROR, LOR, LOD, "
+                             "COD) into the module compiled once; needs Python 3.11 and a backend that runs in-process")
+    parser.add_argument('--order', type=int, default=1, metavar='K',
+                        help="run K first-order mutants of different functions as one mutant, "
+                             "the parts of a surviving one run on their own, the parts of a killed one "
+                             "count as killed and the score is reported as an estimate")
+    parser.add_argument('--pairing', choices=STRATEGIES, default='random',
+                        help="combine the first-order mutants at random, the closest ones in the code, "
+                             "or only mutants of different operators")
+    parser.add_argument('--package', metavar='DIR',
+                        help="mutate every module of the package directory instead of a single file, "
+                             "the options only the single file mode has, like --coverage, are rejected")
+    parser.add_argument('--tests', metavar='DIR',
+                        help="directory the tests of --package are discovered in")
+    parser.add_argument('--parse-cache', nargs='?', const='.mutation_parse_cache', metavar='DIR',
+                        help="keep the parsed tree and the mutation points of every source file in a directory, "
+                             "unchanged files are not parsed again")
+    parser.add_argument('--parse-cache-size', type=float, default=100, metavar='MB',
+                        help="size of the parse cache, the least recently used files are removed beyond it")
+    parser.add_argument('--smoke', action='store_true',
+                        help="import every mutant in a fresh interpreter before its tests run, "
+                             "mutants that fail at import are incompetent and left out of the score")
+    parser.add_argument('--no-type-inference', action='store_true',
+                        help="keep the AOR, LOR and LOI mutants that raise a TypeError for the types "
+                             "inferred from literals, annotations and assignments")
+    args = parser.parse_args()
+    if (args.package is None) != (args.tests is None):
+        parser.error("--package and --tests go together")
+    if args.package is not None:
+        if args.source_file is not None:
+            parser.error("a source file can't be given with --package")
+        # The modules of a package run in a new interpreter each, without the options of a single source file
+        unsupported = ['backend', 'recycle_after', 'coverage', 'schemata', 'incremental', 'db', 'resume', 'unparse',
+                       'exhaustive', 'budget', 'sampling', 'order', 'pairing', 'engine', 'smoke']
+        given = [f"--{name.replace('_', '-')}" for name in unsupported
+                 if getattr(args, name) != parser.get_default(name)]
+        if given:
+            parser.error(f"{', '.join(given)} can't be given with --package")
+    elif args.source_file is None or args.test_file is None:
+        parser.error("the source file and the test file are required without --package")
+    else:
+        for path in (args.source_file, args.test_file):
+            if not os.path.isfile(path):
+                parser.error(f"file not found: {path}")
+    if args.operators is not None:
+        unknown = [name for name in args.operators if name not in operator_names()]
+        if unknown:
+            parser.error(f"unknown mutation operators: {', '.join(unknown)}")
+    budget, rate = None, None
+    if args.budget is not None:
+        try:
+            if args.budget.endswith('%'):
+                rate = float(args.budget[:-1]) / 100
+            else:
+                budget = int(args.budget)
+        except ValueError:
+            parser.error(f"invalid budget: {args.budget}")
+        if (budget or 0) < 0 or not 0 <= (rate or 0) <= 1:
+            parser.error(f"invalid budget: {args.budget}")
+    if args.parse_cache_size <= 0:
+        parser.error("the parse cache size has to be positive")
+    parse_cache = None
+    if args.parse_cache is not None:
+        parse_cache = (args.parse_cache, int(args.parse_cache_size * 1024 * 1024))
+    if args.unparse != 'splice':
+        from mutation_tests.unparse import available
+        if args.unparse not in available():
+            parser.error(f"the {args.unparse} unparser is not available")
+    if args.order < 1:
+        parser.error("the order has to be at least 1")
+    if args.engine == 'bytecode':
+        from mutation_tests.bytecode import SUPPORTED
+        if args.backend == 'subprocess' or not SUPPORTED:
+            parser.error("the bytecode engine needs Python 3.11 or later and the inprocess or forkserver backend")
 
-if __name__ == "__main__":
-    DEFAULT_VAR = True
-    source_file = "../test_file/example2.py"
-    test_file = "../test_file/test_example2.py"
-
-    while not DEFAULT_VAR:
-        source_file = input("Enter source file path: ")
-        if not os.path.isfile(source_file):
-            print("Source file not found")
-        else:
-            break
+    if args.seed is None and (args.incremental is not None or args.budget is not None):
+        # Results are only reused for the same mutants, and a sample is only drawn again with the same seed
+        args.seed = DEFAULT_SEED
 
-    while not DEFAULT_VAR:
-        test_file = input("Enter test file path: ")
-        if not os.path.isfile(test_file):
-            print("Test file not found")
-        else:
-            break
-    
-    if not DEFAULT_VAR:
-        selcet_mutators = input("Enter mutators: [AOD, AOR, ASR, BCR, CDI, COD, COI, CRP, DDL, EHD, EXS, IHD, IOD, IOP, LOD, LOI, LOR, ROR, SCD, SCI, SDI, SIR]: ")
-        mutators = selcet_mutators.split(',')
+    if args.operators is not None:
+        mutators = args.operators
     else:
-        mutators = ['AOD', 'AOR', 'ASR', 'BCR', 'CDI', 'COD', 'COI', 'CRP', 'DDL', 'EHD', 'EXS', 'IHD', 'IOD', 'IOP', 'LOD', 'LOI', 'LOR', 'ROR', 'SCD', 'SDI']
+        mutators = DEFAULT_OPERATORS
+
+    if args.package is not None:
+        # All modules of the package in one run
+        from mutation_tests.project import ProjectFramework
+        framework = ProjectFramework(args.package, args.tests, mutators, jobs=args.jobs,
+                                     timeout_factor=args.timeout_factor, timeout_constant=args.timeout_constant,
+                                     filter_equivalent=not args.keep_equivalent, seed=args.seed,
+                                     mutants_per_operator=MUTANTS_PER_OPERATOR, parse_cache=parse_cache,
+                                     infer_types=not args.no_type_inference)
+        framework.execute()
+        return
 
-    framework = MutationFramework(source_file, test_file, mutators)
+    framework = MutationFramework(args.source_file, args.test_file, mutators, jobs=args.jobs, backend=args.backend,
+                                  recycle_after=args.recycle_after, timeout_factor=args.timeout_factor,
+                                  timeout_constant=args.timeout_constant, use_coverage=args.coverage,
+                                  use_schemata=args.schemata, filter_equivalent=not args.keep_equivalent,
+                                  cache_file=args.incremental, database=args.db, resume=args.resume,
+                                  unparse=args.unparse, seed=args.seed, exhaustive=args.exhaustive,
+                                  budget=budget, order=args.order, pairing=args.pairing, sampling=args.sampling,
+                                  rate=rate, engine=args.engine, parse_cache=parse_cache, smoke=args.smoke,
+                                  infer_types=not args.no_type_inference)
     framework.execute()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+# Possible outcomes of running the tests against a mutant
+KILLED = 'killed'
+SURVIVED = 'survived'
+TIMEOUT = 'timeout'
+# No test executes the mutated line, so the tests are not run at all
+NO_COVERAGE = 'no coverage'
+# The mutant compiles to the same bytecode as the original code or as an earlier mutant,
+# it is not run and does not count in the mutation score
+EQUIVALENT = 'equivalent'
+DUPLICATE = 'duplicate'
+# The mutant does not compile or fails at import, no test runs it and it does not count in the mutation score
+INCOMPETENT = 'incompetent'
+
+# Outcomes left out of the mutation score
+UNSCORED = (EQUIVALENT, DUPLICATE, INCOMPETENT)
+
+# Outcomes that count as a killed mutant in the mutation score
+DETECTED = (KILLED, TIMEOUT)
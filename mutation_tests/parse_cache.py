@@ -0,0 +1,88 @@
+import os
+import ast
+import sys
+import pickle
+import hashlib
+import tempfile
+from mutation_tests.mutation_index import MutationIndex
+
+
+class ParseCache:
+    """
+    The tree and the mutation index of source files, pickled into a directory.
+
+    An entry is keyed by the hash of the source and the Python version, since
+    both change the tree, so an unchanged file is neither parsed nor indexed
+    again. Tree and index are pickled together, the points of the index keep
+    pointing at the nodes of the tree.
+
+    Loading an entry touches it, and when the directory grows over `max_size`
+    bytes the entries that were used least recently are removed.
+    """
+
+    def __init__(self, directory, max_size=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, source):
+        key = hashlib.sha256(f"{sys.version}\n{source}".encode()).hexdigest()
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def load(self, source):
+        """
+        Return (tree, index) of the source, from the cache when it is there.
+        """
+        path = self.path(source)
+        try:
+            with open(path, 'rb') as f:
+                tree, index = pickle.load(f)
+            os.utime(path)
+            self.hits += 1
+            return tree, index
+        except Exception:
+            # Missing, or written by another version of the framework
+            pass
+
+        tree = ast.parse(source)
+        index = MutationIndex(tree)
+        self.misses += 1
+        self.store(path, tree, index)
+        return tree, index
+
+    def store(self, path, tree, index):
+        try:
+            data = pickle.dumps((tree, index), protocol=pickle.HIGHEST_PROTOCOL)
+        except RecursionError:
+            # Too deeply nested to pickle, it is parsed again next time
+            return
+        # Written under another name first, so other processes never read half an entry
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.pickle'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        size = sum(entry[1] for entry in entries)
+        # Least recently used first
+        for _, entry_size, name in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            size -= entry_size
@@ -0,0 +1,305 @@
+import os
+import ast
+import sys
+import time
+import shutil
+import signal
+import difflib
+import tempfile
+import subprocess
+import multiprocessing
+from itertools import islice
+from collections import deque
+from mutation_tests.outcomes import KILLED, SURVIVED, TIMEOUT, NO_COVERAGE, EQUIVALENT, DUPLICATE, INCOMPETENT, DETECTED
+from mutation_tests.mutation_index import MutationIndex
+from mutation_tests.parse_cache import ParseCache
+from mutation_tests.registry import make_operator
+from mutation_tests.equivalence import EquivalenceFilter
+from mutation_tests.validation import CompetenceFilter
+from mutation_tests.pruning import pruned_counts
+from mutation_tests.splice import Splicer
+from mutation_tests.mutant import iter_source
+from mutation_tests.workspace import default_base_dir, copy_directories
+
+
+def find_modules(package_dir, test_dir):
+    # Every module of the package, the tests left out
+    modules = []
+    for directory, subdirectories, files in os.walk(package_dir):
+        subdirectories[:] = sorted(name for name in subdirectories
+                                   if name != '__pycache__' and not name.startswith('.')
+                                   and os.path.abspath(os.path.join(directory, name)) != test_dir)
+        for name in sorted(files):
+            if name.endswith('.py') and not name.startswith('test_') and not name.endswith('_test.py'):
+                modules.append(os.path.abspath(os.path.join(directory, name)))
+    return modules
+
+
+def generate_file(task):
+    """
+    Parse and index one module and return (relative path, [(operator, mutants)],
+    {operator: pruned points}, error).
+
+    Runs in the processes of the parse pool. The mutants come back as code, so
+    only their text is sent back, not the trees.
+    """
+    root, path, mutators, n, seed, filter_equivalent, parse_cache, infer_types = task
+    relative = os.path.relpath(path, root)
+    with open(path, 'r') as f:
+        source = f.read()
+    try:
+        if parse_cache is not None:
+            # The workers share the directory, entries are replaced atomically
+            tree, index = ParseCache(*parse_cache).load(source)
+        else:
+            tree = ast.parse(source)
+            index = MutationIndex(tree)
+    except SyntaxError as e:
+        return relative, [], {}, str(e)
+    if not infer_types:
+        index.types = None
+
+    splicer = Splicer(source, tree)
+    equivalence = EquivalenceFilter(source) if filter_equivalent else None
+    # Mutants that don't compile are incompetent, they are not sent to the workers
+    validator = CompetenceFilter(path)
+    generated = []
+    operators = []
+    for mutator in mutators:
+        # Every file and operator gets its own seed, the mutants don't depend on the other files
+        operator_seed = None if seed is None else f"{seed}:{relative}:{mutator}"
+        operators.append((mutator, make_operator(mutator, tree, n, index, operator_seed)))
+        mutants = operators[-1][1].iter_mutants()
+        if equivalence is not None:
+            mutants = equivalence.marked(mutants)
+        generated.append((mutator, list(validator.marked(iter_source(mutants, splicer)))))
+    return relative, generated, pruned_counts(operators), None
+
+
+class ProjectRunner:
+    """
+    Run all tests of the test directory in a fresh interpreter, with one module
+    of the project replaced by a mutant.
+
+    The module is written into the project and put back after the run, so the
+    runner works on a copy of the project. No bytecode is cached, two mutants of
+    the same size written in the same second would share it.
+    """
+
+    def __init__(self, root, package_dir, test_dir, timeout=None):
+        self.root = root
+        self.test_dir = test_dir
+        self.timeout = timeout
+        # The tests import the package from its parent directory, or its modules by their names
+        paths = [package_dir, os.path.dirname(package_dir)]
+        if os.environ.get('PYTHONPATH'):
+            paths.append(os.environ['PYTHONPATH'])
+        self.environment = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', PYTHONPATH=os.pathsep.join(paths))
+
+    def run_tests(self):
+        command = [sys.executable, '-m', 'unittest', 'discover', '-s', self.test_dir]
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                   cwd=self.root, env=self.environment, start_new_session=True)
+        try:
+            _, stderr = process.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            _, stderr = process.communicate()
+            return TIMEOUT, stderr
+        return (SURVIVED if process.returncode == 0 else KILLED), stderr
+
+    def run(self, relative, code):
+        path = os.path.join(self.root, relative)
+        with open(path, 'r') as f:
+            original = f.read()
+        with open(path, 'w') as f:
+            f.write(code)
+        try:
+            return self.run_tests()
+        finally:
+            with open(path, 'w') as f:
+                f.write(original)
+
+
+def copy_project(root, package_dir, test_dir, base_dir):
+    # A private copy of the package and the tests, mutants are only ever written there
+    path = tempfile.mkdtemp(prefix='mutation-ws-', dir=base_dir)
+    copy = os.path.join(path, os.path.basename(root) or 'root')
+    copy_directories(root, [package_dir, test_dir], copy)
+    return copy
+
+
+# Runner of the current pool worker, created by init_worker
+_runner = None
+
+
+def init_worker(root, package_dir, test_dir, base_dir, timeout):
+    global _runner
+    copy = copy_project(root, package_dir, test_dir, base_dir)
+    _runner = ProjectRunner(copy, os.path.join(copy, os.path.relpath(package_dir, root)),
+                            os.path.join(copy, os.path.relpath(test_dir, root)), timeout)
+
+
+def run_mutant(task):
+    relative, code = task
+    return _runner.run(relative, code)
+
+
+class ProjectFramework:
+    """
+    Mutation testing of every module of a package against the tests of a test
+    directory.
+
+    The modules are parsed, indexed and mutated in parallel by a pool of
+    processes. The mutants of every module go to a shared pool of workers as the
+    module is done, every worker on its own copy of the project, and the score is
+    reported per file and for the whole package.
+    """
+
+    def __init__(self, package_dir, test_dir, mutators, jobs=1, timeout_factor=2.0, timeout_constant=5.0,
+                 filter_equivalent=True, seed=None, mutants_per_operator=1000, parse_cache=None, infer_types=True):
+        self.package_dir = os.path.abspath(package_dir)
+        self.test_dir = os.path.abspath(test_dir)
+        # Every worker copies the package and the tests to their paths below the directory both are in
+        self.root = os.path.commonpath([os.path.dirname(self.package_dir), self.test_dir])
+        self.mutators = mutators
+        self.jobs = jobs
+        self.timeout_factor = timeout_factor
+        self.timeout_constant = timeout_constant
+        self.timeout = None
+        self.filter_equivalent = filter_equivalent
+        self.seed = seed
+        self.n = mutants_per_operator
+        # (directory, size) of the cache of parsed modules, shared by the parse pool
+        self.parse_cache = parse_cache
+        self.infer_types = infer_types
+        # Mutation points the operators pruned in all files
+        self.pruned = {}
+
+    def calibrate(self, base_dir):
+        # Time the tests on the unmutated project to derive the per-mutant timeout
+        copy = copy_project(self.root, self.package_dir, self.test_dir, base_dir)
+        runner = ProjectRunner(copy, os.path.join(copy, os.path.relpath(self.package_dir, self.root)),
+                               os.path.join(copy, os.path.relpath(self.test_dir, self.root)))
+        start = time.perf_counter()
+        outcome, output = runner.run_tests()
+        duration = time.perf_counter() - start
+        if outcome != SURVIVED:
+            print(f"Warning: the tests fail on the original code\n{output}")
+        self.timeout = self.timeout_factor * duration + self.timeout_constant
+        print(f"Baseline: {duration:.2f}s, Timeout per mutant: {self.timeout:.2f}s")
+
+    def generate_mutants(self, modules):
+        """
+        Yield (relative path, operator, mutant) for the mutants of every module, in
+        the order of the modules.
+
+        The modules are parsed and mutated in parallel, but only a few modules ahead
+        of the mutants that run, so the mutants kept as code don't grow with the
+        number of modules.
+        """
+        tasks = ((self.root, path, self.mutators, self.n, self.seed, self.filter_equivalent, self.parse_cache,
+                  self.infer_types) for path in modules)
+        with multiprocessing.Pool(self.jobs) as pool:
+            pending = deque(pool.apply_async(generate_file, (task,)) for task in islice(tasks, self.jobs))
+            while pending:
+                relative, generated, file_pruned, error = pending.popleft().get()
+                # The next module is mutated while the mutants of this one run
+                for task in islice(tasks, 1):
+                    pending.append(pool.apply_async(generate_file, (task,)))
+                if error is not None:
+                    print(f"Skipped {relative}: {error}")
+                for mutator, count in file_pruned.items():
+                    self.pruned[mutator] = self.pruned.get(mutator, 0) + count
+                for mutator, mutants in generated:
+                    for mutant in mutants:
+                        yield relative, mutator, mutant
+
+    def run_mutants(self, pool, mutants):
+        # Yield (relative path, operator, mutant, (outcome, output)) in the order of `mutants`
+        pending = deque()
+        for relative, mutator, mutant in mutants:
+            if mutant.result is not None:
+                pending.append((relative, mutator, mutant, None))
+            else:
+                pending.append((relative, mutator, mutant, pool.apply_async(run_mutant, ((relative, mutant.code),))))
+            # Only a few mutants wait in the pool, the rest is not generated yet
+            while len(pending) > 2 * self.jobs or pending and pending[0][3] is None:
+                relative_done, mutator_done, mutant_done, result = pending.popleft()
+                yield relative_done, mutator_done, mutant_done, mutant_done.result if result is None else result.get()
+        while pending:
+            relative_done, mutator_done, mutant_done, result = pending.popleft()
+            yield relative_done, mutator_done, mutant_done, mutant_done.result if result is None else result.get()
+
+    def execute(self):
+        modules = find_modules(self.package_dir, self.test_dir)
+        print(f"Project: {len(modules)} modules in {self.package_dir}, tests in {self.test_dir}")
+
+        # All workspaces live under one directory so they can be removed together
+        base_dir = tempfile.mkdtemp(prefix='mutation-pool-', dir=default_base_dir())
+        try:
+            self.calibrate(base_dir)
+            with open('mutation_log.txt', 'w') as f:
+                f.write('')
+            # file -> [mutants, killed, timeout, equivalent, duplicate, incompetent]
+            counts = {os.path.relpath(path, self.root): [0, 0, 0, 0, 0, 0] for path in modules}
+            with multiprocessing.Pool(self.jobs, initializer=init_worker,
+                                      initargs=(self.root, self.package_dir, self.test_dir, base_dir,
+                                                self.timeout)) as pool:
+                mutants = self.generate_mutants(modules)
+                for relative, mutator, mutant, (outcome, output) in self.run_mutants(pool, mutants):
+                    count = counts[relative]
+                    count[0] += 1
+                    if outcome in (SURVIVED, NO_COVERAGE):
+                        self.log(relative, mutator, mutant, output)
+                    elif outcome == EQUIVALENT:
+                        count[3] += 1
+                    elif outcome == DUPLICATE:
+                        count[4] += 1
+                    elif outcome == INCOMPETENT:
+                        count[5] += 1
+                    elif outcome in DETECTED:
+                        count[1] += 1
+                        if outcome == TIMEOUT:
+                            count[2] += 1
+        finally:
+            shutil.rmtree(base_dir, ignore_errors=True)
+        if self.pruned:
+            print(f"Pruned: {', '.join(f'{name} {count}' for name, count in self.pruned.items())} "
+                  f"mutation points without a mutant that changes the behaviour or runs")
+        self.report(counts)
+
+    def log(self, relative, mutator, mutant, output):
+        with open(os.path.join(self.root, relative), 'r') as f:
+            original_code = f.read()
+        with open('mutation_log.txt', 'a') as f:
+            f.write(f"File: {relative}\n")
+            f.write(f"Mutant Type: {mutator}\n")
+            if mutant.id is not None:
+                f.write(f"Mutant ID: {mutant.id}\n")
+            diff = difflib.unified_diff(mutant.code.splitlines(), original_code.splitlines(),
+                                        fromfile="mutant_code", tofile="original_code", lineterm="")
+            f.write('\n'.join(diff))
+            f.write('\n')
+            f.write(f"Output: {output}\n")
+            f.write('-' * 64)
+            f.write('\n')
+
+    def report(self, counts):
+        total = 0
+        kill = 0
+        for relative, (count, killed, timeout, equivalent, duplicate, incompetent) in counts.items():
+            # Equivalent, duplicate and incompetent mutants don't count in the score
+            scored = count - equivalent - duplicate - incompetent
+            total += scored
+            kill += killed
+            score = killed / scored if scored else 0
+            print(f"{relative} Mutants: {count}, Killed: {killed}, Timeout: {timeout}, "
+                  f"Equivalent: {equivalent}, Duplicate: {duplicate}, Incompetent: {incompetent}, Score: {score}")
+        if total == 0:
+            print("Mutation Score: 0")
+        else:
+            print(f"Mutation Score: {kill/total}")
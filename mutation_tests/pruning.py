@@ -0,0 +1,24 @@
+import ast
+
+
+def prune(mutator, points, changes):
+    """
+    Keep the mutation points where `changes(point)` says the operator changes
+    the behaviour of the code, and count the others in `mutator.pruned`.
+
+    Operators run it on the points they discover, so the mutants that would
+    only be found equivalent after compiling them are never built.
+    """
+    kept = [point for point in points if changes(point)]
+    mutator.pruned = len(points) - len(kept)
+    return kept
+
+
+def decorated(point, name):
+    # The function already has the decorator, like @staticmethod
+    return any(isinstance(decorator, ast.Name) and decorator.id == name for decorator in point.node.decorator_list)
+
+
+def pruned_counts(operators):
+    # Pruned points of every operator that pruned some, by name
+    return {name: operator.pruned for name, operator in operators if getattr(operator, 'pruned', 0)}
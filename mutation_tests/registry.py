@@ -0,0 +1,75 @@
+import importlib
+
+# Entry point group other packages register their mutation operators in
+ENTRY_POINT_GROUP = 'mutation_tests.operators'
+
+# Operator name -> 'module:class' of the built-in operators, imported when first asked for
+OPERATORS = {name: f"mutation_tests.{name}:{name}Mutator" for name in [
+    'AOD', 'AOR', 'ASR', 'BCR', 'CDI', 'COD', 'COI', 'CRP', 'DDL', 'EHD', 'EXS',
+    'IHD', 'IOD', 'IOP', 'LOD', 'LOI', 'LOR', 'ROR', 'SCD', 'SCI', 'SDI', 'SIR',
+]}
+
+# Classes loaded so far, by operator name
+_loaded = {}
+# Operators registered by other packages, read from the entry points once
+_plugins = None
+
+
+def plugins():
+    """
+    Return the entry points of the operators of other packages, by name.
+
+    A package adds an operator with an entry point in the 'mutation_tests.operators'
+    group, for example in its pyproject.toml:
+
+        [project.entry-points."mutation_tests.operators"]
+        XYZ = "my_package.xyz:XYZMutator"
+
+    The class is built like the built-in operators, as cls(tree, n, index, seed), and
+    has to yield Mutant objects from iter_mutants(). Only the entry points are
+    read here, the module of an operator is imported when the operator is used.
+    """
+    global _plugins
+    if _plugins is None:
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:
+            return {}
+        found = entry_points()
+        if hasattr(found, 'select'):
+            found = found.select(group=ENTRY_POINT_GROUP)
+        else:
+            found = found.get(ENTRY_POINT_GROUP, [])
+        # Built-in operators can't be replaced
+        _plugins = {entry_point.name: entry_point for entry_point in found if entry_point.name not in OPERATORS}
+    return _plugins
+
+
+def operator_names():
+    return list(OPERATORS) + sorted(plugins())
+
+
+def register(name, mutator_class):
+    # Add an operator without an entry point, like one defined in a test or a script
+    _loaded[name] = mutator_class
+
+
+def load_operator(name):
+    """
+    Return the class of the operator, importing its module on first use.
+    """
+    if name in _loaded:
+        return _loaded[name]
+    if name in OPERATORS:
+        module_name, class_name = OPERATORS[name].split(':')
+        mutator_class = getattr(importlib.import_module(module_name), class_name)
+    elif name in plugins():
+        mutator_class = plugins()[name].load()
+    else:
+        raise ValueError(f"Unknown mutation operator: {name}")
+    _loaded[name] = mutator_class
+    return mutator_class
+
+
+def make_operator(name, tree, n, index=None, seed=None):
+    return load_operator(name)(tree, n, index, seed)
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+from mutation_tests.outcomes import UNSCORED
+from mutation_tests.incremental import digest, unit_hashes, mutant_key
+
+
+class ResultStore:
+    """
+    A SQLite database with the outcome of every mutant, written as soon as the
+    mutant is done, so an interrupted run can be resumed.
+
+    The database also keeps the original code of every source file while a run
+    is in progress. When the previous run died while a mutant was written to the
+    source file, the original code is put back before anything else runs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # Every mutant is committed on its own, WAL keeps that cheap
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS runs ('
+            'source TEXT PRIMARY KEY, source_hash TEXT, tests_hash TEXT, original TEXT, dirty INTEGER, seed TEXT)')
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(runs)')]
+        if 'seed' not in columns:
+            # Written by a version that didn't record the seed
+            self.connection.execute('ALTER TABLE runs ADD COLUMN seed TEXT')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS mutants ('
+            'source TEXT, key TEXT, operator TEXT, lineno INTEGER, outcome TEXT, output TEXT, '
+            'PRIMARY KEY (source, key))')
+        self.connection.commit()
+
+        self.source_file = None
+        self.tree = None
+        self.units = None
+        # Keys of the mutants that already have a row in the database
+        self.recorded = set()
+        self.resumed = 0
+
+    def recover(self, source_file):
+        """
+        Put the original code back if the previous run was interrupted while the
+        source file held a mutant. Returns True when the file was restored.
+        """
+        row = self.connection.execute('SELECT original, dirty FROM runs WHERE source = ?',
+                                      (os.path.abspath(source_file),)).fetchone()
+        if row is None or not row[1]:
+            return False
+
+        original = row[0]
+        with open(source_file, 'r') as f:
+            current = f.read()
+        if current != original:
+            with open(source_file, 'w') as f:
+                f.write(original)
+        self.connection.execute('UPDATE runs SET dirty = 0 WHERE source = ?', (os.path.abspath(source_file),))
+        self.connection.commit()
+        return current != original
+
+    def seed(self, source_file):
+        # Seed of the recorded run on the source file, None if there is none
+        row = self.connection.execute('SELECT seed FROM runs WHERE source = ?',
+                                      (os.path.abspath(source_file),)).fetchone()
+        return None if row is None else row[0]
+
+    def begin(self, source_file, test_file, original_code, tree, resume=False, dirty=False, seed=None):
+        """
+        Start a run on the source file. Without `resume`, or when the source file or
+        the tests changed since the recorded run, the recorded mutants are dropped.
+        `dirty` tells that mutants are written to the source file itself, `seed` is
+        recorded for the run to be resumed with the same mutants.
+        """
+        self.source_file = os.path.abspath(source_file)
+        self.tree = tree
+        self.units = unit_hashes(tree)
+        source_hash = digest(original_code)
+        with open(test_file, 'r') as f:
+            tests_hash = digest(f.read())
+
+        row = self.connection.execute('SELECT source_hash, tests_hash FROM runs WHERE source = ?',
+                                      (self.source_file,)).fetchone()
+        if not resume or row != (source_hash, tests_hash):
+            self.connection.execute('DELETE FROM mutants WHERE source = ?', (self.source_file,))
+        self.connection.execute('INSERT OR REPLACE INTO runs (source, source_hash, tests_hash, original, dirty, seed) '
+                                'VALUES (?, ?, ?, ?, ?, ?)',
+                                (self.source_file, source_hash, tests_hash, original_code, int(dirty), seed))
+        self.connection.commit()
+
+    def load(self, generated):
+        # Give the mutants that are already recorded their outcome instead of running them again
+        rows = self.connection.execute('SELECT key, outcome, output FROM mutants WHERE source = ?',
+                                       (self.source_file,))
+        # Equivalent, duplicate and incompetent mutants are found again before they run
+        previous = {key: (outcome, output) for key, outcome, output in rows if outcome not in UNSCORED}
+        for mutator, mutants in generated:
+            yield mutator, self.loaded(mutants, previous)
+
+    def loaded(self, mutants, previous):
+        for mutant in mutants:
+            if mutant.tree is not None:
+                if mutant.key is None:
+                    mutant.key = mutant_key(self.tree, self.units, mutant)
+                if mutant.key in previous:
+                    self.recorded.add(mutant.key)
+                    if mutant.result is None:
+                        mutant.result = previous[mutant.key]
+                        self.resumed += 1
+            yield mutant
+
+    def record(self, mutant, result):
+        if mutant.key is None or mutant.key in self.recorded:
+            return
+        outcome, output = result
+        self.connection.execute('INSERT OR REPLACE INTO mutants VALUES (?, ?, ?, ?, ?, ?)',
+                                (self.source_file, mutant.key, mutant.operator, mutant.lineno, outcome, output))
+        self.connection.commit()
+        self.recorded.add(mutant.key)
+
+    def finish(self):
+        # The source file holds its original code again
+        self.connection.execute('UPDATE runs SET dirty = 0 WHERE source = ?', (self.source_file,))
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
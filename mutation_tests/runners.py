@@ -0,0 +1,196 @@
+import io
+import os
+import sys
+import types
+import marshal
+import signal
+import traceback
+import subprocess
+from contextlib import contextmanager, redirect_stdout, redirect_stderr
+from mutation_tests.outcomes import KILLED, SURVIVED, TIMEOUT
+
+
+class MutantTimeout(KeyboardInterrupt):
+    """
+    Raised in the running mutant when its time is up.
+
+    It derives from KeyboardInterrupt because unittest lets that one escape the
+    test case, so the remaining tests of a timed out mutant are not run.
+    """
+
+
+class SubprocessRunner:
+    """
+    Run the test file in a fresh interpreter for every mutant.
+    """
+
+    def __init__(self, source_file, test_file, cwd=None, timeout=None):
+        self.source_file = source_file
+        self.test_file = test_file
+        self.cwd = cwd
+        self.timeout = timeout
+        self.written = None
+
+    def run_tests(self, tests=None):
+        # Use python to run tests and capture the output, in a new session so the
+        # whole process group can be killed when the mutant hangs.
+        # unittest.main() takes the names of the tests to run from the command line
+        command = ['python', self.test_file] + list(tests or [])
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                   cwd=self.cwd, start_new_session=True)
+        try:
+            _, stderr = process.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            _, stderr = process.communicate()
+            return TIMEOUT, stderr
+        return (SURVIVED if process.returncode == 0 else KILLED), stderr
+
+    def run(self, code, tests=None):
+        # Write the mutated code to the source file, unless it is already there
+        if code is not self.written:
+            with open(self.source_file, 'w') as f:
+                f.write(code)
+            self.written = code
+        return self.run_tests(tests)
+
+
+class InProcessRunner:
+    """
+    Run the unittest suite of the test file inside the current process.
+
+    The mutant (source text or an already mutated AST) is compiled straight to a
+    code object and installed in sys.modules under the name of the target module,
+    so no file is written and no interpreter is started. The original module is
+    restored after every run.
+    """
+
+    def __init__(self, source_file, test_file, cwd=None, timeout=None):
+        self.source_file = os.path.abspath(source_file)
+        self.test_file = os.path.abspath(test_file)
+        self.timeout = timeout
+        self.module_name = os.path.splitext(os.path.basename(self.source_file))[0]
+        self.search_paths = [os.path.dirname(self.test_file), os.path.dirname(self.source_file)]
+
+        # The test file is compiled once and executed again for every mutant,
+        # because `from module import *` binds names at import time
+        with open(self.test_file, 'r') as f:
+            self.test_code = compile(f.read(), self.test_file, 'exec')
+
+    def compile(self, mutant):
+        # Already compiled, like the schema of the schemata mode
+        if isinstance(mutant, types.CodeType):
+            return mutant
+        # A code object sent to a pool worker, code objects can't be pickled
+        if isinstance(mutant, bytes):
+            return marshal.loads(mutant)
+        return compile(mutant, self.source_file, 'exec')
+
+    def load_module(self, code_object):
+        module = types.ModuleType(self.module_name)
+        module.__file__ = self.source_file
+        exec(code_object, module.__dict__)
+        return module
+
+    def is_project_module(self, module):
+        path = getattr(module, '__file__', None)
+        if not path:
+            return False
+        path = os.path.abspath(path)
+        return any(os.path.dirname(path) == directory for directory in self.search_paths)
+
+    @contextmanager
+    def installed(self, module):
+        # Install the module under the target's name for the duration of the block
+        saved_module = sys.modules.get(self.module_name)
+        saved_modules = set(sys.modules)
+        saved_path = list(sys.path)
+
+        sys.modules[self.module_name] = module
+        sys.path[:0] = self.search_paths
+        try:
+            yield module
+        finally:
+            # Drop project modules imported by the tests, they may hold on to the mutant
+            for name in set(sys.modules) - saved_modules:
+                if self.is_project_module(sys.modules[name]):
+                    del sys.modules[name]
+            sys.path[:] = saved_path
+            if saved_module is None:
+                sys.modules.pop(self.module_name, None)
+            else:
+                sys.modules[self.module_name] = saved_module
+
+    def load_tests(self, tests=None):
+        # Only the in-process backends need unittest in the framework process
+        import unittest
+        test_module = types.ModuleType('__mutation_test__')
+        test_module.__file__ = self.test_file
+        exec(self.test_code, test_module.__dict__)
+
+        if tests:
+            return unittest.defaultTestLoader.loadTestsFromNames(tests, test_module)
+        return unittest.defaultTestLoader.loadTestsFromModule(test_module)
+
+    def run_suite(self, module, tests=None):
+        import unittest
+        stream = io.StringIO()
+        try:
+            with self.installed(module), redirect_stdout(stream), redirect_stderr(stream):
+                suite = self.load_tests(tests)
+                result = unittest.TextTestRunner(stream=stream).run(suite)
+            return (SURVIVED if result.wasSuccessful() else KILLED), stream.getvalue()
+        except BaseException as e:
+            if isinstance(e, KeyboardInterrupt):
+                raise
+            return KILLED, stream.getvalue() + traceback.format_exc()
+
+    def on_timeout(self, signum, frame):
+        raise MutantTimeout()
+
+    def with_timeout(self, function, *args):
+        if self.timeout is None:
+            return function(*args)
+
+        # The alarm interrupts the mutant even when it is stuck in an infinite loop
+        handler = signal.signal(signal.SIGALRM, self.on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, self.timeout)
+        try:
+            return function(*args)
+        except MutantTimeout:
+            return TIMEOUT, f"Timed out after {self.timeout:.2f} seconds"
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, handler)
+
+    def run(self, mutant, tests=None):
+        return self.with_timeout(self.run_mutant, mutant, tests)
+
+    def run_mutant(self, mutant, tests=None):
+        try:
+            module = self.load_module(self.compile(mutant))
+        except BaseException as e:
+            if isinstance(e, KeyboardInterrupt):
+                raise
+            # A mutant that can not even be imported is killed
+            return KILLED, traceback.format_exc()
+        return self.run_suite(module, tests)
+
+    def run_tests(self, tests=None):
+        with open(self.source_file, 'r') as f:
+            return self.run(f.read(), tests)
+
+
+RUNNERS = {
+    'subprocess': SubprocessRunner,
+    'inprocess': InProcessRunner,
+}
+
+
+def make_runner(backend, source_file, test_file, cwd=None, timeout=None):
+    if backend not in RUNNERS:
+        raise ValueError(f"Unknown backend: {backend}")
+    return RUNNERS[backend](source_file, test_file, cwd, timeout)
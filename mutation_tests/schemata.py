@@ -0,0 +1,264 @@
+import os
+import ast
+from mutation_tests import unparse
+from copy import deepcopy
+from mutation_tests.runners import SubprocessRunner
+
+# Module global holding the id of the active mutant, and the environment variable it is read from
+SWITCH = '__mutant_id__'
+ENV = 'MUTANT_ID'
+
+FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+def is_statement_list(value):
+    return isinstance(value, list) and bool(value) and all(isinstance(item, ast.stmt) for item in value)
+
+
+def is_node_list(value):
+    return isinstance(value, list) and bool(value) and all(isinstance(item, ast.AST) for item in value)
+
+
+def same_node(a, b):
+    # Mutants share every subtree they don't change with the original tree
+    return a is b or ast.dump(a) == ast.dump(b)
+
+
+def common_ends(original, mutated):
+    # Number of equal statements at the start and at the end of the two lists
+    shortest = min(len(original), len(mutated))
+
+    prefix = 0
+    while prefix < shortest and same_node(original[prefix], mutated[prefix]):
+        prefix += 1
+    suffix = 0
+    while suffix < shortest - prefix and same_node(original[-1 - suffix], mutated[-1 - suffix]):
+        suffix += 1
+    return prefix, suffix
+
+
+def find_switch(original, mutated, path=()):
+    """
+    Find the smallest run of statements that differs between the original node
+    and its mutated copy.
+
+    Returns (path, field, start, end, replacement): the statements
+    original.<path>.<field>[start:end] have to be replaced by `replacement` to
+    get the mutant. Returns None when no switch can be placed inside the node.
+    """
+    if type(original) is not type(mutated):
+        return None
+
+    differing = []
+    for field, value in ast.iter_fields(original):
+        mutated_value = getattr(mutated, field, None)
+        if isinstance(value, list) and isinstance(mutated_value, list):
+            same = len(value) == len(mutated_value) and all(
+                same_node(a, b) if isinstance(a, ast.AST) and isinstance(b, ast.AST) else a == b
+                for a, b in zip(value, mutated_value))
+        elif isinstance(value, ast.AST) and isinstance(mutated_value, ast.AST):
+            same = same_node(value, mutated_value)
+        else:
+            same = value == mutated_value
+        if not same:
+            differing.append(field)
+
+    # The difference must be inside a single list of the node
+    if len(differing) != 1:
+        return None
+    field = differing[0]
+    value = getattr(original, field)
+    mutated_value = getattr(mutated, field)
+
+    if is_statement_list(value) and isinstance(mutated_value, list):
+        prefix, suffix = common_ends(value, mutated_value)
+        start, end = prefix, len(value) - suffix
+        replacement = mutated_value[prefix:len(mutated_value) - suffix]
+
+        # A single changed statement: try to put the switch further down
+        if end - start == 1 and len(replacement) == 1:
+            deeper = find_switch(value[start], replacement[0], path + ((field, start),))
+            if deeper is not None:
+                return deeper
+        return path, field, start, end, replacement
+
+    if is_node_list(value) and isinstance(mutated_value, list) and len(value) == len(mutated_value):
+        # Except handlers and match cases can't hold a switch themselves, only their bodies can
+        changed = [i for i, (a, b) in enumerate(zip(value, mutated_value)) if not same_node(a, b)]
+        if len(changed) == 1:
+            i = changed[0]
+            return find_switch(value[i], mutated_value[i], path + ((field, i),))
+    return None
+
+
+def resolve(tree, path):
+    node = tree
+    for field, index in path:
+        node = getattr(node, field)[index]
+    return node
+
+
+def make_switch(alternatives, default):
+    # if __mutant_id__ == a: ... elif __mutant_id__ == b: ... else: <original statements>
+    orelse = default or [ast.Pass()]
+    for mutant_id, body in reversed(alternatives):
+        test = ast.Compare(left=ast.Name(id=SWITCH, ctx=ast.Load()), ops=[ast.Eq()],
+                           comparators=[ast.Constant(value=mutant_id)])
+        orelse = [ast.If(test=test, body=body or [ast.Pass()], orelse=orelse)]
+    return orelse[0]
+
+
+class Schema:
+    """
+    A single instrumented version of the target module that contains all mutants.
+
+    Every mutation point is replaced by a switch on the id of the active mutant,
+    which is read from the MUTANT_ID environment variable when the module is
+    imported and kept in a module global. The meta-module is compiled once, and
+    a mutant is activated by changing the id instead of parsing, unparsing and
+    compiling the mutated module.
+
+    Switches inside function bodies are evaluated when the function runs, so
+    those mutants can be activated in an already imported module. Switches at
+    module or class level run at import time, so those mutants need the module
+    to be executed again with the id set.
+    """
+
+    def __init__(self, tree, mutants):
+        self.original = tree
+        self.tree = deepcopy(tree)
+        # Ids of the mutants that are activated at import time
+        self.import_time = set()
+        # Mutants that could not be put in the schema, by position in `mutants`
+        self.excluded = set()
+
+        switches = []
+        for mutant_id, mutant in enumerate(mutants):
+            switch = find_switch(tree, mutant.tree)
+            if switch is None:
+                if ast.dump(tree) != ast.dump(mutant.tree):
+                    self.excluded.add(mutant_id)
+                # Otherwise the mutant equals the original, it runs without any switch
+                continue
+            switches.append((mutant_id, switch))
+
+        self.build(switches)
+        try:
+            compile(self.tree, '<schema>', 'exec')
+        except Exception:
+            # Drop the mutants that do not compile on their own and build the schema again
+            valid = []
+            for mutant_id, switch in switches:
+                try:
+                    compile(mutants[mutant_id].tree, '<mutant>', 'exec')
+                    valid.append((mutant_id, switch))
+                except Exception:
+                    self.excluded.add(mutant_id)
+            self.tree = deepcopy(tree)
+            self.import_time = set()
+            self.build(valid)
+        self.source = None
+
+    def build(self, switches):
+        # Group the switches by the statement list they replace statements of
+        groups = {}
+        for mutant_id, (path, field, start, end, replacement) in switches:
+            groups.setdefault((path, field), []).append((start, end, mutant_id, replacement))
+
+            parents = [self.original] + [resolve(self.original, path[:i + 1]) for i in range(len(path))]
+            if not any(isinstance(node, FUNCTIONS) for node in parents):
+                self.import_time.add(mutant_id)
+
+        # Deepest lists first, so the paths of the remaining switches stay valid
+        for (path, field) in sorted(groups, key=lambda key: len(key[0]), reverse=True):
+            statements = getattr(resolve(self.tree, path), field)
+            original = getattr(resolve(self.original, path), field)
+
+            # Merge overlapping ranges, then replace them from right to left
+            entries = sorted(groups[(path, field)], key=lambda entry: entry[0])
+            merged = []
+            for start, end, mutant_id, replacement in entries:
+                if merged and start < max(merged[-1][1], merged[-1][0] + 1):
+                    merged[-1][1] = max(merged[-1][1], end)
+                    merged[-1][2].append((start, end, mutant_id, replacement))
+                else:
+                    merged.append([start, end, [(start, end, mutant_id, replacement)]])
+
+            for start, end, members in reversed(merged):
+                alternatives = []
+                for member_start, member_end, mutant_id, replacement in members:
+                    body = (deepcopy(original[start:member_start]) + replacement +
+                            deepcopy(original[member_end:end]))
+                    alternatives.append((mutant_id, body))
+                statements[start:end] = [make_switch(alternatives, statements[start:end])]
+
+        # Read the active mutant once, after the docstring and the __future__ imports
+        position = 0
+        body = self.tree.body
+        if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+                and isinstance(body[0].value.value, str):
+            position = 1
+        while position < len(body) and isinstance(body[position], ast.ImportFrom) \
+                and body[position].module == '__future__':
+            position += 1
+        prelude = ast.parse(f"{SWITCH} = int(__import__('os').environ.get('{ENV}', '-1'))").body
+        body[position:position] = prelude
+        ast.fix_missing_locations(self.tree)
+
+    def get_source(self):
+        # Only needed by the subprocess backend, which writes the schema to the source file once
+        if self.source is None:
+            self.source = unparse.to_source(self.tree)
+        return self.source
+
+
+class SchemataRunner:
+    """
+    Run the mutants of a schema by id with the given runner.
+
+    Mutants given as code (the ones left out of the schema) are passed on to the runner.
+    """
+
+    def __init__(self, runner, schema):
+        self.runner = runner
+        self.schema = schema
+        self.code_object = None
+        self.module = None
+
+    def activate(self, mutant_id):
+        os.environ[ENV] = str(mutant_id)
+
+    def load(self):
+        # Compile and import the schema, once per worker
+        if isinstance(self.runner, SubprocessRunner) or self.module is not None:
+            return
+        self.code_object = self.runner.compile(self.schema.tree)
+        self.activate(-1)
+        try:
+            self.module = self.runner.load_module(self.code_object)
+        except Exception:
+            self.module = None
+
+    def run(self, mutant, tests=None):
+        if not isinstance(mutant, int):
+            return self.runner.run(mutant, tests)
+
+        self.activate(mutant)
+        try:
+            if isinstance(self.runner, SubprocessRunner):
+                # The schema is written once, the child reads the id from the environment
+                return self.runner.run(self.schema.get_source(), tests)
+            self.load()
+            if self.module is None or mutant in self.schema.import_time:
+                return self.runner.run(self.code_object, tests)
+            return self.runner.with_timeout(self.run_switched, mutant, tests)
+        finally:
+            self.activate(-1)
+
+    def run_switched(self, mutant_id, tests):
+        # The schema is already imported, only flip the id of the active mutant
+        setattr(self.module, SWITCH, mutant_id)
+        try:
+            return self.runner.run_suite(self.module, tests)
+        finally:
+            setattr(self.module, SWITCH, -1)
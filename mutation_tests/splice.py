@@ -0,0 +1,296 @@
+import io
+import ast
+from mutation_tests import unparse
+from mutation_tests.mutation_index import same
+
+# Operators and contexts have no position, the expression that holds them is replaced
+SHARED = (ast.expr_context, ast.boolop, ast.operator, ast.unaryop, ast.cmpop)
+# Nodes that start their own lines, so a run of them is replaced line by line
+LINE_NODES = (ast.stmt, ast.excepthandler) + ((ast.match_case,) if hasattr(ast, 'match_case') else ())
+# Expressions that can't lose the parentheses put around them
+KEEP_PARENTHESES = (ast.Tuple, ast.NamedExpr, ast.Starred, ast.Lambda, ast.Yield, ast.YieldFrom, ast.GeneratorExp)
+# Expressions that bind tighter than any operator, they never need parentheses
+ATOMS = (ast.Constant, ast.JoinedStr, ast.Name, ast.Attribute, ast.Subscript, ast.Call, ast.List, ast.Dict, ast.Set,
+         ast.ListComp, ast.SetComp, ast.DictComp)
+
+
+def positioned(node):
+    return getattr(node, 'end_lineno', None) is not None and getattr(node, 'end_col_offset', None) is not None
+
+
+def parse_expression(text):
+    try:
+        return ast.parse(text, mode='eval').body
+    except SyntaxError:
+        return None
+
+
+def enclosed(text):
+    # True when the whole expression is in one pair of parentheses, not `(a) + (b)`
+    if not (text.startswith('(') and text.endswith(')')):
+        return False
+    inner = parse_expression(text[1:-1])
+    return inner is not None and ast.dump(inner) == ast.dump(parse_expression(text))
+
+
+def is_blank(text):
+    # Nothing but whitespace or a comment
+    text = text.strip()
+    return not text or text.startswith('#')
+
+
+class Splicer:
+    """
+    Build the code of a mutant from the original code instead of unparsing the
+    whole mutated tree.
+
+    Mutated trees share every unchanged subtree with the original tree, so the
+    smallest node that differs is found by following the copied nodes down from
+    the root. Only the source span of that node (lineno/col_offset to
+    end_lineno/end_col_offset) is replaced by the unparsed replacement, the
+    rest of the code, comments and formatting included, is kept as it is.
+
+    When the change can't be placed in the original code, like a statement that
+    shares its line with another one, the whole tree is unparsed.
+    """
+
+    def __init__(self, source, tree):
+        self.source = source
+        self.tree = tree
+        # Split on the same line endings as the parser
+        self.lines = io.StringIO(source, newline='').readlines()
+        self.starts = [0]
+        for line in self.lines:
+            self.starts.append(self.starts[-1] + len(line))
+        # Nodes of the original tree, their text can be reused
+        self.original = {id(node) for node in ast.walk(tree)}
+
+    def to_source(self, mutated):
+        try:
+            edit = self.edit(self.tree, mutated)
+        except Exception:
+            edit = None
+        if edit is None:
+            return unparse.to_source(mutated)
+        start, end, text = edit
+        return self.source[:start] + text + self.source[end:]
+
+    def column(self, lineno, col_offset):
+        # The parser counts columns in bytes of UTF-8
+        line = self.lines[lineno - 1]
+        if line.isascii():
+            return col_offset
+        return len(line.encode()[:col_offset].decode())
+
+    def offset(self, lineno, col_offset=0):
+        if lineno > len(self.lines):
+            return len(self.source)
+        return self.starts[lineno - 1] + self.column(lineno, col_offset)
+
+    def before(self, node):
+        # Text on the first line of the node, before the node
+        return self.lines[node.lineno - 1][:self.column(node.lineno, node.col_offset)]
+
+    def after(self, node):
+        # Text on the last line of the node, after the node
+        return self.lines[node.end_lineno - 1][self.column(node.end_lineno, node.end_col_offset):]
+
+    def edit(self, original, mutated):
+        """
+        Return (start, end, text): the code from start to end has to be replaced by
+        text to get the code of `mutated`. Returns None when the change can't be
+        placed inside `original`, then its parent is replaced as a whole.
+        """
+        if isinstance(original, ast.JoinedStr):
+            # The positions of the nodes inside f-strings are not reliable
+            return None
+
+        differing = [field for field, value in ast.iter_fields(original)
+                     if not same(value, getattr(mutated, field, None))]
+
+        if not differing:
+            # Nothing changed
+            return 0, 0, ''
+        if len(differing) != 1:
+            return None
+
+        field = differing[0]
+        value = getattr(original, field)
+        mutated_value = getattr(mutated, field)
+        if isinstance(value, list) and isinstance(mutated_value, list):
+            return self.edit_list(original, field, value, mutated_value)
+        return self.edit_node(original, value, mutated_value)
+
+    def edit_node(self, parent, node, mutated):
+        # A single changed child: place the change inside it, or else replace it
+        if not isinstance(node, ast.AST) or isinstance(node, SHARED):
+            return None
+        if type(node) is type(mutated):
+            edit = self.edit(node, mutated)
+            if edit is not None:
+                return edit
+        if isinstance(node, ast.expr) and isinstance(mutated, ast.expr) and positioned(node):
+            return self.replace_expression(parent, node, mutated)
+        return None
+
+    def edit_list(self, parent, field, value, mutated):
+        # Number of equal items at the start and at the end of the lists
+        shortest = min(len(value), len(mutated))
+        prefix = 0
+        while prefix < shortest and value[prefix] is mutated[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < shortest - prefix and value[-1 - suffix] is mutated[-1 - suffix]:
+            suffix += 1
+        end, mutated_end = len(value) - suffix, len(mutated) - suffix
+
+        if end - prefix == 1 and mutated_end - prefix == 1:
+            edit = self.edit_node(parent, value[prefix], mutated[prefix])
+            if edit is not None:
+                return edit
+
+        items = value[prefix:end] + mutated[prefix:mutated_end]
+        if field == 'decorator_list':
+            return self.edit_decorators(parent, value, prefix, end, mutated[prefix:mutated_end])
+        if value and all(isinstance(item, LINE_NODES) for item in value + items):
+            return self.edit_lines(value, prefix, end, mutated[prefix:mutated_end])
+        return None
+
+    def replace_expression(self, parent, node, mutated):
+        text = unparse.to_source(mutated).strip()
+        start = self.offset(node.lineno, node.col_offset)
+        end = self.offset(node.end_lineno, node.end_col_offset)
+        if isinstance(mutated, ast.GeneratorExp) and not isinstance(parse_expression(text), ast.GeneratorExp):
+            # The only argument of a call shares the parentheses of the call, astor leaves them out
+            text = f"({text})"
+        elif not enclosed(text) and parse_expression(f"({text})") is not None:
+            # ast.unparse leaves out the parentheses astor puts around every compound expression
+            text = f"({text})"
+
+        # Atoms never need the parentheses, and directly below a statement or as an argument
+        # the expression can't bind to anything else. `1.real` would be a float, so numbers keep them there
+        if enclosed(text) and '\n' not in text:
+            inner = parse_expression(text[1:-1])
+            if isinstance(inner, ATOMS) and not self.source.startswith('.', end) or \
+                    self.separated(parent, node) and not isinstance(mutated, KEEP_PARENTHESES):
+                text = text[1:-1]
+        return start, end, text
+
+    def separated(self, parent, node):
+        # The expression is a statement of its own, or an argument between commas
+        if isinstance(parent, (ast.stmt, ast.keyword)):
+            return True
+        return isinstance(parent, ast.Call) and node is not parent.func
+
+    def first_line(self, node):
+        # Decorators come before the line of a function or a class
+        return min([node.lineno] + [decorator.lineno for decorator in getattr(node, 'decorator_list', [])])
+
+    def indentation(self, node):
+        # The indentation of the line the node starts, None if the line starts with something else
+        text = self.before(node)
+        if text.strip():
+            return None
+        if self.first_line(node) != node.lineno:
+            # The first decorator starts the line
+            text = self.lines[self.first_line(node) - 1][:len(text)]
+            if text.strip():
+                return None
+        return text
+
+    def text_of(self, node, indentation):
+        # The original code of the statement, moved to another indentation
+        own = self.indentation(node)
+        if own is None or not is_blank(self.after(node)):
+            return None
+        start = self.offset(self.first_line(node))
+        end = self.offset(node.end_lineno, node.end_col_offset)
+        lines = []
+        for line in self.source[start:end].splitlines(True):
+            if not line.strip():
+                lines.append(line)
+            elif line.startswith(own):
+                lines.append(indentation + line[len(own):])
+            else:
+                return None
+        return ''.join(lines)
+
+    def block(self, nodes, indentation):
+        """
+        Return the code of the statements at the given indentation and the
+        statements that code has to parse to.
+        """
+        lines = []
+        expected = []
+        for node in nodes:
+            text = None
+            if id(node) in self.original and positioned(node):
+                text = self.text_of(node, indentation)
+            if text is None:
+                code = unparse.to_source(node)
+                text = ''.join(indentation + line if line.strip() else line for line in code.splitlines(True))
+            # Nodes of the original tree came from the parser, new ones are compared to the parsed unparse
+            expected.append(node if id(node) in self.original else ast.parse(code).body[0])
+            lines.append(text.rstrip('\n') + '\n')
+        return ''.join(lines), expected
+
+    def parses_to(self, text, indentation, expected):
+        # Moving lines can change multi-line strings, so the new code is parsed again
+        try:
+            if indentation:
+                parsed = ast.parse('if 1:\n' + text).body[0].body
+            else:
+                parsed = ast.parse(text).body
+        except SyntaxError:
+            return False
+        return len(parsed) == len(expected) and all(ast.dump(a) == ast.dump(b) for a, b in zip(parsed, expected))
+
+    def edit_lines(self, value, start, end, replacement):
+        """
+        Replace the statements value[start:end], each of them on lines of their own,
+        with the replacement statements.
+        """
+        anchor = value[start] if start < len(value) else value[-1]
+        indentation = self.indentation(anchor)
+        if indentation is None or not all(positioned(node) for node in value[start:end] + [anchor]):
+            return None
+        text, expected = self.block(replacement, indentation)
+        if replacement and not self.parses_to(text, indentation, expected):
+            return None
+
+        if start == end:
+            # Insertion before a statement, or after the last one
+            if start < len(value):
+                position = self.offset(self.first_line(anchor))
+            else:
+                if not is_blank(self.after(anchor)):
+                    return None
+                position = self.offset(anchor.end_lineno + 1)
+                if not self.source[:position].endswith(('\n', '\r')):
+                    text = '\n' + text
+            return position, position, text
+
+        last = value[end - 1]
+        if not is_blank(self.after(last)):
+            return None
+        # The whole lines of the statements are replaced, trailing comments included
+        return self.offset(self.first_line(value[start])), self.offset(last.end_lineno + 1), text
+
+    def edit_decorators(self, node, value, start, end, replacement):
+        # Decorators are on lines of their own, '@' followed by the expression
+        indentation = self.before(node)
+        if indentation.strip():
+            return None
+        text = ''.join(f"{indentation}@{unparse.to_source(decorator).strip()}\n" for decorator in replacement)
+
+        if start == end:
+            lineno = value[start].lineno if start < len(value) else node.lineno
+            if start < len(value) and self.before(value[start]).strip() != '@':
+                return None
+            position = self.offset(lineno)
+            return position, position, text
+
+        if any(self.before(decorator).strip() != '@' or not is_blank(self.after(decorator))
+               for decorator in value[start:end]):
+            return None
+        return self.offset(value[start].lineno), self.offset(value[end - 1].end_lineno + 1), text
@@ -0,0 +1,254 @@
+import ast
+
+FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+SCOPES = FUNCTIONS + (ast.ClassDef, ast.Module)
+# Types that mix with each other in arithmetic
+NUMBERS = {'bool', 'int', 'float', 'complex'}
+SEQUENCES = {'str', 'bytes', 'list', 'tuple'}
+# Types the names of annotations and of calls to the builtins stand for
+TYPE_NAMES = {'int': 'int', 'float': 'float', 'complex': 'complex', 'bool': 'bool', 'str': 'str', 'bytes': 'bytes',
+              'list': 'list', 'tuple': 'tuple', 'dict': 'dict', 'set': 'set',
+              'List': 'list', 'Tuple': 'tuple', 'Dict': 'dict', 'Set': 'set'}
+CALLS = dict(TYPE_NAMES, len='int', repr='str', sorted='list')
+LITERALS = {ast.JoinedStr: 'str', ast.List: 'list', ast.ListComp: 'list', ast.Tuple: 'tuple', ast.Dict: 'dict',
+            ast.DictComp: 'dict', ast.Set: 'set', ast.SetComp: 'set', ast.Compare: 'bool'}
+# An operation that raises a TypeError for its operand types
+INVALID = 'invalid'
+
+
+def binary(op, left, right):
+    """
+    Return the type of `left <op> right`, INVALID when the operation raises a
+    TypeError, None when it is not known.
+    """
+    if left is None or right is None:
+        return None
+    if left in NUMBERS and right in NUMBERS:
+        integers = left in ('bool', 'int') and right in ('bool', 'int')
+        if isinstance(op, (ast.BitAnd, ast.BitOr, ast.BitXor)):
+            if not integers:
+                return INVALID
+            return 'bool' if left == right == 'bool' else 'int'
+        if isinstance(op, (ast.LShift, ast.RShift)):
+            return 'int' if integers else INVALID
+        if isinstance(op, ast.MatMult):
+            return INVALID
+        if 'complex' in (left, right):
+            return INVALID if isinstance(op, (ast.FloorDiv, ast.Mod)) else 'complex'
+        if isinstance(op, ast.Div) or 'float' in (left, right):
+            return 'float'
+        return 'int'
+    if left in SEQUENCES or right in SEQUENCES:
+        if isinstance(op, ast.Add) and left == right:
+            return left
+        if isinstance(op, ast.Mult) and (left in SEQUENCES and right in ('bool', 'int')
+                                         or right in SEQUENCES and left in ('bool', 'int')):
+            return left if left in SEQUENCES else right
+        if isinstance(op, ast.Mod) and left in ('str', 'bytes'):
+            return left
+        return INVALID
+    if left == right == 'set' and isinstance(op, (ast.BitAnd, ast.BitOr, ast.BitXor, ast.Sub)):
+        return 'set'
+    if left == right == 'dict' and isinstance(op, ast.BitOr):
+        return 'dict'
+    return INVALID
+
+
+def annotation_type(annotation):
+    # int, list[int], List[int] and the like, None for any other annotation
+    if isinstance(annotation, ast.Subscript):
+        annotation = annotation.value
+    if isinstance(annotation, ast.Name):
+        return TYPE_NAMES.get(annotation.id)
+    return None
+
+
+class TypeInference:
+    """
+    Flow-insensitive types of the local names of a module, for the operators
+    to leave out mutants that raise a TypeError as soon as they run, like
+    `'a' - 'b'` from `'a' + 'b'`.
+
+    A name has a type when every binding of the name in its scope gives it the
+    same one: literals, annotations, the results of the builtins like len() and
+    str(), and simple assignments of expressions of known types. A name bound in
+    any other way (loops, imports, unpacking, global, ...) has no known type, so
+    operations on it are never left out.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        # Scope node -> name -> bindings, a binding is (kind, value), kind being 'value' (an expression),
+        # 'annotation' (an AnnAssign), 'augmented' (an AugAssign), 'type' (a type) or 'unknown'
+        self.bindings = {}
+        # Names declared global or nonlocal anywhere, they can change from anywhere
+        self.escaped = set()
+        # (id of the scope, name) -> type, None while it is being resolved
+        self.resolved = {}
+
+        for point in index.find(ast.Global, ast.Nonlocal):
+            self.escaped.update(point.node.names)
+        for point in index.find(ast.Assign, ast.AnnAssign, ast.AugAssign, ast.NamedExpr):
+            node = point.node
+            if isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        self.bind(point, target.id, 'value', node.value)
+            elif isinstance(node.target, ast.Name):
+                if isinstance(node, ast.AnnAssign):
+                    self.bind(point, node.target.id, 'annotation', node)
+                elif isinstance(node, ast.AugAssign):
+                    self.bind(point, node.target.id, 'augmented', node)
+                else:
+                    self.bind(point, node.target.id, 'value', node.value)
+        for point in index.find(ast.Name):
+            # Every other name that is stored: loop targets, unpacking, with, comprehensions, ...
+            if isinstance(point.node.ctx, (ast.Store, ast.Del)) and not self.simple_target(point):
+                self.bind(point, point.node.id, 'unknown', None)
+        for point in index.find(ast.arg):
+            # Arguments are bound in their function, *args is a tuple and **kwargs a dict
+            if point.field == 'vararg':
+                binding = ('type', 'tuple')
+            elif point.field == 'kwarg':
+                binding = ('type', 'dict')
+            elif point.node.annotation is not None:
+                binding = ('type', annotation_type(point.node.annotation))
+            else:
+                binding = ('unknown', None)
+            self.bindings.setdefault(point.parent.parent.node, {}).setdefault(point.node.arg, []).append(binding)
+        for point in index.find(ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.ExceptHandler):
+            if getattr(point.node, 'name', None):
+                self.bind(point, point.node.name, 'unknown', None)
+        for point in index.find(ast.Import, ast.ImportFrom):
+            for alias in point.node.names:
+                self.bind(point, alias.asname or alias.name.split('.')[0], 'unknown', None)
+        for match_type in ('MatchAs', 'MatchStar', 'MatchMapping'):
+            if hasattr(ast, match_type):
+                for point in index.find(getattr(ast, match_type)):
+                    name = getattr(point.node, 'name', None) or getattr(point.node, 'rest', None)
+                    if name:
+                        self.bind(point, name, 'unknown', None)
+
+    def simple_target(self, point):
+        # The name is bound by one of the assignments read in __init__
+        parent = point.parent.node
+        if isinstance(parent, ast.Assign):
+            return point.field == 'targets'
+        return isinstance(parent, (ast.AnnAssign, ast.AugAssign, ast.NamedExpr)) and point.field == 'target'
+
+    def scopes(self, point):
+        """
+        Return the scopes a name at the point is looked up in, innermost first.
+        Default values, decorators and annotations belong to the scope around
+        their function, and class bodies are not seen from their methods.
+        """
+        chain = []
+        child = point
+        for ancestor in point.ancestors():
+            node = ancestor.node
+            if isinstance(node, ast.Module) or isinstance(node, SCOPES) and child.field == 'body' \
+                    and not (isinstance(node, ast.ClassDef) and chain):
+                chain.append(node)
+            child = ancestor
+        return chain
+
+    def bind(self, point, name, kind, node):
+        scopes = self.scopes(point)
+        if scopes:
+            self.bindings.setdefault(scopes[0], {}).setdefault(name, []).append((kind, node))
+
+    def lookup(self, scopes, name):
+        # Type of a name in the innermost scope that binds it
+        if name in self.escaped:
+            return None
+        for position, scope in enumerate(scopes):
+            if name in self.bindings.get(scope, {}):
+                return self.resolve(scopes[position:], name)
+        return None
+
+    def resolve(self, scopes, name):
+        key = (id(scopes[0]), name)
+        if key in self.resolved:
+            # A name that depends on itself, like x = x + 1, has no known type
+            return self.resolved[key]
+        self.resolved[key] = None
+
+        types = set()
+        augmented = []
+        for kind, node in self.bindings[scopes[0]][name]:
+            if kind == 'value':
+                types.add(self.expression(scopes, node))
+            elif kind == 'annotation':
+                declared = annotation_type(node.annotation)
+                if declared is None and node.value is not None:
+                    declared = self.expression(scopes, node.value)
+                types.add(declared)
+            elif kind == 'type':
+                types.add(node)
+            elif kind == 'augmented':
+                augmented.append(node)
+            else:
+                types.add(None)
+        result = types.pop() if len(types) == 1 else None
+        # x += y keeps the type of x, or x has no known type
+        for node in augmented:
+            if result is not None and binary(node.op, result, self.expression(scopes, node.value)) != result:
+                result = None
+        self.resolved[key] = result
+        return result
+
+    def expression(self, scopes, node):
+        """
+        Return the type of an expression, None when it is not known.
+        """
+        if isinstance(node, ast.Constant):
+            if node.value is None:
+                return 'NoneType'
+            return type(node.value).__name__ if type(node.value).__name__ in NUMBERS | SEQUENCES else None
+        if type(node) in LITERALS:
+            return LITERALS[type(node)]
+        if isinstance(node, ast.Name):
+            return self.lookup(scopes, node.id)
+        if isinstance(node, ast.BinOp):
+            result = binary(node.op, self.expression(scopes, node.left), self.expression(scopes, node.right))
+            return None if result == INVALID else result
+        if isinstance(node, ast.UnaryOp):
+            if isinstance(node.op, ast.Not):
+                return 'bool'
+            operand = self.expression(scopes, node.operand)
+            if operand in NUMBERS and not (isinstance(node.op, ast.Invert) and operand not in ('bool', 'int')):
+                return 'int' if operand == 'bool' else operand
+            return None
+        if isinstance(node, (ast.BoolOp, ast.IfExp)):
+            values = node.values if isinstance(node, ast.BoolOp) else [node.body, node.orelse]
+            types = {self.expression(scopes, value) for value in values}
+            return types.pop() if len(types) == 1 else None
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in CALLS \
+                and not any(node.func.id in self.bindings.get(scope, {}) for scope in scopes):
+            # A builtin that is not shadowed by a name of the module
+            return CALLS[node.func.id]
+        return None
+
+    def type_of(self, point, node=None):
+        # Type of the node of the point, or of a node below it
+        return self.expression(self.scopes(point), point.node if node is None else node)
+
+    def allows(self, point, op, right=None):
+        """
+        Return False when the BinOp of the point would raise a TypeError with
+        `op` as its operator (and `right` as its right operand, if given).
+        """
+        scopes = self.scopes(point)
+        left = self.expression(scopes, point.node.left)
+        right = self.expression(scopes, point.node.right if right is None else right)
+        return binary(op(), left, right) != INVALID
+
+
+def inferred(index):
+    """
+    Return the types of the tree of the index, inferred once and shared by all
+    operators. None when the inference is turned off by setting index.types to None.
+    """
+    if not hasattr(index, 'types'):
+        index.types = TypeInference(index)
+    return index.types
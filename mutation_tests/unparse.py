@@ -0,0 +1,184 @@
+import os
+import ast
+import sys
+import json
+import time
+import tempfile
+import importlib.util
+from mutation_tests.equivalence import code_hash
+
+
+def astor_source(node):
+    # astor is only needed before Python 3.9, which has no ast.unparse, it is imported when it unparses
+    import astor
+    return astor.to_source(node)
+
+
+def ast_source(node):
+    # astor ends the code with a newline
+    return ast.unparse(node) + '\n'
+
+
+BACKENDS = {'astor': astor_source, 'ast': ast_source}
+
+# Backend of to_source(), picked by choose() the first time it is needed
+_backend = None
+# Choice of choose() for every interpreter, so the backends are only measured once
+CHOICES_FILE = os.path.join(tempfile.gettempdir(), 'mutation-unparse.json')
+# Code the backends are measured on, with the nodes mutants are made of
+SAMPLE = '''\
+import os
+
+
+class Account(Base):
+    rate = 0.5
+
+    @staticmethod
+    def fee(amount, *args, limit=100, **kwargs):
+        return amount * 2 + 1 if amount > limit else -amount // 3
+
+    def deposit(self, amount):
+        if amount <= 0 or not self.open:
+            raise ValueError(f"Invalid amount: {amount!r:>10}")
+        self.balance += amount
+        print(f"Deposited {amount}", amount > 10, sep=', ')
+        return self.balance
+
+    def withdraw(self, amount):
+        try:
+            while amount > self.balance and self.open:
+                amount -= 1
+            self.balance -= amount
+        except (KeyError, ValueError) as error:
+            print(error)
+        finally:
+            del self.pending
+        return True
+
+
+def total(accounts, limit=100):
+    result = 0
+    for account in accounts:
+        if account.balance > limit:
+            continue
+        result = result + account.balance % 7 - (lambda x: x ** 2)(account.balance)
+    values = [a.balance for a in accounts if a.open]
+    with open(os.sep) as f:
+        pass
+    return result, values[1:-1], {'first': True, key: None}, {a for a in values}
+'''
+
+
+def available():
+    # Backends the running interpreter has
+    names = []
+    if importlib.util.find_spec('astor') is not None:
+        names.append('astor')
+    if hasattr(ast, 'unparse'):
+        names.append('ast')
+    return names
+
+
+def compiled(code):
+    # The compiler adds instructions where lines start, so every node is put on the same position
+    tree = ast.parse(code)
+    for node in ast.walk(tree):
+        if 'lineno' in node._attributes:
+            node.lineno = node.end_lineno = 1
+            node.col_offset = node.end_col_offset = 0
+    return compile(tree, '<unparse>', 'exec')
+
+
+def use(name):
+    global _backend
+    if name not in available():
+        raise ValueError(f"Unknown unparse backend: {name}")
+    _backend = name
+
+
+def to_source(node):
+    """
+    Return the code of a tree, or of a single node, with the current backend.
+    """
+    if _backend is None:
+        choose()
+    return BACKENDS[_backend](node)
+
+
+def benchmark(tree, repeat=5):
+    """
+    Unparse the module with every available backend and return (timings, same):
+    the best time of every backend in seconds, and whether the code of all of
+    them compiles to the same bytecode. A backend that can't unparse the module
+    has no time.
+    """
+    timings = {}
+    hashes = set()
+    for name in available():
+        unparse = BACKENDS[name]
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                code = unparse(tree)
+                elapsed = time.perf_counter() - start
+                timings[name] = min(timings.get(name, elapsed), elapsed)
+        except Exception:
+            # astor doesn't know the nodes of newer Pythons, like match
+            timings.pop(name, None)
+            continue
+        hashes.add(code_hash(compiled(code)))
+    return timings, len(hashes) == 1
+
+
+def interpreter():
+    # Key of the choice: the interpreter, and the backends it has
+    return f"{sys.executable} {sys.version} {' '.join(available())}"
+
+
+def cached_choice():
+    try:
+        with open(CHOICES_FILE, 'r') as f:
+            name, timings, same = json.load(f)[interpreter()]
+    except Exception:
+        # Not measured with this interpreter yet, or the file is unreadable
+        return None
+    return name, timings, same
+
+
+def store_choice(choice):
+    try:
+        with open(CHOICES_FILE, 'r') as f:
+            choices = json.load(f)
+    except Exception:
+        choices = {}
+    choices[interpreter()] = choice
+    try:
+        with open(CHOICES_FILE, 'w') as f:
+            json.dump(choices, f)
+    except OSError:
+        # Measured again next time
+        pass
+
+
+def choose():
+    """
+    Use the fastest backend on SAMPLE and return (name, timings, same) as
+    benchmark() gives them. The choice is kept in CHOICES_FILE for every
+    interpreter, so later runs use it without measuring the backends again.
+
+    When the backends don't agree on the bytecode astor is kept, it has
+    unparsed every mutant so far.
+    """
+    choice = cached_choice()
+    if choice is None or choice[0] not in available():
+        timings, same = benchmark(ast.parse(SAMPLE))
+        if not timings:
+            name = available()[-1]
+        elif not same and 'astor' in timings:
+            name = 'astor'
+        else:
+            name = min(timings, key=timings.get)
+        choice = name, timings, same
+        store_choice(choice)
+    use(choice[0])
+    return choice
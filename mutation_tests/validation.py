@@ -0,0 +1,94 @@
+import os
+import sys
+import marshal
+import traceback
+import subprocess
+from mutation_tests.outcomes import INCOMPETENT
+
+# Executes a marshalled code object from stdin the way the module would be imported
+IMPORT_SCRIPT = (
+    "import sys, types, marshal\n"
+    "path, name = sys.argv[1:3]\n"
+    "sys.path[:0] = sys.argv[3:]\n"
+    "module = types.ModuleType(name)\n"
+    "module.__file__ = path\n"
+    "sys.modules[name] = module\n"
+    "exec(marshal.loads(sys.stdin.buffer.read()), module.__dict__)\n"
+)
+
+
+class CompetenceFilter:
+    """
+    Give the mutants that can't run at all the incompetent outcome, before any
+    test runs: a mutant whose code doesn't compile, and with `smoke` also a
+    mutant that raises when its module is imported, like a class left without
+    a method it calls at import time.
+
+    The import runs in a fresh interpreter without the tests, so it costs a
+    fraction of a test run and has no side effects on the framework. A mutant
+    that hangs at import is left to the tests, which time it out.
+    """
+
+    def __init__(self, source_file, test_file=None, smoke=False, timeout=None):
+        self.source_file = os.path.abspath(source_file)
+        self.module_name = os.path.splitext(os.path.basename(self.source_file))[0]
+        # The module imports its siblings like it does when the tests import it
+        self.search_paths = [os.path.dirname(self.source_file)]
+        if test_file is not None:
+            self.search_paths.insert(0, os.path.dirname(os.path.abspath(test_file)))
+        self.smoke = smoke
+        self.timeout = timeout
+        self.compile_errors = 0
+        self.import_errors = 0
+
+    def import_error(self, code_object):
+        # The output of a failed import, None when the module imports fine or hangs
+        command = [sys.executable, '-c', IMPORT_SCRIPT, self.source_file, self.module_name] + self.search_paths
+        try:
+            process = subprocess.run(command, input=marshal.dumps(code_object), capture_output=True,
+                                     cwd=os.path.dirname(self.source_file), timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            return None
+        if process.returncode == 0:
+            return None
+        return process.stderr.decode(errors='replace')
+
+    def check_original(self, original_code):
+        # Imports that fail on the original code would make every mutant incompetent
+        if self.smoke:
+            error = self.import_error(compile(original_code, self.source_file, 'exec'))
+            if error is not None:
+                print(f"Warning: the original code fails at import, mutants are not imported\n{error}")
+                self.smoke = False
+
+    def check(self, mutant):
+        """
+        Return the (outcome, output) of an incompetent mutant, None when it has to run.
+        """
+        if mutant.code_object is not None:
+            # Patched by the bytecode engine, it is compiled already
+            code_object = mutant.code_object
+        else:
+            try:
+                code_object = compile(mutant.code, self.source_file, 'exec')
+            except Exception:
+                self.compile_errors += 1
+                return INCOMPETENT, f"Does not compile:\n{traceback.format_exc(limit=0)}"
+        if self.smoke:
+            error = self.import_error(code_object)
+            if error is not None:
+                self.import_errors += 1
+                return INCOMPETENT, f"Fails at import:\n{error}"
+        return None
+
+    def filter(self, generated):
+        # Check the mutants of every operator as they are converted to code
+        for mutator, mutants in generated:
+            yield mutator, self.marked(mutants)
+
+    def marked(self, mutants):
+        for mutant in mutants:
+            # Mutants in the schema were compiled with it
+            if mutant.result is None and mutant.schema_id is None:
+                mutant.result = self.check(mutant)
+            yield mutant
@@ -0,0 +1,142 @@
+import ast
+import random
+from mutation_tests.mutant import Mutant
+
+FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+# What the mutants are grouped by before the budget is spread over the groups
+SAMPLING = ['point', 'uniform', 'operator', 'function', 'line']
+
+
+def variants(mutator, point):
+    # The replacements an operator can make at a point, None for the one of an operator without a choice
+    if hasattr(mutator, 'variants'):
+        return mutator.variants(point)
+    return [None]
+
+
+def build(mutator, point, variant):
+    if variant is None:
+        return mutator.mutate(point)
+    return mutator.mutate(point, variant)
+
+
+def allocate(counts, budget, rng):
+    """
+    Split a budget of mutants over groups of mutants, like the variants of a
+    mutation point, counts[i] being the size of group i, and return the number
+    of mutants every group gets.
+
+    The budget is spread as evenly as possible: every group gets the same share,
+    groups smaller than their share get all of their mutants and what they
+    leave is shared by the other groups. When fewer mutants are left than groups,
+    the remaining ones go to groups picked at random.
+    """
+    if budget >= sum(counts):
+        return list(counts)
+    allocation = [0] * len(counts)
+    remaining = budget
+    open_groups = [i for i, count in enumerate(counts) if count]
+    while remaining and open_groups:
+        share = remaining // len(open_groups)
+        if not share:
+            for i in rng.sample(open_groups, remaining):
+                allocation[i] += 1
+            break
+        for i in open_groups:
+            taken = min(share, counts[i] - allocation[i])
+            allocation[i] += taken
+            remaining -= taken
+        open_groups = [i for i in open_groups if allocation[i] < counts[i]]
+    return allocation
+
+
+class VariantPlan:
+    """
+    The mutants of all operators, collected from the mutation points of all of
+    them, and a reproducible sample of them when there is a budget.
+
+    With `exhaustive` every variant of a point is a mutant (all operators in the
+    ROR table, the three other AOR operators, both AOD operands, ...), without it
+    a point has a single mutant with a random variant, like in iter_mutants().
+
+    A `budget` (or a `rate`, the fraction of all mutants) caps the number of
+    mutants. The mutants are split into strata by `sampling`: every mutation point
+    ('point'), a single one for all mutants ('uniform'), the operator, the
+    function or the line of the mutant. The budget is spread evenly over the
+    strata with allocate() and every stratum samples its share at random. The
+    same seed gives the same sample. A sampled mutant stands for
+    size of its stratum / mutants sampled from it, that is its `weight` in the
+    estimated score.
+
+    Operators need points(), and variants(point) with mutate(point, variant) when
+    they have more than one replacement. Operators without points() are run
+    through their iter_mutants(), outside of the budget.
+    """
+
+    def __init__(self, mutators, exhaustive=True, budget=None, seed=None, sampling='point', rate=None):
+        if sampling not in SAMPLING:
+            raise ValueError(f"Unknown sampling strategy: {sampling}")
+        self.random = random.Random(seed)
+        self.sampling = sampling
+        # (name, operator, [(point, variants)]) per operator
+        self.entries = []
+        for name, mutator in mutators:
+            if not hasattr(mutator, 'points'):
+                self.entries.append((name, mutator, None))
+                continue
+            points = [(point, variants(mutator, point) if exhaustive else [None]) for point in mutator.points()]
+            self.entries.append((name, mutator, points))
+
+        # Every mutant is (operator, point, variant), by position
+        strata = {}
+        for i, (name, _, points) in enumerate(self.entries):
+            for j, (point, options) in enumerate(points or []):
+                key = self.stratum(name, point)
+                strata.setdefault(key, []).extend((i, j, k) for k in range(len(options)))
+        self.total = sum(len(members) for members in strata.values())
+        if rate is not None:
+            budget = round(rate * self.total)
+
+        sizes = [len(members) for members in strata.values()]
+        allocation = sizes if budget is None else allocate(sizes, budget, self.random)
+        # Weight of every sampled mutant
+        self.weights = {}
+        for members, count in zip(strata.values(), allocation):
+            sampled = members if count == len(members) else self.random.sample(members, count)
+            for mutant in sampled:
+                self.weights[mutant] = len(members) / count
+        self.planned = len(self.weights)
+        self.rate = self.planned / self.total if self.total else 1.0
+
+    def stratum(self, name, point):
+        if self.sampling == 'point':
+            return name, point
+        if self.sampling == 'operator':
+            return name
+        if self.sampling == 'function':
+            return point if isinstance(point.node, FUNCTIONS) else point.enclosing(*FUNCTIONS)
+        if self.sampling == 'line':
+            return point.lineno
+        return None
+
+    def generate(self):
+        # Yield (name, mutants) per operator, the mutants are built when they are asked for
+        for i, (name, mutator, points) in enumerate(self.entries):
+            if points is None:
+                yield name, mutator.iter_mutants()
+                continue
+            yield name, self.iter_mutants(i, name, mutator, points)
+
+    def iter_mutants(self, i, name, mutator, points):
+        for j, (point, options) in enumerate(points):
+            for k, variant in enumerate(options):
+                if (i, j, k) not in self.weights:
+                    continue
+                try:
+                    # Copy only the nodes from the root to the mutated node
+                    mutated_tree = build(mutator, point, variant)
+                except Exception:
+                    continue
+                mutant = Mutant(name, lineno=point.lineno, tree=mutated_tree, original=mutator.tree)
+                mutant.weight = self.weights[(i, j, k)]
+                yield mutant
@@ -0,0 +1,145 @@
+import os
+import types
+import shutil
+import marshal
+import tempfile
+import multiprocessing
+from collections import deque
+from mutation_tests.runners import make_runner
+from mutation_tests.schemata import SchemataRunner
+
+
+# What the tests never need: version control, caches and the packaging output
+IGNORED = shutil.ignore_patterns('__pycache__', '*.pyc', '.git', '.hg', '.svn', '.tox', '.nox', '.mypy_cache',
+                                 '.pytest_cache', '.ruff_cache', '.mutation_parse_cache', 'node_modules', '*.egg-info')
+
+
+def ignored(directory, names):
+    # The patterns of IGNORED, and virtualenvs whatever their name, they have a pyvenv.cfg
+    skipped = set(IGNORED(directory, names))
+    skipped.update(name for name in names if os.path.isfile(os.path.join(directory, name, 'pyvenv.cfg')))
+    return skipped
+
+
+def copy_directories(root, directories, destination):
+    """
+    Copy the directories, all of them below root, to the same paths below
+    destination. The rest of root is not copied, so a root like a whole checkout
+    or / costs no more than the directories themselves.
+    """
+    copied = []
+    # Outer directories first, the ones inside them are copied with them
+    for directory in sorted(set(directories), key=len):
+        if any(os.path.commonpath([directory, outer]) == outer for outer in copied):
+            continue
+        shutil.copytree(directory, os.path.join(destination, os.path.relpath(directory, root)), ignore=ignored,
+                        dirs_exist_ok=True)
+        copied.append(directory)
+
+
+def default_base_dir():
+    # Prefer a tmpfs so that the per-mutant writes never hit the disk
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+
+class Workspace:
+    """
+    A private copy of the source/test directory used by a single worker.
+
+    The directory of the source file and the directory of the test file are
+    copied into a temporary directory, at their paths below the directory both
+    are in, so mutants are only ever written to the copy and the real source
+    file is never touched. Virtualenvs and caches in them are left out.
+    """
+
+    def __init__(self, source_file, test_file, base_dir=None, backend='subprocess', timeout=None, schema=None):
+        source_file = os.path.abspath(source_file)
+        test_file = os.path.abspath(test_file)
+        root = os.path.commonpath([os.path.dirname(source_file), os.path.dirname(test_file)])
+
+        self.path = tempfile.mkdtemp(prefix='mutation-ws-', dir=base_dir)
+        self.root = os.path.join(self.path, os.path.basename(root) or 'root')
+        copy_directories(root, [os.path.dirname(source_file), os.path.dirname(test_file)], self.root)
+
+        self.source_file = os.path.join(self.root, os.path.relpath(source_file, root))
+        self.test_file = os.path.join(self.root, os.path.relpath(test_file, root))
+
+        # Keep relative imports working when the tests are run from inside the copied directory
+        cwd = os.getcwd()
+        if os.path.commonpath([cwd, root]) == root:
+            self.cwd = os.path.join(self.root, os.path.relpath(cwd, root))
+            # Only the directories of the files are copied, the working directory may not be one of them
+            os.makedirs(self.cwd, exist_ok=True)
+        else:
+            self.cwd = None
+
+        self.runner = make_runner(backend, self.source_file, self.test_file, self.cwd, timeout)
+        if schema is not None:
+            # Mutants are given by their id in the schema
+            self.runner = SchemataRunner(self.runner, schema)
+
+    def run_mutant(self, mutant, tests=None):
+        # The runner only writes to the private copy of the source file
+        return self.runner.run(mutant, tests)
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+# Workspace of the current pool worker, created by init_worker
+_workspace = None
+
+
+def init_worker(source_file, test_file, base_dir, backend, timeout, schema):
+    global _workspace
+    _workspace = Workspace(source_file, test_file, base_dir, backend, timeout, schema)
+
+
+def run_mutant(task):
+    mutant, tests = task
+    return _workspace.run_mutant(mutant, tests)
+
+
+class WorkerPool:
+    """
+    A pool of processes that run mutants in parallel, each one in its own workspace.
+    """
+
+    def __init__(self, source_file, test_file, jobs, base_dir=None, backend='subprocess', timeout=None,
+                 schema=None):
+        base_dir = default_base_dir() if base_dir is None else base_dir
+        # All worker workspaces live under one directory so they can be removed together
+        self.path = tempfile.mkdtemp(prefix='mutation-pool-', dir=base_dir)
+        self.jobs = jobs
+        self.pool = multiprocessing.Pool(jobs, initializer=init_worker,
+                                         initargs=(source_file, test_file, self.path, backend, timeout, schema))
+
+    def run_mutants(self, tasks):
+        # Every task is a (code, code object or schema id, tests) pair, results are yielded in the same order.
+        # A task is only taken from `tasks` when a worker can start it soon, so the mutants
+        # waiting in the pool don't grow with the number of mutants
+        pending = deque()
+        for task in tasks:
+            if isinstance(task[0], types.CodeType):
+                # Code objects can't be pickled, they are sent marshalled
+                task = (marshal.dumps(task[0]), task[1])
+            pending.append(self.pool.apply_async(run_mutant, (task,)))
+            if len(pending) >= 2 * self.jobs:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is not None:
+            self.pool.terminate()
+        self.close()
@@ -0,0 +1,125 @@
+import os
+import ast
+import glob
+import unittest
+from mutation_tests.registry import OPERATORS, make_operator
+from mutation_tests.mutation_index import MutationIndex, replace, located
+from mutation_tests.variants import variants, build
+from mutation_tests.splice import Splicer
+
+# Code with something for every operator to mutate
+SOURCE = '''\
+import os
+
+
+class Base:
+    def describe(self):
+        return 'base'
+
+
+class Account(Base):
+    """An account with a balance."""
+    rate = 0.5
+
+    def __init__(self, owner, balance=0):
+        super().__init__()
+        self.owner = owner
+        self.balance = balance  # in cents
+        self.open = True
+
+    @staticmethod
+    def fee(amount):
+        return amount * 2 + 1
+
+    def deposit(self, amount):
+        if amount <= 0 or not self.open:
+            raise ValueError(f"Invalid amount: {amount + 1}")
+        self.balance += amount
+        print(f"Deposited {amount} for {self.owner}", amount > 10, sep=', ')
+        return self.balance
+
+    def withdraw(self, amount):
+        try:
+            if amount > self.balance and self.open:
+                return False
+            self.balance -= amount
+        except TypeError:
+            pass
+        except (KeyError, ValueError) as error:
+            print(error)
+        return True
+
+    def describe(self):
+        return super().describe() + ':' + self.owner
+
+
+def total(accounts, limit=100):
+    result = 0
+    for account in accounts:
+        if account.balance > limit:
+            continue
+        if account.balance < -1:
+            break
+        result = result + account.balance % 7 - -account.balance // 3
+    while result > 1.0:
+        result /= 2
+    values = [a.balance for a in accounts if a.open]
+    return result, values, {'first': True, 'path': os.sep}
+'''
+
+
+def sources():
+    # The code above and the examples the framework is run on
+    yield '<source>', SOURCE
+    directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test_file')
+    for path in sorted(glob.glob(os.path.join(directory, 'example*.py'))):
+        with open(path, 'r') as f:
+            yield path, f.read()
+
+
+class TestSplicer(unittest.TestCase):
+    def test_all_operators(self):
+        # Every variant of every operator parses to the tree ast.unparse gives
+        for path, source in sources():
+            tree = ast.parse(source)
+            index = MutationIndex(tree)
+            splicer = Splicer(source, tree)
+            for name in OPERATORS:
+                mutator = make_operator(name, tree, 1000, index, f"splice:{name}")
+                for point in mutator.points():
+                    for variant in variants(mutator, point):
+                        mutated = build(mutator, point, variant)
+                        expected = ast.dump(ast.parse(ast.unparse(mutated)))
+                        with self.subTest(path=path, operator=name, line=point.lineno, variant=variant):
+                            self.assertEqual(ast.dump(ast.parse(splicer.to_source(mutated))), expected)
+
+    def test_equal_constants_of_other_types(self):
+        # True == 1 and 1 == 1.0, but the mutant has another constant
+        source = "first = True\nrate = 1.0\nzero = 0.0\n"
+        tree = ast.parse(source)
+        splicer = Splicer(source, tree)
+        for point, value, line in [(0, 1, "first = 1"), (1, 1, "rate = 1"), (1, True, "rate = True"),
+                                   (2, -0.0, "zero = -0.0")]:
+            constant = MutationIndex(tree).find(ast.Constant)[point]
+            mutated = replace(constant, located(ast.Constant(value=value), constant.node))
+            self.assertEqual(splicer.to_source(mutated).splitlines()[point], line)
+
+    def test_text_around_the_edit_is_kept(self):
+        # Only the mutated expression changes, without parentheses around it or the f-string
+        source = "print(f\"{a + b}\", a < b, sep=a and b)  # keep\n"
+        tree = ast.parse(source)
+        splicer = Splicer(source, tree)
+        index = MutationIndex(tree)
+        point = index.find(ast.Compare)[0]
+        mutated = replace(point, located(ast.Compare(left=point.node.left, ops=[ast.LtE()],
+                                                     comparators=point.node.comparators), point.node))
+        self.assertEqual(splicer.to_source(mutated), "print(f\"{a + b}\", a <= b, sep=a and b)  # keep\n")
+        point = index.find(ast.BinOp)[0]
+        mutated = replace(point, located(ast.BinOp(left=point.node.left, op=ast.Sub(), right=point.node.right),
+                                         point.node))
+        self.assertEqual(splicer.to_source(mutated), "print(f'{a - b}', a < b, sep=a and b)  # keep\n")
+
+
+# Run the tests
+if __name__ == "__main__":
+    unittest.main()